@@ -8,11 +8,105 @@ Benchling2SBOLv
 # https://packaging.python.org/en/latest/single_source_version.html
 __version__ = '0.2.0'
 
+import argparse
+import collections
+import concurrent.futures
+import contextlib
 import copy
+import csv
+import hashlib
+import importlib
+import io
+import itertools
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import types
+import warnings
+import weakref
+import xml.sax.saxutils
 
-import benchlingclient
-import dnaplotlib
-from matplotlib import pyplot
+import numpy
+
+class _LazyModule(object):
+    """
+    Stand-in for a module that is imported the first time it is used.
+
+    Importing ``benchlingclient``, ``dnaplotlib`` and matplotlib takes much
+    longer than everything else in this module, and many functions, such as
+    those dealing with annotation mappings or layouts, do not need all of
+    them. Accessing any attribute of a ``_LazyModule`` imports the module
+    and returns the module's attribute. Submodules (e.g.
+    ``matplotlib.textpath``) are imported as needed.
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module.
+    before_import : callable, optional
+        Function to call right before importing the module.
+
+    """
+    def __init__(self, name, before_import=None):
+        self._name = name
+        self._before_import = before_import
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            if self._before_import is not None:
+                self._before_import()
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, name):
+        module = self._load()
+        try:
+            return getattr(module, name)
+        except AttributeError:
+            pass
+        try:
+            return importlib.import_module('{}.{}'.format(self._name, name))
+        except ImportError:
+            raise AttributeError("module '{}' has no attribute '{}'".format(
+                self._name, name))
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._load(), name, value)
+
+    def __repr__(self):
+        return '<lazily imported module {!r}>'.format(self._name)
+
+def _pin_backend():
+    """
+    Select ``MATPLOTLIB_BACKEND``, if specified, before pyplot is imported.
+
+    """
+    if (MATPLOTLIB_BACKEND is not None) and \
+            ('matplotlib.pyplot' not in sys.modules):
+        matplotlib.use(MATPLOTLIB_BACKEND)
+
+benchlingclient = _LazyModule('benchlingclient')
+matplotlib = _LazyModule('matplotlib')
+# dnaplotlib imports pyplot
+dnaplotlib = _LazyModule('dnaplotlib', before_import=_pin_backend)
+pyplot = _LazyModule('matplotlib.pyplot', before_import=_pin_backend)
+
+# ``MATPLOTLIB_BACKEND`` is the matplotlib backend selected right before
+# pyplot is imported, which happens the first time a figure is drawn with
+# matplotlib. Importing this module does not import pyplot, dnaplotlib,
+# benchlingclient, or matplotlib itself. If None, matplotlib selects its
+# backend as usual. The ``benchling2sbolv`` command and batch worker
+# processes use 'Agg'.
+MATPLOTLIB_BACKEND = None
 
 # ``ANN_PARTS_MAPPING`` maps benchling annotations to dnaplotlib's part types.
 # Each element of this list is a dictionary, where the value given by the
@@ -99,6 +193,597 @@ RENDER_OPT = {
                           },
 }
 
+# ``SEQUENCE_CACHE_DIR`` specifies a directory where sequences loaded from
+# benchling are stored, so that later calls to ``load_sequence()``,
+# ``load_sequences()``, ``plot_sequence()`` and ``plot_sequences()`` do not
+# need to fetch them again. Sequences are cached separately for each client
+# and benchling API key. If None, sequences are not cached. The default is
+# taken from the environment variable ``BENCHLING2SBOLV_CACHE_DIR``.
+# ``SEQUENCE_CACHE_TTL`` is the time in seconds during which a cached
+# sequence is used without accessing benchling. After that, its
+# modification timestamp is compared with the one in benchling, which is
+# obtained with a small query that does not download the sequence, and the
+# sequence is fetched again only if it was modified or if the timestamp
+# cannot be checked.
+# ``SEQUENCE_CACHE_MAX_SIZE`` is the maximum size of the cache in bytes. When
+# exceeded, the least recently used sequences are removed. If None, the cache
+# is not bounded.
+SEQUENCE_CACHE_DIR = os.environ.get('BENCHLING2SBOLV_CACHE_DIR')
+SEQUENCE_CACHE_TTL = 24*60*60
+SEQUENCE_CACHE_MAX_SIZE = 256*2**20
+
+# ``SEQUENCE_FIELDS`` lists the fields requested from benchling when loading
+# sequences by name. Plotting only needs annotations and lengths, so bases
+# are not downloaded, which greatly reduces the size of long records. Fields
+# are selected via the ``returning`` parameter of benchling's API. If the
+# client does not support it, complete sequences are loaded instead. If
+# None, complete sequences are always loaded.
+SEQUENCE_FIELDS = ['id',
+                   'name',
+                   'length',
+                   'annotations',
+                   'modifiedAt',
+                   'folderId']
+
+# ``RENDER_CACHE_DIR`` specifies a directory where figures saved by
+# ``plot_sequence()`` and ``plot_sequences()`` are stored, indexed by a hash
+# of everything that affects them: the annotations to be plotted, all
+# function arguments, ``ANN_PARTS_MAPPING``, ``RENDER_OPT``, matplotlib's
+# ``rcParams``, and the versions of this package, matplotlib, and
+# dnaplotlib. If a figure with the same hash was already saved, it is copied
+# to the requested file instead of being drawn again. When the cache is
+# enabled, figures saved into a file are always released after saving, and
+# these functions return None whether or not the figure was in the cache.
+# If None, figures are not cached. The default is taken from the
+# environment variable ``BENCHLING2SBOLV_RENDER_CACHE_DIR``.
+# ``RENDER_CACHE_MAX_SIZE`` is the maximum size of the cache in bytes. When
+# exceeded, the least recently used figures are removed. If None, the cache
+# is not bounded.
+RENDER_CACHE_DIR = os.environ.get('BENCHLING2SBOLV_RENDER_CACHE_DIR')
+RENDER_CACHE_MAX_SIZE = 1024*2**20
+
+# ``LABEL_WIDTH_CACHE_SIZE`` is the maximum number of label widths kept in
+# memory by ``get_label_width()``. Label widths are shared by all axes and
+# calls to ``plot_sequence()`` and ``plot_sequences()``.
+LABEL_WIDTH_CACHE_SIZE = 4096
+
+# ``LABEL_METRICS`` specifies how label widths are measured by
+# ``get_label_width()``:
+#   - 'renderer' draws each label with the canvas renderer of the axes in
+#     which it will be plotted. This is the most accurate method.
+#   - 'textpath' computes widths directly from font metrics, including
+#     mathtext labels, without a figure or a renderer. Unlike the renderer,
+#     it does not snap glyphs to the pixel grid, so widths can differ from
+#     the ones obtained with 'renderer' by a few pixels. For typical labels
+#     at 6 to 10 points in the default axes, differences are up to about 4
+#     pixels (2 data units). They are up to 8% of the label width for labels
+#     of two or more characters, and up to 16% for single narrow characters
+#     such as 'i', where they amount to less than a pixel. These bounds are
+#     checked by ``benchmarks/check_label_metrics.py``. Parts whose size
+#     depends on their label width (see ``RENDER_OPT``) can therefore be
+#     slightly wider or narrower than with 'renderer'.
+LABEL_METRICS = 'renderer'
+
+# ``SAVEFIG_CROP`` specifies how saved figures are cropped by default:
+#   - 'tight' crops to the extent of everything drawn, as computed by
+#     matplotlib. This requires an additional pass over all artists before
+#     the figure is saved.
+#   - 'extents' crops to the horizontal extent of each diagram and its
+#     labels, and to the y axis limits, which are already known after
+#     drawing, so that the figure is drawn only once.
+SAVEFIG_CROP = 'tight'
+
+class RenderStats(object):
+    """
+    Wall time and counts of the phases of rendering a sequence diagram.
+
+    An instance can be passed as the `stats` argument of most functions in
+    this module, and accumulates statistics over all calls it is passed to.
+    Functions skip all bookkeeping when `stats` is None.
+
+    Phases timed are ``fetch`` (loading sequences from benchling or the
+    sequence cache), ``filter`` (selecting and sorting annotations),
+    ``parts`` (mapping annotations to parts), ``options`` (resolving each
+    part's rendering options, including measuring labels),
+    ``label_measurement`` (measuring labels, also included in ``options``),
+    ``render`` (drawing with dnaplotlib), ``savefig``, and ``render_cache``
+    (looking up the render cache). Counts include ``sequences``,
+    ``annotations``, ``annotations_selected`` (annotations in range that
+    were mapped to at least one part), ``parts``, ``label_measurements``,
+    ``layouts_reused`` (sequences whose layout was shared with an identical
+    sequence, see ``dedupe_ratio()``), and hits and misses of each cache.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Function called as ``callback(phase, elapsed)`` every time a phase
+        finishes, with the elapsed wall time in seconds.
+
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.times = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.counts = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        """
+        Context manager that records the wall time of a phase.
+
+        """
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t_start
+            with self._lock:
+                self.times[phase] += elapsed
+                self.calls[phase] += 1
+            if self.callback is not None:
+                self.callback(phase, elapsed)
+
+    def count(self, name, n=1):
+        """
+        Increase a count.
+
+        """
+        with self._lock:
+            self.counts[name] += n
+
+    def merge(self, other):
+        """
+        Add the statistics of another ``RenderStats`` or of a dictionary as
+        returned by ``to_dict()``.
+
+        """
+        if isinstance(other, RenderStats):
+            other = other.to_dict()
+        with self._lock:
+            for phase, phase_stats in other['phases'].items():
+                self.times[phase] += phase_stats['time']
+                self.calls[phase] += phase_stats['calls']
+            for name, n in other['counts'].items():
+                self.counts[name] += n
+
+    def dedupe_ratio(self):
+        """
+        Get the number of sequences laid out per layout computed.
+
+        ``plot_sequences()`` and batch rendering compute a single layout for
+        all sequences whose parts are identical. A ratio of 1 means that no
+        layout was reused.
+
+        """
+        with self._lock:
+            n_sequences = self.counts.get('sequences', 0)
+            n_reused = self.counts.get('layouts_reused', 0)
+        if n_sequences <= n_reused:
+            return 1.
+        return n_sequences/(n_sequences - n_reused)
+
+    def to_dict(self):
+        """
+        Get all statistics as a dictionary.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with keys ``phases``, which maps each phase to a
+            dictionary with its total ``time`` in seconds and number of
+            ``calls``, and ``counts``.
+
+        """
+        with self._lock:
+            return {'phases': {phase: {'time': self.times[phase],
+                                       'calls': self.calls[phase]}
+                               for phase in self.times},
+                    'counts': dict(self.counts)}
+
+    def to_json(self, **kwargs):
+        """
+        Get all statistics as a JSON string. See ``to_dict()``.
+
+        Keyword arguments are passed to ``json.dumps()``.
+
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def __repr__(self):
+        stats = self.to_dict()
+        phases = ', '.join('{}={:.3f}s'.format(phase, phase_stats['time'])
+                           for phase, phase_stats in stats['phases'].items())
+        counts = ', '.join('{}={}'.format(name, n)
+                           for name, n in stats['counts'].items())
+        return 'RenderStats({}; {})'.format(phases, counts)
+
+class _NullContext(object):
+    """
+    Context manager that does nothing.
+
+    Equivalent to ``contextlib.nullcontext()``, which requires Python 3.7.
+
+    """
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+# Context manager that does nothing, used when statistics are disabled
+_NULL_TIMER = _NullContext()
+
+def _timer(stats, phase):
+    """
+    Get a context manager that times a phase if `stats` is not None.
+
+    """
+    if stats is None:
+        return _NULL_TIMER
+    return stats.timer(phase)
+
+class _LRUCache(object):
+    """
+    Thread-safe in-memory mapping with least-recently-used eviction.
+
+    Parameters
+    ----------
+    maxsize : int or callable
+        Maximum number of entries. If callable, it is called without
+        arguments every time an entry is added to obtain the maximum size,
+        so that it can be changed via a module-level setting.
+
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the value stored under a given key.
+
+        Raises
+        ------
+        KeyError
+            If no value is stored under `key`.
+
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value under a given key, and evict old entries if necessary.
+
+        """
+        maxsize = self.maxsize() if callable(self.maxsize) else self.maxsize
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def info(self):
+        """
+        Get a dictionary with the number of hits, misses, and entries.
+
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._data)}
+
+    def clear(self):
+        """
+        Remove all entries and reset statistics.
+
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+_label_width_cache = _LRUCache(lambda: LABEL_WIDTH_CACHE_SIZE)
+
+class _DiskCache(object):
+    """
+    Key-value store in a directory, with least-recently-used eviction.
+
+    Each value is pickled into its own file, named after a hash of its key.
+    Writes are atomic, so the same directory can be shared by several
+    threads and processes. Reading an entry updates its file's modification
+    time, which is used to find the least recently used entries.
+
+    Parameters
+    ----------
+    directory : str
+        Directory where entries are stored. Created if it does not exist.
+    max_size : int, optional
+        Maximum total size of all entries, in bytes. If None, the cache is
+        not bounded.
+
+    """
+    def __init__(self, directory, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+
+    def path(self, key):
+        """
+        Get the path of the file that stores the entry with a given key.
+
+        """
+        key_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key_hash + '.pickle')
+
+    def get(self, key):
+        """
+        Get the value stored under a given key.
+
+        Raises
+        ------
+        KeyError
+            If no value is stored under `key`, or if it cannot be read.
+
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            raise KeyError(key)
+        except Exception:
+            # Corrupted or incompatible entry
+            raise KeyError(key)
+        # Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """
+        Store a value under a given key, and evict old entries if necessary.
+
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until under the size limit.
+
+        """
+        if self.max_size is None:
+            return
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pickle'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(e[1] for e in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """
+        Remove all entries.
+
+        """
+        if not os.path.isdir(self.directory):
+            return
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.pickle'):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+def _get_sequence_cache():
+    """
+    Get the sequence cache as currently configured, or None if disabled.
+
+    """
+    if SEQUENCE_CACHE_DIR is None:
+        return None
+    return _DiskCache(SEQUENCE_CACHE_DIR, max_size=SEQUENCE_CACHE_MAX_SIZE)
+
+def _get_modified_at(seq):
+    """
+    Get a sequence's modification timestamp, or None if not available.
+
+    """
+    for attr in ['modified_at', 'modifiedAt']:
+        modified_at = getattr(seq, attr, None)
+        if modified_at is not None:
+            return modified_at
+    return None
+
+def clear_sequence_cache():
+    """
+    Remove all sequences stored in the sequence cache.
+
+    """
+    cache = _get_sequence_cache()
+    if cache is not None:
+        cache.clear()
+
+# Font settings in ``matplotlib.rcParams`` that affect the size of a label
+_FONT_RC_KEYS = ['font.family',
+                 'font.sans-serif',
+                 'font.serif',
+                 'font.monospace',
+                 'font.weight',
+                 'mathtext.default',
+                 'mathtext.fontset',
+                 'text.usetex']
+
+def _font_rc_key():
+    """
+    Get a hashable summary of the current font settings.
+
+    """
+    return tuple(str(matplotlib.rcParams[k]) for k in _FONT_RC_KEYS)
+
+def get_label_width(label,
+                    fontsize,
+                    fontstyle,
+                    ax=None,
+                    points_per_unit=None,
+                    metrics=None,
+                    stats=None,
+                    cache=None):
+    """
+    Get the width of a text label in data coordinates.
+
+    Widths are memoized, keyed by the label's text, font size and style,
+    the data-to-pixel scale, and the relevant font settings in
+    ``matplotlib.rcParams``. Hence, each label only needs to be measured
+    once for all axes with the same geometry.
+
+    Parameters
+    ----------
+    label : str
+        Label text. Can contain mathtext.
+    fontsize : float
+        Font size, in points.
+    fontstyle : str
+        Font style, e.g. 'normal' or 'italic'.
+    ax : matplotlib.axes, optional
+        Axes whose data coordinates are used. X axis limits and aspect
+        ratio should be set before calling this function. Required if
+        `metrics` is 'renderer'.
+    points_per_unit : float, optional
+        Length of one data unit along the x axis, in points. Used instead
+        of `ax` if `metrics` is 'textpath'.
+    metrics : {'renderer', 'textpath'}, optional
+        Method used to measure labels. If not specified, use
+        ``LABEL_METRICS``. See ``LABEL_METRICS`` for details.
+    stats : RenderStats, optional
+        If specified, record the number of label measurements and cache
+        hits.
+    cache : object, optional
+        Cache used to memoize widths, such as the one of a ``Renderer``. If
+        not specified, use the module-level cache, whose size is given by
+        ``LABEL_WIDTH_CACHE_SIZE``.
+
+    Returns
+    -------
+    label_width : float
+        Width of the label in data coordinates.
+
+    """
+    if metrics is None:
+        metrics = LABEL_METRICS
+    if metrics=='renderer':
+        if ax is None:
+            raise ValueError("ax should be provided to measure labels with "
+                "the renderer")
+        x0, x1 = ax.transData.transform([(0, 0), (1, 0)])[:, 0]
+        key = ('renderer', label, fontsize, fontstyle, ax.figure.dpi, x1 - x0)
+    elif metrics=='textpath':
+        if points_per_unit is None:
+            if ax is None:
+                raise ValueError("ax or points_per_unit should be provided")
+            x0, x1 = ax.transData.transform([(0, 0), (1, 0)])[:, 0]
+            points_per_unit = (x1 - x0)*72./ax.figure.dpi
+        key = ('textpath', label, fontsize, fontstyle, points_per_unit)
+    else:
+        raise ValueError("metrics {} not recognized".format(metrics))
+    key = key + _font_rc_key()
+    if cache is None:
+        cache = _label_width_cache
+    if stats is not None:
+        stats.count('label_measurements')
+    try:
+        label_width = cache.get(key)
+    except KeyError:
+        if stats is not None:
+            stats.count('label_cache_misses')
+    else:
+        if stats is not None:
+            stats.count('label_cache_hits')
+        return label_width
+
+    if metrics=='renderer':
+        # Method to calculate label_width from "https://stackoverflow.com/\
+        # questions/24581194/matplotlib-text-bounding-box-dimensions"
+        t = ax.text(0,
+                    0,
+                    label,
+                    fontsize=fontsize,
+                    fontstyle=fontstyle)
+        bb = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
+        bb_datacoords = bb.transformed(ax.transData.inverted())
+        label_width = bb_datacoords.width
+        t.remove()
+    else:
+        # Width in points, obtained from the font's glyph metrics. Mathtext
+        # is laid out by matplotlib's mathtext parser.
+        if matplotlib.rcParams['text.usetex']:
+            ismath = 'TeX'
+        else:
+            ismath = matplotlib.cbook.is_math_text(label)
+        prop = matplotlib.font_manager.FontProperties(size=fontsize,
+                                                      style=fontstyle)
+        width, _, _ = matplotlib.textpath.text_to_path.\
+            get_text_width_height_descent(label, prop, ismath=ismath)
+        label_width = width/points_per_unit
+
+    cache.set(key, label_width)
+    return label_width
+
+def label_width_cache_info():
+    """
+    Get statistics of the label width cache used by ``get_label_width()``.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the number of cache ``hits``, ``misses``, and
+        current ``size``.
+
+    """
+    return _label_width_cache.info()
+
+def clear_label_width_cache():
+    """
+    Remove all label widths memoized by ``get_label_width()``.
+
+    """
+    _label_width_cache.clear()
+
 def check_annotation_features(annotation, features):
     """
     Check whether an annotation's features match the specified features.
@@ -125,217 +810,1169 @@ def check_annotation_features(annotation, features):
 
     return match
 
-def plot_sequence(seq=None,
-                  seq_name=None,
-                  start_position=None,
-                  end_position=None,
-                  seq_label=None,
-                  seq_label_pos='left',
-                  glyph_labels={},
-                  ignore_names=[],
-                  cds_split_char='',
-                  cds_colors={},
-                  cds_label_colors={},
-                  chromosomal_locus=None,
-                  chromosomal_locus_pos='left',
-                  ax=None,
-                  ax_x_extent=250,
-                  ax_x_alignment='center',
-                  ax_ylim=(-15, 15),
-                  savefig=None):
+class CompiledMapping(object):
     """
-    Plot a specified benchling sequence as SBOL visual
+    Index of annotation-to-part rules for fast matching of annotations.
+
+    Rules are indexed by the values of their ``type`` and ``name``
+    features, so that matching an annotation only needs to check the rules
+    that could possibly apply to it, instead of every rule in the mapping.
+    As with the original mapping, if an annotation matches several rules,
+    the first one takes precedence.
 
     Parameters
     ----------
-    seq : benchlingclient.DNASequence
-        Sequence to be plotted. Can be omitted if `seq_name` is provided.
-    seq_name : str, optional
-        Name of the sequence to load and plot. Ignored if `seq` is
-        specified.
-    start_position, end_position : int, optional
-        Only annotations in the sequence completely contained by the range
-        given by these two parameters will be plotted.
-    seq_label : str, optional
-        If specified, the text specified in `seq_label` will be added to either
-        the left or right side of the sequence diagram, depending on the
-        contents of `seq_label_pos`.
-    seq_label_pos : {'left', 'right'}, optional
-        Whether to add the label in `seq_label` to the left or right side of
-        the sequence diagram.
-    glyph_labels : dict, optional
-        Dictionary with ``name: label`` pairs that specify a glyph's label,
-        when the label is different than the name. If a part's name is not
-        a key of `glyph_labels`, the name will be used as the glyph's label.
-    ignore_names : list, optional
-        Names of parts that should not be plotted.
-    cds_split_char : str, optionsl
-        If specified, a CDS whose name contains `cds_split_char` as a
-        substring will be split along this substring and shown as a
-        multipart CDS. A multipart CDS looks like a single CDS divided into
-        many fragments, each with its own label and color that can be
-        specified in `glyph_labels`, `cds_colors`, and `cds_label_colors`.
-    cds_colors : dict, optional
-        Dictionary with ``name: color`` pairs that specify a CDS' face
-        color, when the color is different than the one specified by
-        ``RENDER_OPT['CDS']``.
-    cds_label_colors : dict, optional
-        Dictionary with ``name: label_color`` pairs that specify a CDS'
-        label color, when the color is different than the one specified by
-        ``RENDER_OPT['CDS']``.
-    chromosomal_locus : str, optional
-        If specified, a pair of "ChromosomalLocus" glyphs will be added to
-        both sides of the rendered design, and a label with the text given
-        by `chromosomal_locus` on the glyph specified by
-        `chromosomal_locus_pos`.
-    chromosomal_locus_pos : {'left', 'right', 'both', 'none'}, optional
-        Location of the chromosomal locus label.
-    ax : matplotlib.axes, optional
-        Axes to draw into.
-    ax_x_extent : float, optinal
-        Range covered by the x axis limits.
-    ax_x_alignment : {'left', 'center', 'right'}
-        Alignment of the rendered diagram in the x axis.
-    ax_ylim : tuple-like, optional
-        Y axis limits.
-    savefig : str, optional
-        If specified, save figure with a filename given by `savefig`.
-
-    Raises
-    ------
-    ValueError
-        If more than one sequence with the name given by `seq_name` was
-        found.
+    mapping : list
+        List of rules, with the same format as ``ANN_PARTS_MAPPING``.
 
     """
-    # If seq is provided, the following is not executed.
-    # If not, load from seq_name
-    if seq is None:
-        if seq_name is not None:
-            # Load sequence from benchling
-            seq_list = benchlingclient.DNASequence.list_all(name=seq_name)
-            # Test that only one sequence has been found
-            if len(seq_list) > 1:
-                raise ValueError("more than one sequence found with name {}".\
-                    format(seq_name))
-            elif len(seq_list) < 1:
-                raise ValueError("no sequence with name {} found".\
-                    format(seq_name))
-            seq = seq_list[0]
-        else:
-            # No sequence or sequence name provided, raise exception
-            raise ValueError("seq or seq_name should be provided")
+    # Features used to index rules
+    _INDEX_FEATURES = ('type', 'name')
+    # Maximum number of combinations of feature values whose candidate
+    # rules are memoized
+    _CANDIDATES_MAX_SIZE = 4096
 
-    # Get annotations
-    annotations = seq.annotations.copy()
+    def __init__(self, mapping):
+        # Each index maps a tuple of feature values to a list of
+        # ``(rule_index, remaining_features, part)`` tuples, sorted by
+        # rule index. Keys in ``_indices`` are tuples of indexed feature
+        # names.
+        self._indices = {}
+        for rule_index, rule in enumerate(mapping):
+            features = rule['annotation']
+            index_features = tuple(f for f in self._INDEX_FEATURES
+                                   if f in features)
+            index_values = tuple(features[f] for f in index_features)
+            try:
+                hash(index_values)
+            except TypeError:
+                # Unhashable values cannot be indexed, check them linearly
+                index_features = ()
+                index_values = ()
+            remaining_features = {k: v for k, v in features.items()
+                                  if k not in index_features}
+            index = self._indices.setdefault(index_features, {})
+            index.setdefault(index_values, []).append(
+                (rule_index, remaining_features, rule['part']))
+        # Annotation names only affect the candidate rules if some rule
+        # specifies a name, and only for the types used by such rules.
+        self._name_indexed = bool(self._indices.get(('name',)))
+        self._name_indexed_types = set(
+            values[0] for values in self._indices.get(('type', 'name'), {}))
+        # Candidate rules for each combination of indexed feature values
+        # that can affect them. Populated as annotations are matched.
+        self._candidates = _LRUCache(self._CANDIDATES_MAX_SIZE)
 
-    # Remove annotations outside of range specified
-    if start_position is None:
-        start_position = 0
-    if end_position is None:
-        end_position = seq.length - 1
-    annotations_filtered = []
-    for annotation in annotations:
-        if (annotation.start >= start_position) and \
-                (annotation.end <= end_position):
-            annotations_filtered.append(annotation)
-    annotations = annotations_filtered
+    def __getstate__(self):
+        # The memoized candidates are not copied to other processes
+        state = self.__dict__.copy()
+        del state['_candidates']
+        return state
 
-    # Sort by start position
-    annotations = sorted(annotations, key=lambda x: x.start)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._candidates = _LRUCache(self._CANDIDATES_MAX_SIZE)
 
-    # Initialize plot
-    if ax is None:
-        fig, ax = pyplot.subplots()
-    # Set axis limits and aspect right away
-    # This allows for a more precise estimation of label widths later on
-    ax.set_xlim((0, ax_x_extent))
-    ax.set_ylim(ax_ylim)
-    ax.set_aspect('equal')
-    
-    # Iterate and extract parts to be plotted
-    parts = []
-    for annotation in annotations:
-        # Iterate through mapping and select appropriate part type
-        match = False
-        for mapping in ANN_PARTS_MAPPING:
-            if check_annotation_features(annotation, mapping['annotation']):
-                match = True
-                break
-        # Only add part if matching part has been found
-        if match:
-            part_type = mapping['part']
-            part_name = annotation.name
-            # Part will be split if type is CDS and a cds_split_char has been
-            # specified.
-            # All resulting parts, but the last one, will be given the temporary
-            # part type "CDSFragment". This is so arrowheads and padding are
-            # modified later to make a continuous multipart CDS glyph.
-            if cds_split_char and mapping['part']=='CDS':
-                part_names = part_name.split(cds_split_char)
-                # Remove parts flagged to be ignored
-                part_names = [p for p in part_names if p not in ignore_names]
-                if len(part_names)==0:
-                    continue
-                # Reverse if orientation is reverse
-                if annotation.strand==-1:
-                    part_names = part_names[::-1]
-                for part_index, part_name in enumerate(part_names):
-                    # Define new part
-                    part = {}
-                    if annotation.strand==-1:
-                        if part_index <= 0:
-                            part['type'] = 'CDS'
-                        else:
-                            part['type'] = 'CDSFragment'
-                    else:
-                        if part_index < (len(part_names) - 1):
-                            part['type'] = 'CDSFragment'
-                        else:
-                            part['type'] = 'CDS'
-                    part['name'] = part_name
-                    # Orientation ('fwd') will be False if the reverse strand is
-                    # explicitly specified in the annotation, True if any other
-                    # value, not specified if None.
-                    if annotation.strand is not None:
-                        part['fwd'] = not (annotation.strand==-1)
-                    # Save part
-                    parts.append(part)
-            else:
-                # Check if part name is flagged to be ignored
-                if part_name in ignore_names:
-                    continue
-                # Define new part
-                part  = {}
-                part['type'] = part_type
-                part['name'] = part_name
-                # Orientation ('fwd') will be False if the reverse strand is
-                # explicitly specified in the annotation, True if any other
-                # value, not specified if None.
-                if annotation.strand is not None:
-                    part['fwd'] = not (annotation.strand==-1)
-                # Save part
-                parts.append(part)
+    def _get_candidates(self, annotation):
+        """
+        Get rules that could match an annotation, sorted by rule index.
 
-    # Construct plotting options for each part
-    for part_index, part in enumerate(parts):
-        # Initialize dictionary with rendering options
+        """
+        values = tuple(getattr(annotation, f, None)
+                       for f in self._INDEX_FEATURES)
+        return self._get_candidates_for_values(values)
+
+    def _get_candidates_for_values(self, values):
+        """
+        Get rules that could match annotations with the specified values
+        of the indexed features, sorted by rule index.
+
+        """
+        type_value, name_value = values
+        try:
+            if not (self._name_indexed or
+                    type_value in self._name_indexed_types):
+                # The name cannot affect the candidates, memoize per type
+                values = (type_value, None)
+            return self._candidates.get(values)
+        except KeyError:
+            memoize = True
+        except TypeError:
+            # Unhashable annotation features
+            memoize = False
+        feature_values = dict(zip(self._INDEX_FEATURES, values))
+        candidates = []
+        for index_features, index in self._indices.items():
+            key = tuple(feature_values[f] for f in index_features)
+            try:
+                candidates.extend(index.get(key, []))
+            except TypeError:
+                # Unhashable annotation features cannot match indexed rules
+                continue
+        candidates.sort(key=lambda c: c[0])
+        if memoize:
+            self._candidates.set(values, candidates)
+        return candidates
+
+    def match(self, annotation):
+        """
+        Get the part type that represents an annotation.
+
+        Parameters
+        ----------
+        annotation : benchlingclient.Annotation
+            Annotation to match.
+
+        Returns
+        -------
+        part : str or None
+            Part type given by the first matching rule, or None if no rule
+            matches the annotation.
+
+        """
+        for rule_index, features, part in self._get_candidates(annotation):
+            if check_annotation_features(annotation, features):
+                return part
+        return None
+
+    def match_values(self, values):
+        """
+        Get the part type for annotations with the given indexed features.
+
+        Parameters
+        ----------
+        values : tuple
+            Values of the annotation features ``type`` and ``name``.
+
+        Returns
+        -------
+        part : str or None
+            Part type given by the first matching rule, or None if no rule
+            can match annotations with these values.
+        exact : bool
+            Whether `part` applies to every annotation with these values.
+            If False, the first candidate rule checks other features, and
+            each annotation has to be matched with ``match()``.
+
+        """
+        candidates = self._get_candidates_for_values(values)
+        if not candidates:
+            return None, True
+        rule_index, features, part = candidates[0]
+        if features:
+            return None, False
+        return part, True
+
+# Compiled versions of the mappings used most recently
+_compiled_mapping_cache = _LRUCache(8)
+
+def _mapping_key(mapping):
+    """
+    Get a hashable key that changes whenever a mapping's rules change.
+
+    """
+    key = tuple((tuple(sorted(rule['annotation'].items())), rule['part'])
+                for rule in mapping)
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+def compile_mapping(mapping=None):
+    """
+    Compile an annotation-to-part mapping into a ``CompiledMapping``.
+
+    Compiled mappings are cached, and reused until the mapping's rules
+    change. Hence, rules can be freely added or modified in
+    ``ANN_PARTS_MAPPING`` between calls.
+
+    Parameters
+    ----------
+    mapping : list or CompiledMapping, optional
+        List of rules, with the same format as ``ANN_PARTS_MAPPING``. If
+        not specified, use ``ANN_PARTS_MAPPING``. If already compiled, it is
+        returned as is.
+
+    Returns
+    -------
+    compiled_mapping : CompiledMapping
+        Compiled mapping.
+
+    """
+    if mapping is None:
+        mapping = ANN_PARTS_MAPPING
+    elif isinstance(mapping, CompiledMapping):
+        return mapping
+    key = _mapping_key(mapping)
+    try:
+        return _compiled_mapping_cache.get(key)
+    except KeyError:
+        pass
+    compiled_mapping = CompiledMapping(mapping)
+    _compiled_mapping_cache.set(key, compiled_mapping)
+    return compiled_mapping
+
+def match_annotation(annotation, mapping=None):
+    """
+    Get the part type that represents an annotation.
+
+    To match many annotations, it is faster to call ``compile_mapping()``
+    once and use the ``match()`` method of the resulting object.
+
+    Parameters
+    ----------
+    annotation : benchlingclient.Annotation
+        Annotation to match.
+    mapping : list, optional
+        List of rules, with the same format as ``ANN_PARTS_MAPPING``. If
+        not specified, use ``ANN_PARTS_MAPPING``.
+
+    Returns
+    -------
+    part : str or None
+        Part type given by the first matching rule in `mapping`, or None if
+        no rule matches the annotation.
+
+    """
+    return compile_mapping(mapping).match(annotation)
+
+# Style of one part type, compiled from ``RENDER_OPT``. ``items`` is a
+# tuple of ``(option, value, dynamic)`` tuples in the original order, where
+# ``dynamic`` indicates that the value is a function of the label width.
+# ``static`` is a read-only dictionary with the options that are not
+# dynamic. ``label_size`` and ``label_style`` are used to measure labels.
+_PartStyle = collections.namedtuple('_PartStyle', ['items',
+                                                   'static',
+                                                   'label_size',
+                                                   'label_style'])
+
+class CompiledStyles(object):
+    """
+    Rendering options compiled into immutable per-part-type style tables.
+
+    Options of "CDSFragment" are merged with the ones of "CDS" once, options
+    that are functions of the label width are marked as such, and static
+    options are copied so that later changes to the original dictionaries
+    do not affect the compiled styles. Compiled styles are never modified,
+    and can be shared by several threads.
+
+    Parameters
+    ----------
+    render_opt : dict
+        Rendering options, with the same format as ``RENDER_OPT``.
+
+    """
+    def __init__(self, render_opt):
+        all_opts = dict(render_opt)
+        # CDSFragment combines options from 'CDS' and 'CDSFragment', with the
+        # latter taking precedence.
+        fragment_opts = dict(render_opt.get('CDSFragment', {}))
+        for k, v in render_opt.get('CDS', {}).items():
+            if k not in fragment_opts:
+                fragment_opts[k] = v
+        all_opts['CDSFragment'] = fragment_opts
+        self._styles = {part_type: self._compile(opts)
+                        for part_type, opts in all_opts.items()}
+        self._empty_style = self._compile({})
+
+    @staticmethod
+    def _compile(opts):
+        items = tuple((k, v if callable(v) else copy.deepcopy(v), callable(v))
+                      for k, v in opts.items())
+        static = types.MappingProxyType(
+            {k: v for k, v, dynamic in items if not dynamic})
+        return _PartStyle(items=items,
+                          static=static,
+                          label_size=static.get('label_size', 7),
+                          label_style=static.get('label_style', 'normal'))
+
+    def get(self, part_type):
+        """
+        Get the compiled style of a part type.
+
+        Parameters
+        ----------
+        part_type : str
+            Part type, or "CDSFragment".
+
+        Returns
+        -------
+        style : _PartStyle
+            Compiled style. If `part_type` has no rendering options, the
+            style is empty.
+
+        """
+        return self._styles.get(part_type, self._empty_style)
+
+    def options(self, part_type):
+        """
+        Get a new dictionary with all rendering options of a part type.
+
+        """
+        return {k: v for k, v, _ in self.get(part_type).items}
+
+# Compiled versions of the rendering options used most recently
+_compiled_styles_cache = _LRUCache(8)
+
+def _render_opt_key(render_opt):
+    """
+    Get a hashable key that changes whenever rendering options change.
+
+    Functions are compared by identity.
+
+    """
+    key = []
+    for part_type, opts in render_opt.items():
+        values = []
+        for k, v in opts.items():
+            try:
+                hash(v)
+            except TypeError:
+                v = repr(v)
+            values.append((k, v))
+        key.append((part_type, tuple(values)))
+    return tuple(key)
+
+def compile_styles(render_opt=None):
+    """
+    Compile rendering options into a ``CompiledStyles`` object.
+
+    Compiled styles are cached, and reused until the rendering options
+    change. Hence, options can be freely added or modified in
+    ``RENDER_OPT`` between calls.
+
+    Parameters
+    ----------
+    render_opt : dict or CompiledStyles, optional
+        Rendering options, with the same format as ``RENDER_OPT``. If not
+        specified, use ``RENDER_OPT``. If already compiled, they are
+        returned as is.
+
+    Returns
+    -------
+    compiled_styles : CompiledStyles
+        Compiled rendering options.
+
+    """
+    if render_opt is None:
+        render_opt = RENDER_OPT
+    elif isinstance(render_opt, CompiledStyles):
+        return render_opt
+    key = _render_opt_key(render_opt)
+    try:
+        return _compiled_styles_cache.get(key)
+    except KeyError:
+        pass
+    compiled_styles = CompiledStyles(render_opt)
+    _compiled_styles_cache.set(key, compiled_styles)
+    return compiled_styles
+
+# Clients that could not load partial sequences, or that ignore the
+# ``returning`` parameter and always load complete sequences
+_partial_fetch_unsupported = weakref.WeakSet()
+
+# Fields requested from benchling to check whether sequences were modified
+_METADATA_FIELDS = ['id', 'name', 'modifiedAt']
+
+def _has_sequence_content(seq, fields):
+    """
+    Check whether a listed sequence has values for content fields.
+
+    Model objects can have default attributes for fields that were not
+    returned, so an empty list of annotations or a missing length do not
+    count as values.
+
+    """
+    for field in fields:
+        value = getattr(seq, field, None)
+        if field=='length':
+            if not value:
+                return False
+            bases = getattr(seq, 'bases', None)
+            if bases and (len(bases)!=value):
+                return False
+        elif not value:
+            return False
+    return True
+
+def _is_complete_sequence(client, seq, query):
+    """
+    Check whether a listed sequence matches its complete record.
+
+    The complete record is requested from benchling by name, restricted to
+    `query`, and compared by ID, length, and number of annotations.
+
+    """
+    seq_id = getattr(seq, 'id', None)
+    query = dict(query, name=seq.name)
+    for complete_seq in client.DNASequence.list_all(**query):
+        if getattr(complete_seq, 'id', None)==seq_id:
+            n_annotations = len(getattr(seq, 'annotations', None) or [])
+            n_complete_annotations = \
+                len(getattr(complete_seq, 'annotations', None) or [])
+            return (getattr(seq, 'length', None)==
+                        getattr(complete_seq, 'length', None)) and \
+                (n_annotations==n_complete_annotations)
+    return False
+
+def _list_sequences(client, fields=None, **query):
+    """
+    List sequences from benchling, only requesting some fields.
+
+    If `client` does not accept the ``returning`` parameter, or returns
+    sequences without annotations or lengths when these were requested,
+    complete sequences are requested instead, now and in later calls with
+    the same client. If `client` accepts ``returning`` but ignores it, the
+    complete sequences returned are used, and the client is remembered so
+    that ``_load_listed_sequence()`` does not download them again. This is
+    suspected when sequences have lengths or annotations that were not
+    requested, and confirmed by comparing the first sequence listed with
+    its complete record. If the request fails for any other reason, a
+    warning is issued and complete sequences are requested.
+
+    Parameters
+    ----------
+    client : module or object
+        Object exposing a ``DNASequence.list_all()`` method.
+    fields : list of str, optional
+        Fields to request. If not specified, use ``SEQUENCE_FIELDS``.
+
+    Other parameters
+    ----------------
+    Any other keyword argument is passed to ``DNASequence.list_all()``.
+
+    Returns
+    -------
+    seqs : list of benchlingclient.DNASequence
+        Sequences matching the query.
+
+    """
+    if fields is None:
+        fields = SEQUENCE_FIELDS
+    if fields and (client not in _partial_fetch_unsupported):
+        returning = ','.join('dnaSequences.' + field for field in fields)
+        try:
+            seqs = client.DNASequence.list_all(returning=returning, **query)
+        except (TypeError, KeyError, AttributeError):
+            # The client does not support partial sequences
+            pass
+        except Exception as e:
+            # Other errors may be transient. Try again with a complete
+            # request, which will raise the error if it persists.
+            warnings.warn("listing sequences with returning={!r} failed "
+                          "({}: {}), requesting complete sequences".format(
+                              returning, type(e).__name__, e))
+            return client.DNASequence.list_all(**query)
+        else:
+            required = [field for field in ['annotations', 'length']
+                        if field in fields]
+            unrequested = [field for field in ['annotations', 'length']
+                           if field not in fields]
+            if unrequested and seqs and \
+                    _has_sequence_content(seqs[0], unrequested) and \
+                    _is_complete_sequence(client, seqs[0], query):
+                # The client ignored ``returning``
+                _partial_fetch_unsupported.add(client)
+                return seqs
+            if all(hasattr(seq, field)
+                   for seq in seqs
+                   for field in required):
+                return seqs
+        _partial_fetch_unsupported.add(client)
+    return client.DNASequence.list_all(**query)
+
+def _client_key(client):
+    """
+    Get a string that identifies a benchling client and account.
+
+    The account is identified by a hash of the client's ``LOGIN_KEY``, if
+    any.
+
+    """
+    if isinstance(client, (types.ModuleType, _LazyModule)):
+        name = client.__name__
+    else:
+        name = '{}.{}'.format(type(client).__module__,
+                              type(client).__qualname__)
+    login_key = getattr(client, 'LOGIN_KEY', None)
+    if login_key is None:
+        return name
+    account = hashlib.sha256(str(login_key).encode('utf-8')).hexdigest()
+    return '{}:{}'.format(name, account[:16])
+
+def _sequence_cache_key(seq_name, client):
+    """
+    Get the key of a sequence in the sequence cache.
+
+    Keys include the client and account (see ``_client_key()``), so that
+    sequences from different benchling accounts or fake clients are not
+    mixed, and ``SEQUENCE_FIELDS``, so that sequences loaded with different
+    fields are cached separately.
+
+    """
+    if SEQUENCE_FIELDS:
+        fields = ','.join(SEQUENCE_FIELDS)
+    else:
+        fields = '*'
+    return '{}\n{}\n{}'.format(_client_key(client), seq_name, fields)
+
+def _is_cache_entry_unmodified(client, seq_name, cache_entry):
+    """
+    Check whether a sequence in the sequence cache was modified in benchling.
+
+    The cached modification timestamp is compared with the one in benchling,
+    obtained with a query that only requests ``_METADATA_FIELDS``. Return
+    False if the timestamp cannot be compared, e.g. because the query fails
+    or the sequence has no timestamp.
+
+    """
+    if cache_entry['modified_at'] is None:
+        return False
+    try:
+        seq_list = _list_sequences(client,
+                                   fields=_METADATA_FIELDS,
+                                   name=seq_name)
+    except Exception:
+        # Fetch the sequence again, which raises the appropriate error if
+        # benchling cannot be reached
+        return False
+    if len(seq_list)!=1:
+        # Fetch the sequence again, which raises the appropriate error if
+        # the sequence was deleted or renamed
+        return False
+    modified_at = _get_modified_at(seq_list[0])
+    return (modified_at is not None) and \
+        (modified_at==cache_entry['modified_at'])
+
+def load_sequence(seq_name, client=None, refresh=False, stats=None):
+    """
+    Load a single sequence from benchling by name.
+
+    If a sequence cache has been configured via ``SEQUENCE_CACHE_DIR``, the
+    sequence is taken from the cache without accessing benchling if it was
+    fetched or checked less than ``SEQUENCE_CACHE_TTL`` seconds ago. Older
+    cached sequences are used if their modification timestamp in benchling
+    has not changed, which is checked with a query that does not download
+    the sequence. Otherwise, the sequence is fetched from benchling and
+    stored in the cache.
+
+    Only the fields in ``SEQUENCE_FIELDS`` are requested from benchling.
+    In particular, sequence bases are not loaded by default.
+
+    Parameters
+    ----------
+    seq_name : str
+        Name of the sequence to load.
+    client : module or object, optional
+        Object exposing a ``DNASequence.list_all()`` method, used to query
+        benchling. If not specified, use ``benchlingclient``. This can be
+        used to load sequences from a local fake client.
+    refresh : bool, optional
+        If True, fetch the sequence from benchling even if an up-to-date
+        copy is present in the sequence cache.
+    stats : RenderStats, optional
+        If specified, record sequence cache hits and misses.
+
+    Returns
+    -------
+    seq : benchlingclient.DNASequence
+        Loaded sequence.
+
+    Raises
+    ------
+    ValueError
+        If no sequence or more than one sequence with the name given by
+        `seq_name` was found.
+
+    """
+    if client is None:
+        client = benchlingclient
+
+    # Attempt to load from the cache
+    cache = _get_sequence_cache()
+    cache_key = _sequence_cache_key(seq_name, client)
+    cache_entry = None
+    if (cache is not None) and (not refresh):
+        try:
+            cache_entry = cache.get(cache_key)
+        except KeyError:
+            pass
+    if cache_entry is not None:
+        current = time.time() - cache_entry['fetched_at'] < SEQUENCE_CACHE_TTL
+        if not current:
+            if stats is not None:
+                stats.count('sequence_cache_revalidations')
+            current = _is_cache_entry_unmodified(client, seq_name, cache_entry)
+            if current:
+                # Use the cached sequence without checking for another
+                # SEQUENCE_CACHE_TTL seconds
+                cache.set(cache_key, dict(cache_entry, fetched_at=time.time()))
+        if current:
+            if stats is not None:
+                stats.count('sequence_cache_hits')
+            return cache_entry['seq']
+    if (cache is not None) and (stats is not None):
+        stats.count('sequence_cache_misses')
+
+    # Load sequence from benchling
+    seq_list = _list_sequences(client, name=seq_name)
+    # Test that only one sequence has been found
+    if len(seq_list) > 1:
+        raise ValueError("more than one sequence found with name {}".\
+            format(seq_name))
+    elif len(seq_list) < 1:
+        raise ValueError("no sequence with name {} found".\
+            format(seq_name))
+    seq = seq_list[0]
+
+    # Save into the cache
+    if cache is not None:
+        cache.set(cache_key, {'seq': seq,
+                              'modified_at': _get_modified_at(seq),
+                              'fetched_at': time.time()})
+
+    return seq
+
+def load_sequences(seq_names,
+                   max_workers=8,
+                   client=None,
+                   refresh=False,
+                   stats=None):
+    """
+    Load many sequences from benchling by name, concurrently.
+
+    Each name is resolved in a separate request via ``load_sequence()``,
+    and up to `max_workers` requests are in flight at the same time. Hence,
+    the total loading time is roughly given by the slowest requests instead
+    of by the sum of all of them. Names that appear more than once are only
+    requested once.
+
+    Parameters
+    ----------
+    seq_names : list of str
+        Names of the sequences to load.
+    max_workers : int, optional
+        Maximum number of concurrent requests. If 1, sequences are loaded
+        one after the other in the calling thread.
+    client : module or object, optional
+        Object exposing a ``DNASequence.list_all()`` method, used to query
+        benchling. If not specified, use ``benchlingclient``.
+    refresh : bool, optional
+        If True, fetch all sequences from benchling even if fresh copies are
+        present in the sequence cache.
+    stats : RenderStats, optional
+        If specified, record sequence cache hits and misses.
+
+    Returns
+    -------
+    seqs : list of benchlingclient.DNASequence
+        Loaded sequences, in the same order as `seq_names`.
+
+    Raises
+    ------
+    ValueError
+        If no sequence or more than one sequence was found for any of the
+        names in `seq_names`. If this happens for several names, the
+        exception corresponds to the first one in `seq_names`.
+
+    """
+    seq_names = list(seq_names)
+    # Unique names, keeping the original order
+    unique_names = list(dict.fromkeys(seq_names))
+
+    if (max_workers is None or max_workers > 1) and len(unique_names) > 1:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers) as executor:
+            # ``map()`` returns results in order, and reraises the exception
+            # of the first failed request.
+            unique_seqs = list(executor.map(
+                lambda seq_name: load_sequence(seq_name,
+                                               client=client,
+                                               refresh=refresh,
+                                               stats=stats),
+                unique_names))
+    else:
+        unique_seqs = [load_sequence(seq_name,
+                                     client=client,
+                                     refresh=refresh,
+                                     stats=stats)
+                       for seq_name in unique_names]
+
+    seqs_by_name = dict(zip(unique_names, unique_seqs))
+    return [seqs_by_name[seq_name] for seq_name in seq_names]
+
+def warm_sequence_cache(seq_names, max_workers=8, client=None):
+    """
+    Fetch sequences from benchling and store them in the sequence cache.
+
+    This is intended to be run periodically (e.g. nightly), so that later
+    calls to ``plot_sequence()`` and ``plot_sequences()`` do not need to
+    access the network for ``SEQUENCE_CACHE_TTL`` seconds. Sequences already
+    in the cache are only fetched again if they were modified.
+
+    Parameters
+    ----------
+    seq_names : list of str
+        Names of the sequences to fetch.
+    max_workers : int, optional
+        Maximum number of concurrent requests.
+    client : module or object, optional
+        Object exposing a ``DNASequence.list_all()`` method, used to query
+        benchling. If not specified, use ``benchlingclient``.
+
+    Raises
+    ------
+    ValueError
+        If the sequence cache is not enabled, or if no sequence or more than
+        one sequence was found for any of the names in `seq_names`.
+
+    """
+    if SEQUENCE_CACHE_DIR is None:
+        raise ValueError("sequence cache not enabled, set SEQUENCE_CACHE_DIR")
+    load_sequences(seq_names,
+                   max_workers=max_workers,
+                   client=client)
+
+class AnnotationTable(object):
+    """
+    Columnar representation of a sequence's annotations.
+
+    Annotation coordinates, types and names are stored in NumPy
+    arrays, sorted by start position, so that selecting annotations within
+    a range and mapping them to part types are vectorized operations. Types
+    and names are interned, and stored as integer codes. The original
+    annotation objects are kept, and are only accessed for annotations that
+    end up being drawn.
+
+    Parameters
+    ----------
+    annotations : list of benchlingclient.Annotation
+        Annotations to store.
+
+    Attributes
+    ----------
+    annotations : list of benchlingclient.Annotation
+        Annotations, sorted by start position. Annotations with the same
+        start position keep their original order.
+    start, end : numpy.ndarray
+        Start and end positions of each annotation.
+    type_codes, name_codes : numpy.ndarray
+        Index of each annotation's type and name in `types` and `names`.
+    types, names : list
+        Unique annotation types and names.
+
+    """
+    def __init__(self, annotations):
+        n = len(annotations)
+        start = numpy.fromiter((a.start for a in annotations),
+                               dtype=numpy.int64, count=n)
+        end = numpy.fromiter((a.end for a in annotations),
+                             dtype=numpy.int64, count=n)
+        # A stable sort keeps annotations with the same start in order
+        order = numpy.argsort(start, kind='stable')
+        self.annotations = [annotations[i] for i in order]
+        self.start = start[order]
+        self.end = end[order]
+        self.types, self.type_codes = self._intern(
+            [getattr(a, 'type', None) for a in self.annotations])
+        self.names, self.name_codes = self._intern(
+            [getattr(a, 'name', None) for a in self.annotations])
+        # Annotations that end before they start
+        self._wrapped = numpy.flatnonzero(self.end < self.start)
+        # Part type codes for each compiled mapping used with this table
+        self._part_codes = weakref.WeakKeyDictionary()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_part_codes']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._part_codes = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _intern(values):
+        """
+        Get the unique values of a list, and the index of each element.
+
+        """
+        unique = []
+        unique_index = {}
+        codes = numpy.empty(len(values), dtype=numpy.int32)
+        for i, value in enumerate(values):
+            try:
+                code = unique_index[value]
+            except KeyError:
+                code = unique_index[value] = len(unique)
+                unique.append(value)
+            except TypeError:
+                # Unhashable values are not interned
+                code = len(unique)
+                unique.append(value)
+            codes[i] = code
+        return unique, codes
+
+    def __len__(self):
+        return len(self.annotations)
+
+    def select(self, start_position=None, end_position=None):
+        """
+        Get the indices of annotations contained in a range.
+
+        Parameters
+        ----------
+        start_position, end_position : int, optional
+            Only annotations completely contained by the range given by
+            these two parameters are selected. If not specified, the range
+            is unbounded on the corresponding side.
+
+        Returns
+        -------
+        indices : numpy.ndarray
+            Indices of the selected annotations, in increasing order.
+
+        """
+        # Annotations are sorted by start position, so those that start
+        # within the range are found by binary search. Of these, only the
+        # ones that also end within the range are selected. Annotations that
+        # end before they start (e.g. across the origin of a circular
+        # sequence) are checked separately.
+        if start_position is None:
+            lo = 0
+        else:
+            lo = numpy.searchsorted(self.start, start_position, side='left')
+        if end_position is None:
+            hi = len(self)
+        else:
+            hi = numpy.searchsorted(self.start, end_position, side='right')
+        indices = numpy.arange(lo, hi)
+        if end_position is not None:
+            indices = indices[self.end[lo:hi] <= end_position]
+        if len(self._wrapped):
+            wrapped = self._wrapped
+            if start_position is not None:
+                wrapped = wrapped[self.start[wrapped] >= start_position]
+            if end_position is not None:
+                wrapped = wrapped[self.end[wrapped] <= end_position]
+            indices = numpy.union1d(indices, wrapped)
+        return indices
+
+    def part_types(self, compiled_mapping):
+        """
+        Get the part type of every annotation according to a mapping.
+
+        Rules are evaluated once per unique combination of annotation type
+        and name. Annotations are only matched individually if the first
+        rule that could apply to them checks other features.
+
+        Parameters
+        ----------
+        compiled_mapping : CompiledMapping
+            Mapping used to obtain part types.
+
+        Returns
+        -------
+        part_types : list
+            Unique part types.
+        part_codes : numpy.ndarray
+            Index of each annotation's part type in `part_types`, or -1 if
+            the annotation is not represented by any part.
+
+        """
+        try:
+            return self._part_codes[compiled_mapping]
+        except KeyError:
+            pass
+        part_types = []
+        part_type_index = {}
+        def get_code(part):
+            if part is None:
+                return -1
+            if part not in part_type_index:
+                part_type_index[part] = len(part_types)
+                part_types.append(part)
+            return part_type_index[part]
+
+        # Combinations of type and name codes present in this table
+        pair_codes = self.type_codes.astype(numpy.int64)*len(self.names) + \
+            self.name_codes
+        unique_pair_codes, pair_inverse = numpy.unique(pair_codes,
+                                                       return_inverse=True)
+        pair_inverse = pair_inverse.ravel()
+        # Part code of each combination, or -2 if annotations with that
+        # combination need to be matched individually
+        pair_part_codes = numpy.empty(len(unique_pair_codes),
+                                      dtype=numpy.int32)
+        for pair_index, pair_code in enumerate(unique_pair_codes.tolist()):
+            values = (self.types[pair_code // len(self.names)],
+                      self.names[pair_code % len(self.names)])
+            part, exact = compiled_mapping.match_values(values)
+            pair_part_codes[pair_index] = get_code(part) if exact else -2
+        part_codes = pair_part_codes[pair_inverse]
+        for i in numpy.flatnonzero(part_codes==-2).tolist():
+            part_codes[i] = get_code(
+                compiled_mapping.match(self.annotations[i]))
+
+        result = (part_types, part_codes)
+        self._part_codes[compiled_mapping] = result
+        return result
+
+class IndexedSequence(object):
+    """
+    Sequence with an index of its annotations, for rendering many windows.
+
+    Annotations are sorted by start position once, so that finding the
+    annotations within a range takes logarithmic time, plus the number of
+    annotations starting within it. An ``IndexedSequence`` can be used
+    anywhere a sequence is accepted, e.g. as the `seq` argument of
+    ``plot_sequence()``. All other attributes are taken from the wrapped
+    sequence.
+
+    Parameters
+    ----------
+    seq : benchlingclient.DNASequence
+        Sequence to index.
+
+    Attributes
+    ----------
+    seq : benchlingclient.DNASequence
+        Wrapped sequence.
+    table : AnnotationTable
+        Index of the sequence's annotations.
+
+    Examples
+    --------
+    >>> genome = IndexedSequence(load_sequence('genome'))
+    >>> for start in range(0, genome.length, 10000):
+    ...     plot_sequence(seq=genome,
+    ...                   start_position=start,
+    ...                   end_position=start + 10000,
+    ...                   savefig='window_{}.png'.format(start))
+
+    """
+    def __init__(self, seq):
+        self.seq = seq
+        self.table = AnnotationTable(seq.annotations)
+
+    def __getattr__(self, name):
+        # Guard against recursion while unpickling, before seq is set
+        if name.startswith('__') or name=='seq':
+            raise AttributeError(name)
+        return getattr(self.seq, name)
+
+    @property
+    def annotations(self):
+        return self.table.annotations
+
+    def select(self, start_position=None, end_position=None):
+        """
+        Get the annotations contained in a range, sorted by start position.
+
+        Parameters
+        ----------
+        start_position, end_position : int, optional
+            Only annotations completely contained by the range given by
+            these two parameters are returned. If not specified, the range
+            is unbounded on the corresponding side.
+
+        Returns
+        -------
+        annotations : list of benchlingclient.Annotation
+            Selected annotations.
+
+        """
+        return [self.table.annotations[i]
+                for i in self.table.select(start_position, end_position)]
+
+    def __repr__(self):
+        return 'IndexedSequence({!r})'.format(self.seq)
+
+# Annotation tables of recently used sequences
+_annotation_tables = weakref.WeakKeyDictionary()
+_annotation_tables_lock = threading.Lock()
+
+def get_annotation_table(seq):
+    """
+    Get the columnar representation of a sequence's annotations.
+
+    Tables are built once per sequence object and reused for as long as the
+    sequence exists and its list of annotations is not replaced or resized.
+    The table of an ``IndexedSequence`` is built when it is created.
+
+    Parameters
+    ----------
+    seq : benchlingclient.DNASequence or IndexedSequence
+        Sequence whose annotations will be converted.
+
+    Returns
+    -------
+    table : AnnotationTable
+        Annotations of `seq`.
+
+    """
+    if isinstance(seq, IndexedSequence):
+        return seq.table
+    annotations = seq.annotations
+    try:
+        with _annotation_tables_lock:
+            source, table = _annotation_tables[seq]
+        if source is annotations and len(table)==len(annotations):
+            return table
+    except KeyError:
+        pass
+    except TypeError:
+        # Sequence cannot be weakly referenced, do not cache its table
+        return AnnotationTable(annotations)
+    table = AnnotationTable(annotations)
+    with _annotation_tables_lock:
+        _annotation_tables[seq] = (annotations, table)
+    return table
+
+def _select_annotations(seq, start_position=None, end_position=None):
+    """
+    Get a sequence's annotations within a range, sorted by start position.
+
+    Parameters
+    ----------
+    seq : benchlingclient.DNASequence
+        Sequence whose annotations will be selected.
+    start_position, end_position : int, optional
+        Only annotations completely contained by the range given by these
+        two parameters will be returned. If not specified, the range covers
+        the whole sequence.
+
+    Returns
+    -------
+    annotations : list of benchlingclient.Annotation
+        Selected annotations.
+
+    """
+    table = get_annotation_table(seq)
+    if start_position is None:
+        start_position = 0
+    if end_position is None:
+        end_position = seq.length - 1
+    return [table.annotations[i]
+            for i in table.select(start_position, end_position)]
+
+def _annotation_to_parts(annotation,
+                         part_type,
+                         ignore_names=[],
+                         cds_split_char=''):
+    """
+    Get the parts that represent an annotation.
+
+    Parameters
+    ----------
+    annotation : benchlingclient.Annotation
+        Annotation to convert.
+    part_type : str
+        Part type that represents `annotation`, as given by the
+        annotation-to-part mapping.
+    ignore_names, cds_split_char
+        See ``plot_sequence()``.
+
+    Returns
+    -------
+    parts : list of dict
+        Parts with keys ``type``, ``name`` and, if the annotation's strand
+        is known, ``fwd``. Fragments of a split CDS have the temporary type
+        "CDSFragment".
+
+    """
+    parts = []
+    part_name = annotation.name
+    # Part will be split if type is CDS and a cds_split_char has been
+    # specified.
+    # All resulting parts, but the last one, will be given the temporary
+    # part type "CDSFragment". This is so arrowheads and padding are
+    # modified later to make a continuous multipart CDS glyph.
+    if cds_split_char and part_type=='CDS':
+        part_names = part_name.split(cds_split_char)
+        # Remove parts flagged to be ignored
+        part_names = [p for p in part_names if p not in ignore_names]
+        if len(part_names)==0:
+            return parts
+        # Reverse if orientation is reverse
+        if annotation.strand==-1:
+            part_names = part_names[::-1]
+        for part_index, part_name in enumerate(part_names):
+            # Define new part
+            part = {}
+            if annotation.strand==-1:
+                if part_index <= 0:
+                    part['type'] = 'CDS'
+                else:
+                    part['type'] = 'CDSFragment'
+            else:
+                if part_index < (len(part_names) - 1):
+                    part['type'] = 'CDSFragment'
+                else:
+                    part['type'] = 'CDS'
+            part['name'] = part_name
+            # Orientation ('fwd') will be False if the reverse strand is
+            # explicitly specified in the annotation, True if any other
+            # value, not specified if None.
+            if annotation.strand is not None:
+                part['fwd'] = not (annotation.strand==-1)
+            # Save part
+            parts.append(part)
+    else:
+        # Check if part name is flagged to be ignored
+        if part_name in ignore_names:
+            return parts
+        # Define new part
+        part  = {}
+        part['type'] = part_type
+        part['name'] = part_name
+        # Orientation ('fwd') will be False if the reverse strand is
+        # explicitly specified in the annotation, True if any other
+        # value, not specified if None.
+        if annotation.strand is not None:
+            part['fwd'] = not (annotation.strand==-1)
+        # Save part
+        parts.append(part)
+
+    return parts
+
+def _resolve_part_opts(parts,
+                       measure_label,
+                       styles,
+                       glyph_labels={},
+                       cds_colors={},
+                       cds_label_colors={}):
+    """
+    Construct the rendering options of each part, in place.
+
+    Parameters
+    ----------
+    parts : list of dict
+        Parts as returned by ``_annotation_to_parts()``. ``opts`` and
+        ``label_width`` keys are added to each part, and the type
+        "CDSFragment" is replaced by "CDS".
+    measure_label : callable
+        Function with signature ``measure_label(label, fontsize, fontstyle)``
+        that returns the width of a label in data coordinates.
+    styles : CompiledStyles
+        Rendering options of each part type.
+    glyph_labels, cds_colors, cds_label_colors
+        See ``plot_sequence()``.
+
+    """
+    # Construct plotting options for each part
+    for part_index, part in enumerate(parts):
+        # Initialize dictionary with rendering options
         opts = {}
 
         # GENERAL TYPE-DEPENDENT RENDERING OPTIONS
         # ========================================
 
-        # Get opts from RENDER_OPT if available
-        if part['type']=='CDSFragment':
-            # CDSFragment combines options from 'CDS' and 'CDSFragment', with
-            # the latter taking precedence.
-            part_type_opts = RENDER_OPT.get('CDSFragment', {})
-            part_type_opts_cds = RENDER_OPT.get('CDS', {})
-            for k, v in part_type_opts_cds.items():
-                if k not in part_type_opts:
-                    part_type_opts[k] = v
-        else:
-            part_type_opts = RENDER_OPT.get(part['type'], {})
+        # Get compiled style of the part type
+        # CDSFragment combines options from 'CDS' and 'CDSFragment'.
+        style = styles.get(part['type'])
+        static_opts = style.static
 
         # PART-SPECIFIC RENDERING OPTIONS
         # ===============================
@@ -356,27 +1993,27 @@ def plot_sequence(seq=None,
                 if (part_index > 0) and \
                         (parts[part_index-1]['type'] in ['CDS', 'CDSFragment']):
                     opts['end_pad'] = 0
-                    label_x_offset_c += part_type_opts.get('end_pad', 0)/2
+                    label_x_offset_c += static_opts.get('end_pad', 0)/2
             # End padding is zero if there is a 'CDSFragment' to the right
             if part['type'] in ['CDS', 'CDSFragment']:
                 if (part_index < (len(parts)-1)) and \
                         (parts[part_index+1]['type']=='CDSFragment'):
                     opts['start_pad'] = 0
-                    label_x_offset_c -= part_type_opts.get('start_pad', 0)/2
+                    label_x_offset_c -= static_opts.get('start_pad', 0)/2
         else:
             # Start padding is zero if there is a 'CDSFragment' to the left
             if part['type'] in ['CDS', 'CDSFragment']:
                 if (part_index > 0) and \
                         (parts[part_index-1]['type']=='CDSFragment'):
                     opts['start_pad'] = 0
-                    label_x_offset_c -= part_type_opts.get('start_pad', 0)/2
+                    label_x_offset_c -= static_opts.get('start_pad', 0)/2
             # End padding is zero if there is a 'CDS' or 'CDSFragment' to the
             # right
             if part['type']=='CDSFragment':
                 if (part_index < (len(parts)-1)) and \
                         (parts[part_index+1]['type'] in ['CDS', 'CDSFragment']):
                     opts['end_pad'] = 0
-                    label_x_offset_c += part_type_opts.get('end_pad', 0)/2
+                    label_x_offset_c += static_opts.get('end_pad', 0)/2
 
         # Colors for CDS glyph and label
         if part['type'] in ['CDS', 'CDSFragment']:
@@ -391,24 +2028,16 @@ def plot_sequence(seq=None,
         # Label is taken from the glyph_labels dictionary, or from the name.
         label = glyph_labels.get(part['name'], part['name'])
         opts['label'] = label
-        # Method to calculate label_width from "https://stackoverflow.com/\
-        # questions/24581194/matplotlib-text-bounding-box-dimensions"
-        t = ax.text(0,
-                    0,
-                    label,
-                    fontsize=part_type_opts.get('label_size', 7),
-                    fontstyle=part_type_opts.get('label_style', 'normal'))
-        bb = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
-        bb_datacoords = bb.transformed(ax.transData.inverted())
-        label_width = bb_datacoords.width
-        t.remove()
+        label_width = measure_label(label,
+                                    style.label_size,
+                                    style.label_style)
 
         # Iterate over options
-        for k, v in part_type_opts.items():
+        for k, v, dynamic in style.items:
             if k in opts:
                 # Don't override specific options established above
                 continue
-            elif hasattr(v, '__call__'):
+            elif dynamic:
                 # Evaluate option based on label width
                 opts[k] = v(label_width)
             else:
@@ -429,63 +2058,916 @@ def plot_sequence(seq=None,
                 else:
                     opts[k] = v
 
-        # Add options
-        part['opts'] = opts
+        # Add options
+        # The label width is also kept to crop saved figures.
+        part['opts'] = opts
+        part['label_width'] = label_width
+
+    # 'CDSFragment' is not a real dnaplotlib part type. Change it to 'CDS'
+    for part in parts:
+        if part['type']=='CDSFragment':
+            part['type'] = 'CDS'
+
+def _default_points_per_unit(ax_x_extent):
+    """
+    Get the length of a data unit, in points, in a default axes.
+
+    The default axes is the one created by ``pyplot.subplots()`` with the
+    current ``matplotlib.rcParams``, with x axis limits covering
+    `ax_x_extent` data units.
+
+    """
+    rc = matplotlib.rcParams
+    ax_width = rc['figure.figsize'][0]*\
+        (rc['figure.subplot.right'] - rc['figure.subplot.left'])
+    return ax_width*72./ax_x_extent
+
+def _extract_parts(seq=None,
+                   seq_name=None,
+                   start_position=None,
+                   end_position=None,
+                   ignore_names=[],
+                   cds_split_char='',
+                   compiled_mapping=None,
+                   stats=None):
+    """
+    Get the parts to be drawn from the annotations of a sequence.
+
+    Parameters
+    ----------
+    compiled_mapping : CompiledMapping
+        Rules used to map annotations to part types.
+
+    Other parameters
+    ----------------
+    See ``layout_sequence()``.
+
+    Returns
+    -------
+    parts : list of dict
+        Parts as returned by ``_annotation_to_parts()``, sorted by start
+        position.
+
+    """
+    # If seq is provided, the following is not executed.
+    # If not, load from seq_name
+    if seq is None:
+        if seq_name is not None:
+            # Load sequence from benchling
+            with _timer(stats, 'fetch'):
+                seq = load_sequence(seq_name, stats=stats)
+        else:
+            # No sequence or sequence name provided, raise exception
+            raise ValueError("seq or seq_name should be provided")
+
+    # Get annotations within range, sorted by start position, and their
+    # part types from the mapping
+    with _timer(stats, 'filter'):
+        table = get_annotation_table(seq)
+        if start_position is None:
+            start_position = 0
+        if end_position is None:
+            end_position = seq.length - 1
+        indices = table.select(start_position, end_position)
+        part_types, part_codes = table.part_types(compiled_mapping)
+        part_codes = part_codes[indices]
+        # Only keep annotations for which a matching part has been found
+        matched = part_codes >= 0
+        indices = indices[matched]
+        part_codes = part_codes[matched]
+
+    # Extract parts to be plotted
+    with _timer(stats, 'parts'):
+        parts = []
+        n_annotations_drawn = 0
+        for i, part_code in zip(indices.tolist(), part_codes.tolist()):
+            annotation_parts = _annotation_to_parts(
+                table.annotations[i],
+                part_types[part_code],
+                ignore_names=ignore_names,
+                cds_split_char=cds_split_char)
+            if annotation_parts:
+                n_annotations_drawn += 1
+                parts.extend(annotation_parts)
+    if stats is not None:
+        stats.count('sequences')
+        stats.count('annotations', len(table))
+        stats.count('annotations_selected', n_annotations_drawn)
+        stats.count('parts', len(parts))
+
+    return parts
+
+def _hashable(value):
+    """
+    Get a hashable version of a value, using its representation if needed.
+
+    """
+    try:
+        hash(value)
+    except TypeError:
+        value = repr(value)
+    return value
+
+def _layout_key(parts,
+                glyph_labels={},
+                cds_colors={},
+                cds_label_colors={},
+                **options):
+    """
+    Get a fingerprint of everything that determines a layout.
+
+    Parts are only represented by their type, label, orientation and
+    colors, so that sequences whose parts only differ in their names,
+    positions, bases, or in annotations that are not drawn, have the same
+    fingerprint. Keyword arguments include all other options that affect
+    the layout.
+
+    """
+    part_keys = []
+    for part in parts:
+        name = part['name']
+        if part['type'] in ['CDS', 'CDSFragment']:
+            colors = (_hashable(cds_colors.get(name)),
+                      _hashable(cds_label_colors.get(name)))
+        else:
+            colors = None
+        part_keys.append((part['type'],
+                          glyph_labels.get(name, name),
+                          part.get('fwd'),
+                          colors))
+    return (tuple(part_keys),
+            tuple(sorted((k, _hashable(v)) for k, v in options.items())))
+
+def layout_sequence(seq=None,
+                    seq_name=None,
+                    start_position=None,
+                    end_position=None,
+                    seq_label=None,
+                    seq_label_pos='left',
+                    glyph_labels={},
+                    ignore_names=[],
+                    cds_split_char='',
+                    cds_colors={},
+                    cds_label_colors={},
+                    chromosomal_locus=None,
+                    chromosomal_locus_pos='left',
+                    ax=None,
+                    ax_x_extent=250,
+                    ax_x_alignment='center',
+                    ax_ylim=(-15, 15),
+                    label_metrics=None,
+                    points_per_unit=None,
+                    ann_parts_mapping=None,
+                    render_opt=None,
+                    label_width_cache=None,
+                    layout_cache=None,
+                    stats=None):
+    """
+    Compute the layout of a benchling sequence's SBOL visual diagram.
+
+    The layout contains every part to be drawn, with all rendering options
+    already resolved, and can be drawn with ``render_layout()``. Layouts
+    only contain strings, numbers, booleans, lists and dictionaries, and
+    can therefore be serialized (e.g. with ``json``), cached, and drawn
+    many times into different figures or formats.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes, optional
+        Axes in which the layout will be drawn, used to measure labels. If
+        not specified, labels are measured with the 'textpath' method, and
+        no figure is created.
+    points_per_unit : float, optional
+        Length of one data unit along the x axis, in points, used to measure
+        labels if `ax` is not specified. If not specified, the value for an
+        axes created by ``pyplot.subplots()`` is used.
+    ann_parts_mapping : list or CompiledMapping, optional
+        Rules used to map annotations to part types, with the same format
+        as ``ANN_PARTS_MAPPING``. If not specified, use
+        ``ANN_PARTS_MAPPING``.
+    render_opt : dict or CompiledStyles, optional
+        Rendering options, with the same format as ``RENDER_OPT``. If not
+        specified, use ``RENDER_OPT``.
+    label_width_cache : object, optional
+        Cache in which label widths are memoized. See ``get_label_width()``.
+    layout_cache : object, optional
+        Cache with ``get()`` and ``set()`` methods, such as the one used
+        by ``plot_sequences()``, in which layouts are stored keyed by a
+        fingerprint of the parts to be drawn and all options that affect
+        them. If specified, sequences whose parts are identical after
+        filtering, mapping, ignoring names and substituting labels share a
+        single layout of their parts, which is only computed once, even if
+        their sequence labels or chromosomal loci differ. These are added
+        to the returned layout afterwards. Parts in shared layouts should
+        not be modified.
+    stats : RenderStats, optional
+        If specified, record the time spent in each phase and related
+        counts, including the number of layouts reused from `layout_cache`.
+
+    Returns
+    -------
+    layout : dict
+        Layout of the sequence diagram.
+
+    Other parameters
+    ----------------
+    All other parameters are the same as in ``plot_sequence()``.
+
+    Raises
+    ------
+    ValueError
+        If no sequence or more than one sequence with the name given by
+        `seq_name` was found.
+
+    """
+    parts = _extract_parts(seq=seq,
+                           seq_name=seq_name,
+                           start_position=start_position,
+                           end_position=end_position,
+                           ignore_names=ignore_names,
+                           cds_split_char=cds_split_char,
+                           compiled_mapping=compile_mapping(ann_parts_mapping),
+                           stats=stats)
+
+    # Construct plotting options for each part
+    if ax is None:
+        if label_metrics is None:
+            label_metrics = 'textpath'
+        if points_per_unit is None:
+            points_per_unit = _default_points_per_unit(ax_x_extent)
+    def measure_label(label, fontsize, fontstyle):
+        with _timer(stats, 'label_measurement'), \
+                _mathtext_context([label]):
+            return get_label_width(label,
+                                   fontsize=fontsize,
+                                   fontstyle=fontstyle,
+                                   ax=ax,
+                                   points_per_unit=points_per_unit,
+                                   metrics=label_metrics,
+                                   stats=stats,
+                                   cache=label_width_cache)
+
+    # Reuse a layout with the same fingerprint, if available
+    # The sequence label and chromosomal locus are added afterwards, so that
+    # sequences with different labels can share a layout.
+    styles = compile_styles(render_opt)
+    if layout_cache is not None:
+        if ax is not None:
+            x0, x1 = ax.transData.transform([(0, 0), (1, 0)])[:, 0]
+            label_scale = (ax.figure.dpi, x1 - x0)
+        else:
+            label_scale = points_per_unit
+        layout_key = _layout_key(parts,
+                                 glyph_labels=glyph_labels,
+                                 cds_colors=cds_colors,
+                                 cds_label_colors=cds_label_colors,
+                                 ax_x_extent=ax_x_extent,
+                                 ax_x_alignment=ax_x_alignment,
+                                 ax_ylim=tuple(ax_ylim),
+                                 label_metrics=label_metrics or LABEL_METRICS,
+                                 label_scale=label_scale,
+                                 font=_font_rc_key(),
+                                 styles=styles)
+        try:
+            layout = layout_cache.get(layout_key)
+        except KeyError:
+            layout = None
+        else:
+            if stats is not None:
+                stats.count('layouts_reused')
+    else:
+        layout = None
+
+    if layout is None:
+        layout = _build_parts_layout(parts,
+                                     measure_label,
+                                     glyph_labels=glyph_labels,
+                                     cds_colors=cds_colors,
+                                     cds_label_colors=cds_label_colors,
+                                     ax_x_extent=ax_x_extent,
+                                     ax_x_alignment=ax_x_alignment,
+                                     ax_ylim=ax_ylim,
+                                     styles=styles,
+                                     stats=stats)
+        if layout_cache is not None:
+            layout_cache.set(layout_key, layout)
+
+    return _add_sequence_labels(layout,
+                                seq_label=seq_label,
+                                seq_label_pos=seq_label_pos,
+                                chromosomal_locus=chromosomal_locus,
+                                chromosomal_locus_pos=chromosomal_locus_pos,
+                                styles=styles)
+
+def _build_parts_layout(parts,
+                        measure_label,
+                        glyph_labels={},
+                        cds_colors={},
+                        cds_label_colors={},
+                        ax_x_extent=250,
+                        ax_x_alignment='center',
+                        ax_ylim=(-15, 15),
+                        styles=None,
+                        stats=None):
+    """
+    Construct the part of a layout shared by sequences with the same parts.
+
+    The returned layout does not include the sequence label or chromosomal
+    locus, which usually differ between sequences, and should be completed
+    with ``_add_sequence_labels()`` before being drawn.
+
+    Parameters
+    ----------
+    parts : list of dict
+        Parts as returned by ``_annotation_to_parts()``, modified in place.
+    measure_label : callable
+        See ``_resolve_part_opts()``.
+    styles : CompiledStyles
+        Rendering options of each part type.
+
+    Other parameters
+    ----------------
+    See ``layout_sequence()``.
+
+    """
+    with _timer(stats, 'options'):
+        _resolve_part_opts(parts,
+                           measure_label,
+                           styles,
+                           glyph_labels=glyph_labels,
+                           cds_colors=cds_colors,
+                           cds_label_colors=cds_label_colors)
+
+    sequence_opts = styles.get('Sequence').static
+    layout = {'parts': parts,
+              'backbone_linewidth': sequence_opts.get('backbone_linewidth', 1),
+              'ax_x_extent': ax_x_extent,
+              'ax_x_alignment': ax_x_alignment,
+              'ax_ylim': list(ax_ylim),
+              }
+
+    return layout
+
+def _add_sequence_labels(layout,
+                         seq_label=None,
+                         seq_label_pos='left',
+                         chromosomal_locus=None,
+                         chromosomal_locus_pos='left',
+                         styles=None):
+    """
+    Add the sequence label and chromosomal locus to a layout.
+
+    `layout`, as returned by ``_build_parts_layout()``, is not modified and
+    can be shared by many sequences. A new layout is returned.
+
+    Parameters
+    ----------
+    See ``layout_sequence()``.
+
+    """
+    # Define renderer options
+    sequence_opts = styles.get('Sequence').static
+    backbone_linewidth = layout['backbone_linewidth']
+    if chromosomal_locus is not None:
+        backbone_pad_left = -2*backbone_linewidth
+        backbone_pad_right = -2*backbone_linewidth
+    else:
+        backbone_pad_left = 0
+        backbone_pad_right = 0
+
+    # Add chromosomal locus parts if specified
+    parts = layout['parts']
+    if chromosomal_locus is not None:
+        # 5' glyph
+        cl5 = {}
+        cl5['type'] = '5ChromosomalLocus'
+        cl5['name'] = 'cl5_{}'.format(chromosomal_locus)
+        cl5['fwd'] = True
+        opts = styles.options('5ChromosomalLocus')
+        if chromosomal_locus_pos in ['left', 'both']:
+            opts['label'] = chromosomal_locus
+        opts['linewidth'] = backbone_linewidth
+        cl5['opts'] = opts
+        # 3' glyph
+        cl3 = {}
+        cl3['type'] = '3ChromosomalLocus'
+        cl3['name'] = '3cl_{}'.format(chromosomal_locus)
+        opts = styles.options('3ChromosomalLocus')
+        if chromosomal_locus_pos in ['right', 'both']:
+            opts['label'] = chromosomal_locus
+        opts['linewidth'] = backbone_linewidth
+        cl3['opts'] = opts
+        # Save glyphs
+        parts = [cl5] + parts + [cl3]
+
+    # Sequence label options
+    seq_label_opts = {
+        'x_offset': sequence_opts.get('label_x_offset', 0),
+        'y_offset': sequence_opts.get('label_y_offset', 0),
+        'size': sequence_opts.get('label_size', 10),
+        'x_alignment': sequence_opts.get('label_x_alignment', 'left'),
+        }
+
+    layout = {'parts': list(parts),
+              'backbone_linewidth': backbone_linewidth,
+              'backbone_pad_left': backbone_pad_left,
+              'backbone_pad_right': backbone_pad_right,
+              'seq_label': seq_label,
+              'seq_label_pos': seq_label_pos,
+              'seq_label_opts': seq_label_opts,
+              'ax_x_extent': layout['ax_x_extent'],
+              'ax_x_alignment': layout['ax_x_alignment'],
+              'ax_ylim': list(layout['ax_ylim']),
+              }
+
+    return layout
+
+# rcParams that dnaplotlib overrides every time it renders, and therefore do
+# not affect the result
+_DNAPLOTLIB_RC_KEYS = ['lines.dash_joinstyle',
+                       'lines.dash_capstyle',
+                       'lines.solid_joinstyle',
+                       'lines.solid_capstyle',
+                       'pdf.fonttype']
+
+# Hits and misses of the render cache in this process
+_render_cache_stats = {'hits': 0, 'misses': 0}
+_render_cache_stats_lock = threading.Lock()
+
+def _update_hash(h, value):
+    """
+    Update a hash object with a canonical representation of a value.
+
+    Dictionaries are hashed independently of their order, and functions are
+    hashed by their bytecode, constants, default arguments and closure, so
+    that equivalent lambdas in ``RENDER_OPT`` produce the same hash in
+    different processes.
+
+    """
+    if isinstance(value, dict):
+        h.update(b'{')
+        for k in sorted(value, key=repr):
+            _update_hash(h, k)
+            _update_hash(h, value[k])
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for v in value:
+            _update_hash(h, v)
+        h.update(b']')
+    elif callable(value) and hasattr(value, '__code__'):
+        code = value.__code__
+        h.update(code.co_code)
+        _update_hash(h, [c for c in code.co_consts
+                         if not hasattr(c, 'co_code')])
+        _update_hash(h, value.__defaults__)
+        _update_hash(h, [c.cell_contents for c in (value.__closure__ or [])])
+    else:
+        h.update(repr(value).encode('utf-8'))
+    h.update(b';')
+
+# rcParams that do not affect saved figures. Some of these change when pyplot
+# is imported or a backend is selected, and are not used in cache keys.
+_NON_OUTPUT_RC_KEYS = ['backend',
+                       'backend_fallback',
+                       'interactive',
+                       'toolbar',
+                       'figure.max_open_warning',
+                       'figure.raise_window',
+                       'savefig.directory',
+                       'tk.window_focus',
+                       'macosx.window_mode']
+_NON_OUTPUT_RC_PREFIXES = ('keymap.', 'webagg.')
+
+def _output_rc_params():
+    """
+    Get the rcParams that can affect a saved figure.
+
+    rcParams in ``_DNAPLOTLIB_RC_KEYS`` are excluded, since dnaplotlib
+    overrides them, as well as those in ``_NON_OUTPUT_RC_KEYS``.
+
+    """
+    return {k: v for k, v in matplotlib.rcParams.items()
+            if (k not in _DNAPLOTLIB_RC_KEYS) and
+               (k not in _NON_OUTPUT_RC_KEYS) and
+               (not k.startswith(_NON_OUTPUT_RC_PREFIXES))}
+
+def _render_cache_key(seqs,
+                      start_position,
+                      end_position,
+                      ann_parts_mapping,
+                      kwargs,
+                      savefig):
+    """
+    Compute the key of a figure in the render cache.
+
+    Parameters
+    ----------
+    seqs : list of benchlingclient.DNASequence
+        Sequences to be plotted.
+    start_position, end_position : int
+        Range of the annotations to be plotted.
+    ann_parts_mapping : list
+        Rules used to map annotations to part types.
+    kwargs : dict
+        All other arguments that affect the figure.
+    savefig : str
+        Filename of the figure. Only its extension, which determines the
+        format, is used.
+
+    Returns
+    -------
+    key : str
+        Hexadecimal hash.
+
+    """
+    if ann_parts_mapping is None:
+        ann_parts_mapping = ANN_PARTS_MAPPING
+    # Annotation features used by the mapping or by plot_sequence()
+    features = ['start', 'end', 'strand', 'type', 'name']
+    for rule in ann_parts_mapping:
+        features.extend(f for f in rule['annotation'] if f not in features)
+
+    h = hashlib.sha256()
+    for seq in seqs:
+        annotations = _select_annotations(seq, start_position, end_position)
+        _update_hash(h, [[getattr(a, f, None) for f in features]
+                         for a in annotations])
+    _update_hash(h, kwargs)
+    _update_hash(h, os.path.splitext(savefig)[1].lower())
+    _update_hash(h, ann_parts_mapping)
+    _update_hash(h, RENDER_OPT)
+    _update_hash(h, _output_rc_params())
+    _update_hash(h, [__version__,
+                     matplotlib.__version__,
+                     getattr(dnaplotlib, '__version__', None)])
+    return h.hexdigest()
+
+def _get_render_cache():
+    """
+    Get the render cache as currently configured, or None if disabled.
+
+    """
+    if RENDER_CACHE_DIR is None:
+        return None
+    return _DiskCache(RENDER_CACHE_DIR, max_size=RENDER_CACHE_MAX_SIZE)
+
+def _render_cache_load(render_cache, key, savefig, stats=None):
+    """
+    Copy a figure from the render cache into a file, if present.
+
+    Returns
+    -------
+    hit : bool
+        Whether the figure was found in the cache.
+
+    """
+    with _timer(stats, 'render_cache'):
+        try:
+            data = render_cache.get(key)
+        except KeyError:
+            data = None
+        if data is not None:
+            with open(savefig, 'wb') as f:
+                f.write(data)
+    hit = data is not None
+    with _render_cache_stats_lock:
+        _render_cache_stats['hits' if hit else 'misses'] += 1
+    if stats is not None:
+        stats.count('render_cache_hits' if hit else 'render_cache_misses')
+    return hit
+
+def _render_cache_save(render_cache, key, savefig):
+    """
+    Store a saved figure in the render cache.
+
+    """
+    with open(savefig, 'rb') as f:
+        render_cache.set(key, f.read())
+
+def render_cache_info():
+    """
+    Get statistics of the render cache.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the number of cache ``hits`` and ``misses`` in this
+        process.
+
+    """
+    with _render_cache_stats_lock:
+        return dict(_render_cache_stats)
+
+def clear_render_cache():
+    """
+    Remove all figures stored in the render cache.
+
+    """
+    render_cache = _get_render_cache()
+    if render_cache is not None:
+        render_cache.clear()
+    with _render_cache_stats_lock:
+        _render_cache_stats['hits'] = 0
+        _render_cache_stats['misses'] = 0
+
+def _new_figure(use_pyplot=True, **kwargs):
+    """
+    Create a new figure.
+
+    If `use_pyplot` is True, the figure is created by ``pyplot.figure()``
+    and registered in pyplot's figure manager. Otherwise, the figure is
+    created as a ``matplotlib.figure.Figure`` with its own Agg canvas, and
+    is not referenced anywhere else. Keyword arguments are passed to the
+    figure's constructor.
+
+    """
+    if use_pyplot:
+        return pyplot.figure(**kwargs)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = matplotlib.figure.Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _extents_bbox(fig):
+    """
+    Get the box that contains the diagrams drawn in a figure, in inches.
+
+    The box spans the horizontal extent of each diagram and its labels,
+    and the y axis limits, plus the padding in
+    ``matplotlib.rcParams['savefig.pad_inches']``. If no diagram was drawn
+    by ``_draw_layout()`` in `fig`, return 'tight'.
+
+    """
+    bboxes = []
+    for ax in fig.axes:
+        with _axes_extents_lock:
+            extents = _axes_extents.get(ax)
+        if extents is None:
+            continue
+        # Position of axes with a fixed aspect ratio is updated on draw
+        ax.apply_aspect()
+        y_min, y_max = ax.get_ylim()
+        bbox = matplotlib.transforms.Bbox([[extents[0], y_min],
+                                           [extents[1], y_max]])
+        bboxes.append(bbox.transformed(ax.transData))
+    if not bboxes:
+        return 'tight'
+    bbox = matplotlib.transforms.Bbox.union(bboxes)
+    bbox = bbox.transformed(fig.dpi_scale_trans.inverted())
+    return bbox.padded(matplotlib.rcParams['savefig.pad_inches'])
+
+def _crop_bbox(fig, crop=None):
+    """
+    Get the box used to crop a saved figure, in inches.
+
+    """
+    if crop is None:
+        crop = SAVEFIG_CROP
+    if crop=='tight':
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+        return bbox.padded(matplotlib.rcParams['savefig.pad_inches'])
+    elif crop=='extents':
+        bbox = _extents_bbox(fig)
+        if bbox=='tight':
+            return _crop_bbox(fig, 'tight')
+        return bbox
+    else:
+        raise ValueError("crop {} not recognized".format(crop))
+
+def _savefig_kwargs(fig, dpi=300, crop=None):
+    """
+    Get the keyword arguments used to save a figure with ``savefig()``.
+
+    """
+    if crop is None:
+        crop = SAVEFIG_CROP
+    if crop=='tight':
+        bbox_inches = 'tight'
+    else:
+        bbox_inches = _crop_bbox(fig, crop)
+    return {'bbox_inches': bbox_inches, 'dpi': dpi}
+
+# Keys accepted in each output of a list passed as `savefig`
+_OUTPUT_KEYS = ['savefig', 'format', 'dpi', 'width', 'crop', 'resample']
+
+def _output_format(output):
+    """
+    Get the lowercase format of an output, as inferred by ``savefig()``.
 
-    # 'CDSFragment' is not a real dnaplotlib part type. Change it to 'CDS'
-    for part in parts:
-        if part['type']=='CDSFragment':
-            part['type'] = 'CDS'
+    """
+    if output.get('format') is not None:
+        return output['format'].lower()
+    if isinstance(output['savefig'], str):
+        ext = os.path.splitext(output['savefig'])[1]
+        if ext:
+            return ext[1:].lower()
+    return matplotlib.rcParams['savefig.format'].lower()
 
-    # Define renderer options
-    sequence_opts = RENDER_OPT.get('Sequence', {})
-    backbone_linewidth = sequence_opts.get('backbone_linewidth', 1)
-    if chromosomal_locus is not None:
-        backbone_pad_left = -2*backbone_linewidth
-        backbone_pad_right = -2*backbone_linewidth
+def _write_output(savefig, data):
+    """
+    Write bytes into a file with a given name, or into a file-like object.
+
+    """
+    if isinstance(savefig, str):
+        with open(savefig, 'wb') as f:
+            f.write(data)
     else:
-        backbone_pad_left = 0
-        backbone_pad_right = 0
+        savefig.write(data)
 
-    # Add chromosomal locus parts if specified
-    if chromosomal_locus is not None:
-        # 5' glyph
-        cl5 = {}
-        cl5['type'] = '5ChromosomalLocus'
-        cl5['name'] = 'cl5_{}'.format(chromosomal_locus)
-        cl5['fwd'] = True
-        opts = RENDER_OPT.get('5ChromosomalLocus', {}).copy()
-        if chromosomal_locus_pos in ['left', 'both']:
-            opts['label'] = chromosomal_locus
-        opts['linewidth'] = backbone_linewidth
-        cl5['opts'] = opts
-        # 3' glyph
-        cl3 = {}
-        cl3['type'] = '3ChromosomalLocus'
-        cl3['name'] = '3cl_{}'.format(chromosomal_locus)
-        opts = RENDER_OPT.get('3ChromosomalLocus', {}).copy()
-        if chromosomal_locus_pos in ['right', 'both']:
-            opts['label'] = chromosomal_locus
-        opts['linewidth'] = backbone_linewidth
-        cl3['opts'] = opts
-        # Save glyphs
-        parts = [cl5] + parts + [cl3]
+def _save_figure(fig, savefig, stats=None, format=None, dpi=300, crop=None):
+    """
+    Save a figure with the settings used throughout this module.
+
+    `savefig` can be a filename, a file-like object, or a list of outputs.
+    Each output is a filename, a file-like object, or a dictionary with the
+    key ``savefig`` and optionally ``format``, ``dpi``, ``width``,
+    ``crop`` and ``resample``. The first three override the corresponding
+    arguments for that output. ``width`` is the width of the saved image
+    in pixels, and takes precedence over ``dpi``. If ``resample`` is True,
+    a PNG output is obtained by resampling, with Pillow, the largest PNG
+    image saved from the figure with the same crop, instead of by drawing
+    the figure again.
+
+    All outputs are saved from the same figure, so that the diagram is laid
+    out and drawn only once, and the crop box is computed once for all
+    outputs that need it. See ``plot_sequence()`` for the other arguments.
+
+    """
+    # Validate outputs and fill in defaults
+    outputs = []
+    for output in (savefig if isinstance(savefig, list) else [savefig]):
+        if not isinstance(output, dict):
+            output = {'savefig': output}
+        unknown_keys = set(output) - set(_OUTPUT_KEYS)
+        if unknown_keys:
+            raise ValueError("unknown output keys: {}".format(
+                ', '.join(sorted(unknown_keys))))
+        if 'savefig' not in output:
+            raise ValueError("output should contain savefig")
+        output = dict(output)
+        output.setdefault('format', format)
+        output['format'] = _output_format(output)
+        output.setdefault('dpi', dpi)
+        output['crop'] = output.get('crop') or crop or SAVEFIG_CROP
+        output['resample'] = bool(output.get('resample'))
+        if output['resample'] and output['format']!='png':
+            raise ValueError("only PNG outputs can be resampled")
+        outputs.append(output)
+    resampled_crops = set(o['crop'] for o in outputs if o['resample'])
+
+    # Crop boxes are computed on demand, once per crop method.
+    # If the crop method is 'tight', matplotlib computes the box at the
+    # resolution of each output, as when saving a single output, unless the
+    # box is needed to compute the resolution or to resample.
+    bboxes = {}
+    for output in outputs:
+        if (output['crop']=='tight') and ('width' not in output) and \
+                (output['crop'] not in resampled_crops):
+            output['bbox_inches'] = 'tight'
+            continue
+        if output['crop'] not in bboxes:
+            bboxes[output['crop']] = _crop_bbox(fig, output['crop'])
+        output['bbox_inches'] = bboxes[output['crop']]
+        if 'width' in output:
+            output['dpi'] = output['width']/output['bbox_inches'].width
+
+    with _timer(stats, 'savefig'):
+        # Draw all outputs that are not resampled, and keep the largest PNG
+        # image with each crop method that is needed for resampling
+        sources = {}
+        for output in outputs:
+            if output['resample']:
+                continue
+            if (output['format']=='png') and \
+                    (output['crop'] in resampled_crops):
+                buf = io.BytesIO()
+                fig.savefig(buf,
+                            format='png',
+                            bbox_inches=output['bbox_inches'],
+                            dpi=output['dpi'])
+                _write_output(output['savefig'], buf.getvalue())
+                if (output['crop'] not in sources) or \
+                        (sources[output['crop']][0] < output['dpi']):
+                    sources[output['crop']] = (output['dpi'], buf)
+            else:
+                fig.savefig(output['savefig'],
+                            format=output['format'],
+                            bbox_inches=output['bbox_inches'],
+                            dpi=output['dpi'])
+            if stats is not None:
+                stats.count('outputs')
+
+        # Resample images
+        if resampled_crops:
+            from PIL import Image
+        images = {}
+        for output in outputs:
+            if not output['resample']:
+                continue
+            crop = output['crop']
+            if crop not in images:
+                # Draw the figure once at the largest resolution needed if
+                # no other output is large enough
+                max_dpi = max(o['dpi'] for o in outputs
+                              if o['resample'] and (o['crop']==crop))
+                if (crop not in sources) or (sources[crop][0] < max_dpi):
+                    buf = io.BytesIO()
+                    fig.savefig(buf,
+                                format='png',
+                                bbox_inches=output['bbox_inches'],
+                                dpi=max_dpi)
+                    sources[crop] = (max_dpi, buf)
+                source_dpi, buf = sources[crop]
+                buf.seek(0)
+                image = Image.open(buf)
+                image.load()
+                images[crop] = (source_dpi, image)
+            source_dpi, image = images[crop]
+            scale = output['dpi']/source_dpi
+            size = (max(1, int(round(image.width*scale))),
+                    max(1, int(round(image.height*scale))))
+            buf = io.BytesIO()
+            image.resize(size, Image.LANCZOS).save(
+                buf,
+                format='png',
+                dpi=(output['dpi'], output['dpi']))
+            _write_output(output['savefig'], buf.getvalue())
+            if stats is not None:
+                stats.count('outputs')
+                stats.count('outputs_resampled')
+
+def _release_figure(fig, use_pyplot=True):
+    """
+    Release all resources held by a figure created by ``_new_figure()``.
+
+    """
+    if use_pyplot:
+        pyplot.close(fig)
+    # Removing all artists breaks most reference cycles, so that memory can
+    # be released without waiting for the garbage collector.
+    fig.clear()
+
+# Horizontal extent of the diagram drawn in each axes, including its labels,
+# in data coordinates, used to crop saved figures
+_axes_extents = weakref.WeakKeyDictionary()
+_axes_extents_lock = threading.Lock()
+
+def _draw_layout(layout, ax):
+    """
+    Draw a sequence diagram layout into an existing axes.
+
+    """
+    ax_x_extent = layout['ax_x_extent']
+    ax_x_alignment = layout['ax_x_alignment']
+    seq_label = layout['seq_label']
+    seq_label_pos = layout['seq_label_pos']
+    seq_label_opts = layout['seq_label_opts']
+
+    ax.set_xlim((0, ax_x_extent))
+    ax.set_ylim(layout['ax_ylim'])
+    ax.set_aspect('equal')
 
     # Create the DNAplotlib renderer
     dr = dnaplotlib.DNARenderer(
-        linewidth=backbone_linewidth,
-        backbone_pad_left=backbone_pad_left,
-        backbone_pad_right=backbone_pad_right,
+        linewidth=layout['backbone_linewidth'],
+        backbone_pad_left=layout['backbone_pad_left'],
+        backbone_pad_right=layout['backbone_pad_right'],
         )
 
     # Render the DNA to axis
+    # dnaplotlib modifies the parts, so a copy is passed.
+    parts = copy.deepcopy(layout['parts'])
+    n_texts = len(ax.texts)
     start, end = dr.renderDNA(ax, parts, dr.SBOL_part_renderers())
 
+    # Horizontal extent of the part labels
+    # Labels are centered on their position, and their widths are known from
+    # the layout. Other labels, e.g. from chromosomal loci, are measured.
+    label_widths = {}
+    for part in layout['parts']:
+        if part.get('label_width') is not None:
+            label = part['opts']['label']
+            label_widths[label] = max(part['label_width'],
+                                      label_widths.get(label, 0))
+    labels_start, labels_end = start, end
+    for t in ax.texts[n_texts:]:
+        width = label_widths.get(t.get_text())
+        if (width is not None) and (t.get_rotation()%180==0):
+            x = t.get_position()[0]
+            labels_start = min(labels_start, x - width/2)
+            labels_end = max(labels_end, x + width/2)
+        else:
+            bb = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
+            bb_datacoords = bb.transformed(ax.transData.inverted())
+            labels_start = min(labels_start, bb_datacoords.xmin)
+            labels_end = max(labels_end, bb_datacoords.xmax)
+
     # Add sequence label if specified
     if seq_label is not None:
         # Compute offsets
-        seq_label_x_offset = sequence_opts.get('label_x_offset', 0)
-        seq_label_y_offset = sequence_opts.get('label_y_offset', 0)
+        seq_label_x_offset = seq_label_opts['x_offset']
+        seq_label_y_offset = seq_label_opts['y_offset']
         # Compute horizontal position of label
         if seq_label_pos=='left':
             x = start + seq_label_x_offset
@@ -496,33 +2978,838 @@ def plot_sequence(seq=None,
             x,
             seq_label_y_offset,
             seq_label,
-            fontsize=sequence_opts.get('label_size', 10),
-            horizontalalignment=sequence_opts.get('label_x_alignment', 'left'),
+            fontsize=seq_label_opts['size'],
+            horizontalalignment=seq_label_opts['x_alignment'],
             verticalalignment='center',
             zorder=50,
             )
 
-        # Modify 'start' or 'end' depending on label
-        bb = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
-        bb_datacoords = bb.transformed(ax.transData.inverted())
-        start = min(start, bb_datacoords.xmin)
-        end = max(end, bb_datacoords.xmax)
+        # Modify 'start' or 'end' depending on label
+        bb = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
+        bb_datacoords = bb.transformed(ax.transData.inverted())
+        start = min(start, bb_datacoords.xmin)
+        end = max(end, bb_datacoords.xmax)
+
+    # Set x axis limits depending on alignment
+    # Note that the extent is always ax_x_extent
+    if ax_x_alignment=='left':
+        ax.set_xlim((start, start + ax_x_extent))
+    if ax_x_alignment=='right':
+        ax.set_xlim((end - ax_x_extent, end))
+    if ax_x_alignment=='center':
+        ax.set_xlim(((start + end - ax_x_extent)/2,
+                     (start + end + ax_x_extent)/2))
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.axis('off')
+
+    with _axes_extents_lock:
+        _axes_extents[ax] = (min(start, labels_start), max(end, labels_end))
+
+def render_layout(layout,
+                  ax=None,
+                  savefig=None,
+                  savefig_format=None,
+                  savefig_dpi=300,
+                  savefig_crop=None,
+                  use_pyplot=True,
+                  stats=None):
+    """
+    Draw a sequence diagram layout as SBOL visual.
+
+    Parameters
+    ----------
+    layout : dict
+        Layout of the sequence diagram, as returned by
+        ``layout_sequence()``. It is not modified by this function.
+    ax : matplotlib.axes, optional
+        Axes to draw into.
+    savefig : str, file-like, or list, optional
+        If specified, save figure into a file with the name given by
+        `savefig`, into a binary file-like object, or into several outputs
+        as described in ``plot_sequence()``.
+    savefig_format, savefig_dpi, savefig_crop : optional
+        Format, resolution and cropping of the saved figure. See
+        ``plot_sequence()``.
+    use_pyplot : bool, optional
+        Whether to create a new figure with pyplot if `ax` is not
+        specified. See ``plot_sequence()``.
+    stats : RenderStats, optional
+        If specified, record the time spent drawing and saving.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure or None
+        Figure that contains the diagram, or None if a figure was created
+        without pyplot and released after saving.
+
+    """
+    # Initialize plot
+    new_figure = ax is None
+    if new_figure:
+        ax = _new_figure(use_pyplot).add_subplot(111)
+
+    # Draw
+    with _timer(stats, 'render'):
+        _draw_layout(layout, ax)
+
+    fig = ax.figure
+    if savefig is not None:
+        _save_figure(fig,
+                     savefig,
+                     stats=stats,
+                     format=savefig_format,
+                     dpi=savefig_dpi,
+                     crop=savefig_crop)
+        if new_figure and not use_pyplot:
+            _release_figure(fig, use_pyplot)
+            return None
+
+    return fig
+
+# Default options of the glyphs drawn by ``render_layout_svg()``, taken from
+# the corresponding dnaplotlib renderers
+_SVG_GLYPH_DEFAULTS = {
+    'Promoter': {'color': (0., 0., 0.),
+                 'start_pad': 2.,
+                 'end_pad': 2.,
+                 'y_extent': 10.,
+                 'x_extent': 10.,
+                 'arrowhead_height': 2.,
+                 'arrowhead_length': 4.},
+    'CDS': {'color': (0.7, 0.7, 0.7),
+            'edge_color': (0., 0., 0.),
+            'start_pad': 1.,
+            'end_pad': 1.,
+            'y_extent': 5.,
+            'x_extent': 30.,
+            'arrowhead_height': 4.,
+            'arrowhead_length': 8.},
+    'Terminator': {'color': (0., 0., 0.),
+                   'start_pad': 2.,
+                   'end_pad': 2.,
+                   'y_extent': 10.,
+                   'x_extent': 8.},
+    'RBS': {'color': (0.7, 0.7, 0.7),
+            'edge_color': (0., 0., 0.),
+            'start_pad': 2.,
+            'end_pad': 2.,
+            'x_extent': 10.},
+    }
+# Stick figure glyphs, with their stem type and head
+_SVG_STICK_FIGURES = {'Ribozyme': ('dash', 'O'),
+                      'Protease': ('dash', 'X'),
+                      'ProteinStability': ('solid', 'O'),
+                      'Ribonuclease': ('solid', 'X')}
+for _part_type in _SVG_STICK_FIGURES:
+    _SVG_GLYPH_DEFAULTS[_part_type] = {'color': (0., 0., 0.),
+                                       'start_pad': 2.,
+                                       'end_pad': 2.,
+                                       'x_extent': 5.,
+                                       'y_extent': 10.,
+                                       'linestyle': '-'}
+del _part_type
+
+# Padding around the drawing, in points, as in ``savefig()`` with
+# ``bbox_inches='tight'``
+_SVG_PAD = 7.2
+
+def _svg_color(color, attribute):
+    """
+    Get SVG attributes that specify a color and its opacity.
+
+    """
+    r, g, b, a = matplotlib.colors.to_rgba(color)
+    attributes = '{}="{}"'.format(attribute,
+                                  matplotlib.colors.to_hex((r, g, b)))
+    if a < 1:
+        attributes += ' {}-opacity="{:g}"'.format(attribute, a)
+    return attributes
+
+def _svg_text_metrics(label, size, style):
+    """
+    Get the metrics of a label drawn by ``render_layout_svg()``.
+
+    Metrics are stored in the label width cache.
+
+    Returns
+    -------
+    ismath : bool or str
+        Whether the label is mathtext, or 'TeX' if rendered with TeX.
+    width, height : float
+        Size of the label in points.
+    family : str
+        Name of the font family used for the label.
+
+    """
+    key = ('svg', label, size, style) + _font_rc_key()
+    try:
+        return _label_width_cache.get(key)
+    except KeyError:
+        pass
+    prop = matplotlib.font_manager.FontProperties(size=size, style=style)
+    if matplotlib.rcParams['text.usetex']:
+        ismath = 'TeX'
+    else:
+        ismath = matplotlib.cbook.is_math_text(label)
+    width, height, _ = matplotlib.textpath.text_to_path.\
+        get_text_width_height_descent(label, prop, ismath=ismath)
+    family = matplotlib.font_manager.get_font(
+        matplotlib.font_manager.findfont(prop)).family_name
+    metrics = (ismath, width, height, family)
+    _label_width_cache.set(key, metrics)
+    return metrics
+
+class _SVGDrawing(object):
+    """
+    Collection of shapes and labels to be written as an SVG document.
+
+    Coordinates are given in data units, and converted to points with a
+    fixed scale. Shapes are clipped to the axes limits, as in matplotlib,
+    whereas labels are not.
+
+    """
+    def __init__(self, points_per_unit):
+        self.points_per_unit = points_per_unit
+        # ``(zorder, svg_element, (xmin, xmax, ymin, ymax))`` tuples, with
+        # bounding boxes in points
+        self.shapes = []
+        self.labels = []
+
+    def _xy(self, x, y):
+        return x*self.points_per_unit, -y*self.points_per_unit
+
+    def _add_shape(self, zorder, element, points, linewidth):
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        self.shapes.append((zorder,
+                            element,
+                            (min(xs) - linewidth/2., max(xs) + linewidth/2.,
+                             min(ys) - linewidth/2., max(ys) + linewidth/2.)))
+
+    def line(self, xs, ys, color, linewidth, zorder, linestyle='-'):
+        points = [self._xy(x, y) for x, y in zip(xs, ys)]
+        attributes = ''
+        if linestyle in ['--', 'dashed', ':', 'dotted', '-.', 'dashdot']:
+            name = {'--': 'dashed',
+                    ':': 'dotted',
+                    '-.': 'dashdot'}.get(linestyle, linestyle)
+            pattern = matplotlib.rcParams['lines.{}_pattern'.format(name)]
+            attributes = ' stroke-dasharray="{}" stroke-linecap="butt"'.\
+                format(','.join('{:g}'.format(d*linewidth) for d in pattern))
+        element = '<polyline points="{}" fill="none" {} ' \
+            'stroke-width="{:g}"{}/>'.format(
+                ' '.join('{:.3f},{:.3f}'.format(*p) for p in points),
+                _svg_color(color, 'stroke'),
+                linewidth,
+                attributes)
+        self._add_shape(zorder, element, points, linewidth)
+
+    def polygon(self, xys, facecolor, edgecolor, linewidth, zorder):
+        points = [self._xy(x, y) for x, y in xys]
+        element = '<polygon points="{}" {} {} stroke-width="{:g}"/>'.format(
+            ' '.join('{:.3f},{:.3f}'.format(*p) for p in points),
+            _svg_color(facecolor, 'fill'),
+            _svg_color(edgecolor, 'stroke'),
+            linewidth)
+        self._add_shape(zorder, element, points, linewidth)
+
+    def half_disc(self, center, radius, upper, facecolor, edgecolor,
+                  linewidth, zorder):
+        cx, cy = self._xy(*center)
+        r = radius*self.points_per_unit
+        # Upper half discs are drawn clockwise from the left in SVG
+        # coordinates, where y points down
+        element = '<path d="M {:.3f},{:.3f} A {:.3f},{:.3f} 0 0 {} ' \
+            '{:.3f},{:.3f} Z" {} {} stroke-width="{:g}"/>'.format(
+                cx - r, cy, r, r, 1 if upper else 0, cx + r, cy,
+                _svg_color(facecolor, 'fill'),
+                _svg_color(edgecolor, 'stroke'),
+                linewidth)
+        points = [(cx - r, cy),
+                  (cx + r, cy),
+                  (cx, cy - r if upper else cy + r)]
+        self._add_shape(zorder, element, points, linewidth)
+
+    def circle(self, center, radius, facecolor, edgecolor, linewidth,
+               zorder):
+        cx, cy = self._xy(*center)
+        r = radius*self.points_per_unit
+        element = '<circle cx="{:.3f}" cy="{:.3f}" r="{:.3f}" {} {} ' \
+            'stroke-width="{:g}"/>'.format(cx, cy, r,
+                                           _svg_color(facecolor, 'fill'),
+                                           _svg_color(edgecolor, 'stroke'),
+                                           linewidth)
+        self._add_shape(zorder, element, [(cx - r, cy - r), (cx + r, cy + r)],
+                        linewidth)
+
+    def text(self, x, y, label, size, style='normal', color=(0., 0., 0.),
+             alignment='center', rotation=0, zorder=30):
+        """
+        Add a label, vertically centered at `y`.
+
+        Returns the horizontal extent of the label in data units.
+
+        """
+        x, y = self._xy(x, y)
+        ismath, width, height, family = _svg_text_metrics(label, size, style)
+        x_left = {'left': x, 'center': x - width/2., 'right': x - width}\
+            [alignment]
+        transform = ''
+        if rotation:
+            transform = ' transform="rotate({:g} {:.3f} {:.3f})"'.format(
+                -rotation, x, y)
+        if ismath:
+            # Mathtext is converted to paths, which are laid out by
+            # matplotlib as they would be in a figure
+            prop = matplotlib.font_manager.FontProperties(size=size,
+                                                          style=style)
+            path = matplotlib.textpath.TextPath((0, 0), label, prop=prop)
+            extents = path.get_extents()
+            d = []
+            for vertices, code in path.iter_segments(curves=True):
+                command = {1: 'M', 2: 'L', 3: 'Q', 4: 'C', 79: 'Z'}[code]
+                if code==79:
+                    d.append(command)
+                else:
+                    d.append(command + ' '.join(
+                        '{:.3f},{:.3f}'.format(vertices[i], -vertices[i + 1])
+                        for i in range(0, len(vertices), 2)))
+            element = '<g{}><path transform="translate({:.3f} {:.3f})" ' \
+                'd="{}" {}/></g>'.format(
+                    transform,
+                    x_left - extents.x0,
+                    y + (extents.y0 + extents.y1)/2.,
+                    ' '.join(d),
+                    _svg_color(color, 'fill'))
+        else:
+            element = '<text x="{:.3f}" y="{:.3f}" font-family="{}, ' \
+                'sans-serif" font-size="{:g}" font-style="{}" {} ' \
+                'text-anchor="{}" dominant-baseline="central"{}>{}</text>'.\
+                format(x, y,
+                       xml.sax.saxutils.escape(family, {'"': '&quot;'}),
+                       size,
+                       style,
+                       _svg_color(color, 'fill'),
+                       {'left': 'start',
+                        'center': 'middle',
+                        'right': 'end'}[alignment],
+                       transform,
+                       xml.sax.saxutils.escape(label))
+        corners = [(x_left, y - height/2.), (x_left + width, y + height/2.)]
+        if rotation:
+            angle = numpy.deg2rad(-rotation)
+            cos, sin = numpy.cos(angle), numpy.sin(angle)
+            corners = [(x_left, y - height/2.),
+                       (x_left + width, y - height/2.),
+                       (x_left, y + height/2.),
+                       (x_left + width, y + height/2.)]
+            corners = [(x + (cx - x)*cos - (cy - y)*sin,
+                        y + (cx - x)*sin + (cy - y)*cos)
+                       for cx, cy in corners]
+        xs = [c[0] for c in corners]
+        ys = [c[1] for c in corners]
+        self.labels.append((zorder,
+                            element,
+                            (min(xs), max(xs), min(ys), max(ys))))
+        return x_left/self.points_per_unit, \
+            (x_left + width)/self.points_per_unit
+
+    def to_svg(self, xlim, ylim):
+        """
+        Get the SVG document, cropped to the drawn elements.
+
+        """
+        # Shapes are clipped to the axes
+        ax_x0, ax_y1 = self._xy(xlim[0], ylim[0])
+        ax_x1, ax_y0 = self._xy(xlim[1], ylim[1])
+        bboxes = [(max(b[0], ax_x0), min(b[1], ax_x1),
+                   max(b[2], ax_y0), min(b[3], ax_y1))
+                  for _, _, b in self.shapes]
+        bboxes = [b for b in bboxes if b[0] < b[1] and b[2] < b[3]]
+        bboxes.extend(b for _, _, b in self.labels)
+        if bboxes:
+            x0 = min(b[0] for b in bboxes) - _SVG_PAD
+            x1 = max(b[1] for b in bboxes) + _SVG_PAD
+            y0 = min(b[2] for b in bboxes) - _SVG_PAD
+            y1 = max(b[3] for b in bboxes) + _SVG_PAD
+        else:
+            x0, x1, y0, y1 = ax_x0, ax_x1, ax_y0, ax_y1
+        lines = [
+            '<?xml version="1.0" encoding="utf-8" standalone="no"?>',
+            '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+            'width="{0:.3f}pt" height="{1:.3f}pt" '
+            'viewBox="{2:.3f} {3:.3f} {0:.3f} {1:.3f}">'.format(
+                x1 - x0, y1 - y0, x0, y0),
+            '<defs><clipPath id="axes"><rect x="{:.3f}" y="{:.3f}" '
+            'width="{:.3f}" height="{:.3f}"/></clipPath></defs>'.format(
+                ax_x0, ax_y0, ax_x1 - ax_x0, ax_y1 - ax_y0),
+            '<g clip-path="url(#axes)" stroke-linejoin="miter" '
+            'stroke-linecap="square">',
+            ]
+        # Elements are drawn in order of zorder. Labels are always drawn on
+        # top of shapes.
+        lines.extend(element for _, element, _ in
+                     sorted(self.shapes, key=lambda e: e[0]))
+        lines.append('</g>')
+        lines.extend(element for _, element, _ in
+                     sorted(self.labels, key=lambda e: e[0]))
+        lines.append('</svg>')
+        return '\n'.join(lines) + '\n'
+
+def _draw_svg_glyph(drawing, part, prev_end, linewidth):
+    """
+    Draw a part into an ``_SVGDrawing`` following dnaplotlib's geometry.
+
+    Returns the end position of the part, or None if the part type cannot
+    be drawn.
+
+    """
+    part_type = part['type']
+    if part_type not in _SVG_GLYPH_DEFAULTS:
+        return None
+    opts = dict(_SVG_GLYPH_DEFAULTS[part_type])
+    opts.update(part.get('opts', {}))
+    linewidth = opts.get('linewidth', linewidth)
+    zorder_add = opts.get('zorder_add', 0.)
+    color = opts['color']
+    x_extent = opts['x_extent']
+
+    # Position of the glyph, and direction factor
+    fwd = part.get('fwd', True)
+    if fwd:
+        d = 1.
+        start = prev_end + opts['start_pad']
+        end = start + x_extent
+        final_end = end + opts['end_pad']
+    else:
+        d = -1.
+        start = prev_end + opts['end_pad'] + x_extent
+        end = prev_end + opts['end_pad']
+        final_end = start + opts['start_pad']
+
+    if part_type=='Promoter':
+        y_extent = opts['y_extent']
+        ah_height = opts['arrowhead_height']
+        ah_length = opts['arrowhead_length']
+        drawing.line([start, start], [0, d*y_extent],
+                     color, linewidth, 9 + zorder_add)
+        drawing.line([start, start + d*x_extent - d*ah_length*0.5],
+                     [d*y_extent, d*y_extent],
+                     color, linewidth, 10 + zorder_add)
+        drawing.polygon([(start + d*x_extent - d*ah_length,
+                          d*y_extent + ah_height),
+                         (start + d*x_extent, d*y_extent),
+                         (start + d*x_extent - d*ah_length,
+                          d*y_extent - ah_height)],
+                        color, color, linewidth, 1 + zorder_add)
+    elif part_type=='CDS':
+        y_extent = opts['y_extent']
+        ah_height = opts['arrowhead_height']
+        ah_length = opts['arrowhead_length']
+        drawing.polygon([(start, y_extent),
+                         (start, -y_extent),
+                         (end - d*ah_length, -y_extent),
+                         (end - d*ah_length, -y_extent - ah_height),
+                         (end, 0),
+                         (end - d*ah_length, y_extent + ah_height),
+                         (end - d*ah_length, y_extent)],
+                        color, opts['edge_color'], linewidth,
+                        11 + zorder_add)
+    elif part_type=='Terminator':
+        y_extent = opts['y_extent']
+        drawing.line([start + d*x_extent/2., start + d*x_extent/2.],
+                     [0, d*y_extent],
+                     color, linewidth, 8 + zorder_add)
+        drawing.line([start, start + d*x_extent],
+                     [d*y_extent, d*y_extent],
+                     color, linewidth, 9 + zorder_add)
+    elif part_type=='RBS':
+        drawing.half_disc(((start + end)/2., 0), x_extent/2., fwd,
+                          color, opts['edge_color'], linewidth,
+                          8 + zorder_add)
+    else:
+        stem, head = _SVG_STICK_FIGURES[part_type]
+        y_extent = opts['y_extent']
+        linestyle = opts['linestyle']
+        x_center = (start + end)/2.
+        if head=='O':
+            drawing.circle((x_center, d*y_extent), x_extent/2.,
+                           (1., 1., 1.), color, linewidth, 8 + zorder_add)
+        else:
+            drawing.line([start, end], [d*y_extent*1.25, d*y_extent/1.5],
+                         color, linewidth, 12 + zorder_add)
+            drawing.line([start, end], [d*y_extent/1.5, d*y_extent*1.25],
+                         color, linewidth, 12 + zorder_add)
+        if stem=='dash':
+            stem_segments = [[0, d*y_extent/4],
+                             [d*y_extent/2, d*y_extent - d*x_extent/2.]]
+        elif head=='O':
+            stem_segments = [[0, d*y_extent - d*x_extent/2.]]
+        else:
+            stem_segments = [[0, d*y_extent]]
+        for ys in stem_segments:
+            drawing.line([x_center, x_center], ys,
+                         color, linewidth, 8 + zorder_add, linestyle)
+
+    # Label
+    if 'label' in opts:
+        drawing.text(prev_end + (final_end - prev_end)/2. + \
+                         opts.get('label_x_offset', 0),
+                     opts.get('label_y_offset', 0) + opts.get('y_offset', 0),
+                     opts['label'],
+                     opts.get('label_size', 7),
+                     style=opts.get('label_style', 'normal'),
+                     color=opts.get('label_color', (0, 0, 0)),
+                     rotation=opts.get('label_rotation', 0),
+                     zorder=30 + zorder_add)
+
+    return final_end
+
+def render_layout_svg(layout, savefig=None, points_per_unit=None, stats=None):
+    """
+    Draw a sequence diagram layout as SVG, without matplotlib's renderer.
+
+    Glyphs are written directly as SVG shapes, with the same geometry and
+    default options as dnaplotlib's renderers, and labels are measured from
+    font metrics. This is much faster than ``render_layout()``, and the
+    result closely resembles the SVG file that ``render_layout()`` would
+    save. Only the part types "Promoter", "CDS", "Terminator", "RBS",
+    "Ribozyme", "Ribonuclease", "ProteinStability", and "Protease" are
+    drawn. Parts of other types, including the "5ChromosomalLocus" and
+    "3ChromosomalLocus" glyphs added by `chromosomal_locus`, are skipped
+    together with their labels, and a warning is issued, since
+    ``render_layout()`` would draw them. Hatching is not supported, and
+    labels are always drawn above glyphs.
+
+    Parameters
+    ----------
+    layout : dict
+        Layout of the sequence diagram, as returned by
+        ``layout_sequence()``. It is not modified by this function. For the
+        best match, the layout should be computed without `ax`, and with
+        the same `points_per_unit`.
+    savefig : str or file-like, optional
+        If specified, write the SVG document, encoded as UTF-8, into a file
+        with the name given by `savefig`, or into a binary file-like object.
+    points_per_unit : float, optional
+        Length of one data unit, in points. If not specified, the value for
+        an axes created by ``pyplot.subplots()`` is used.
+    stats : RenderStats, optional
+        If specified, record the time spent drawing as 'render'.
+
+    Returns
+    -------
+    svg : str
+        SVG document.
+
+    """
+    with _timer(stats, 'render'):
+        ax_x_extent = layout['ax_x_extent']
+        if points_per_unit is None:
+            points_per_unit = _default_points_per_unit(ax_x_extent)
+        drawing = _SVGDrawing(points_per_unit)
+
+        # Parts
+        linewidth = layout['backbone_linewidth']
+        prev_end = 0
+        skipped_types = []
+        for part in layout['parts']:
+            end = _draw_svg_glyph(drawing, part, prev_end, linewidth)
+            if end is not None:
+                prev_end = end
+            elif part['type'] not in skipped_types:
+                skipped_types.append(part['type'])
+        if skipped_types:
+            warnings.warn("part types {} cannot be drawn as SVG and were "
+                          "skipped, use render_layout() to draw them".format(
+                              ', '.join(skipped_types)))
+        start, end = 0, prev_end
+        # Backbone
+        drawing.line([start - layout['backbone_pad_left'],
+                      end + layout['backbone_pad_right']],
+                     [0, 0],
+                     (0., 0., 0.), linewidth, 10)
+
+        # Sequence label
+        seq_label = layout['seq_label']
+        if seq_label is not None:
+            seq_label_opts = layout['seq_label_opts']
+            if layout['seq_label_pos']=='left':
+                x = start + seq_label_opts['x_offset']
+            elif layout['seq_label_pos']=='right':
+                x = end + seq_label_opts['x_offset']
+            label_start, label_end = drawing.text(
+                x,
+                seq_label_opts['y_offset'],
+                seq_label,
+                seq_label_opts['size'],
+                alignment=seq_label_opts['x_alignment'],
+                zorder=50)
+            start = min(start, label_start)
+            end = max(end, label_end)
+
+        # Axis limits depending on alignment
+        ax_x_alignment = layout['ax_x_alignment']
+        if ax_x_alignment=='left':
+            xlim = (start, start + ax_x_extent)
+        elif ax_x_alignment=='right':
+            xlim = (end - ax_x_extent, end)
+        else:
+            xlim = ((start + end - ax_x_extent)/2,
+                    (start + end + ax_x_extent)/2)
+        svg = drawing.to_svg(xlim, layout['ax_ylim'])
+
+    if savefig is not None:
+        with _timer(stats, 'savefig'):
+            _write_output(savefig, svg.encode('utf-8'))
+
+    return svg
+
+def plot_sequence(seq=None,
+                  seq_name=None,
+                  start_position=None,
+                  end_position=None,
+                  seq_label=None,
+                  seq_label_pos='left',
+                  glyph_labels={},
+                  ignore_names=[],
+                  cds_split_char='',
+                  cds_colors={},
+                  cds_label_colors={},
+                  chromosomal_locus=None,
+                  chromosomal_locus_pos='left',
+                  ax=None,
+                  ax_x_extent=250,
+                  ax_x_alignment='center',
+                  ax_ylim=(-15, 15),
+                  savefig=None,
+                  savefig_format=None,
+                  savefig_dpi=300,
+                  savefig_crop=None,
+                  label_metrics=None,
+                  ann_parts_mapping=None,
+                  layout_cache=None,
+                  use_pyplot=True,
+                  stats=None):
+    """
+    Plot a specified benchling sequence as SBOL visual
+
+    Parameters
+    ----------
+    seq : benchlingclient.DNASequence or IndexedSequence
+        Sequence to be plotted. Can be omitted if `seq_name` is provided.
+        Use an ``IndexedSequence`` to plot many windows of a long sequence.
+    seq_name : str, optional
+        Name of the sequence to load and plot. Ignored if `seq` is
+        specified.
+    start_position, end_position : int, optional
+        Only annotations in the sequence completely contained by the range
+        given by these two parameters will be plotted.
+    seq_label : str, optional
+        If specified, the text specified in `seq_label` will be added to either
+        the left or right side of the sequence diagram, depending on the
+        contents of `seq_label_pos`.
+    seq_label_pos : {'left', 'right'}, optional
+        Whether to add the label in `seq_label` to the left or right side of
+        the sequence diagram.
+    glyph_labels : dict, optional
+        Dictionary with ``name: label`` pairs that specify a glyph's label,
+        when the label is different than the name. If a part's name is not
+        a key of `glyph_labels`, the name will be used as the glyph's label.
+    ignore_names : list, optional
+        Names of parts that should not be plotted.
+    cds_split_char : str, optionsl
+        If specified, a CDS whose name contains `cds_split_char` as a
+        substring will be split along this substring and shown as a
+        multipart CDS. A multipart CDS looks like a single CDS divided into
+        many fragments, each with its own label and color that can be
+        specified in `glyph_labels`, `cds_colors`, and `cds_label_colors`.
+    cds_colors : dict, optional
+        Dictionary with ``name: color`` pairs that specify a CDS' face
+        color, when the color is different than the one specified by
+        ``RENDER_OPT['CDS']``.
+    cds_label_colors : dict, optional
+        Dictionary with ``name: label_color`` pairs that specify a CDS'
+        label color, when the color is different than the one specified by
+        ``RENDER_OPT['CDS']``.
+    chromosomal_locus : str, optional
+        If specified, a pair of "ChromosomalLocus" glyphs will be added to
+        both sides of the rendered design, and a label with the text given
+        by `chromosomal_locus` on the glyph specified by
+        `chromosomal_locus_pos`.
+    chromosomal_locus_pos : {'left', 'right', 'both', 'none'}, optional
+        Location of the chromosomal locus label.
+    ax : matplotlib.axes, optional
+        Axes to draw into.
+    ax_x_extent : float, optinal
+        Range covered by the x axis limits.
+    ax_x_alignment : {'left', 'center', 'right'}
+        Alignment of the rendered diagram in the x axis.
+    ax_ylim : tuple-like, optional
+        Y axis limits.
+    savefig : str, file-like, or list, optional
+        If specified, save figure into a file with the name given by
+        `savefig`, or into a binary file-like object such as
+        ``io.BytesIO``, e.g. to send it over a network without a temporary
+        file. To save several outputs from a single layout and drawing,
+        `savefig` can be a list of outputs. Each output is a filename, a
+        file-like object, or a dictionary with a ``savefig`` key and any of
+        the following:
+
+          - ``format``, ``dpi``, ``crop``: override `savefig_format`,
+            `savefig_dpi` and `savefig_crop`, respectively.
+          - ``width``: width of the image in pixels, used instead of
+            ``dpi``.
+          - ``resample``: if True, a PNG output is obtained by resampling
+            the largest PNG image with the same crop instead of drawing the
+            figure again. This is faster, but small images look slightly
+            softer.
+
+        For example, ``[{'savefig': 'print.png'}, {'savefig': 'web.png',
+        'dpi': 96, 'resample': True}, {'savefig': 'thumb.png', 'width':
+        200, 'resample': True}, {'savefig': 'vector.svg'}]``.
+    savefig_format : str, optional
+        Format of the saved figure, such as 'png', 'svg' or 'pdf'. If not
+        specified, it is inferred from the extension of `savefig`, or taken
+        from ``matplotlib.rcParams['savefig.format']`` if `savefig` is a
+        file-like object.
+    savefig_dpi : float, optional
+        Resolution of the saved figure, in dots per inch.
+    savefig_crop : {'tight', 'extents'}, optional
+        How to crop the saved figure. If not specified, use
+        ``SAVEFIG_CROP``. See ``SAVEFIG_CROP`` for details.
+    label_metrics : {'renderer', 'textpath'}, optional
+        Method used to measure glyph labels. If not specified, use
+        ``LABEL_METRICS``.
+    ann_parts_mapping : list, optional
+        Rules used to map annotations to part types, with the same format
+        as ``ANN_PARTS_MAPPING``. If not specified, use
+        ``ANN_PARTS_MAPPING``.
+    layout_cache : object, optional
+        Cache used to share layouts between sequences with identical parts.
+        See ``layout_sequence()``.
+    use_pyplot : bool, optional
+        If `ax` is not specified, whether to create the figure with pyplot.
+        If False, the figure is created as a ``matplotlib.figure.Figure``
+        with its own Agg canvas, it is not registered in pyplot's global
+        figure manager, and it is released right after saving if `savefig`
+        is specified. This is recommended for long-running processes.
+    stats : RenderStats, optional
+        If specified, record the time spent in each phase of rendering and
+        related counts.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure or None
+        Figure that contains the diagram, or None if the figure was
+        released after saving. This happens if `use_pyplot` is False, or if
+        `savefig` is a filename and the render cache is enabled (see
+        ``RENDER_CACHE_DIR``), in which case the figure may have been
+        copied from the cache without being drawn.
+
+    Raises
+    ------
+    ValueError
+        If no sequence or more than one sequence with the name given by
+        `seq_name` was found.
+
+    """
+    new_figure = ax is None
+
+    # Attempt to copy the figure from the render cache
+    # This is only possible when saving a new figure to a file.
+    render_cache = None
+    if new_figure and isinstance(savefig, str):
+        render_cache = _get_render_cache()
+    if render_cache is not None:
+        if seq is None:
+            if seq_name is None:
+                raise ValueError("seq or seq_name should be provided")
+            with _timer(stats, 'fetch'):
+                seq = load_sequence(seq_name, stats=stats)
+        render_cache_key = _render_cache_key(
+            [seq],
+            start_position,
+            end_position,
+            ann_parts_mapping,
+            {'function': 'plot_sequence',
+             'seq_label': seq_label,
+             'seq_label_pos': seq_label_pos,
+             'glyph_labels': glyph_labels,
+             'ignore_names': ignore_names,
+             'cds_split_char': cds_split_char,
+             'cds_colors': cds_colors,
+             'cds_label_colors': cds_label_colors,
+             'chromosomal_locus': chromosomal_locus,
+             'chromosomal_locus_pos': chromosomal_locus_pos,
+             'ax_x_extent': ax_x_extent,
+             'ax_x_alignment': ax_x_alignment,
+             'ax_ylim': ax_ylim,
+             'label_metrics': label_metrics or LABEL_METRICS,
+             'savefig_format': savefig_format,
+             'savefig_dpi': savefig_dpi,
+             'savefig_crop': savefig_crop or SAVEFIG_CROP},
+            savefig)
+        if _render_cache_load(render_cache,
+                              render_cache_key,
+                              savefig,
+                              stats=stats):
+            return None
+
+    # Initialize plot
+    if new_figure:
+        ax = _new_figure(use_pyplot).add_subplot(111)
+    # Set axis limits and aspect right away
+    # This allows for a more precise estimation of label widths later on
+    ax.set_xlim((0, ax_x_extent))
+    ax.set_ylim(ax_ylim)
+    ax.set_aspect('equal')
+
+    # Compute layout
+    layout = layout_sequence(seq=seq,
+                             seq_name=seq_name,
+                             start_position=start_position,
+                             end_position=end_position,
+                             seq_label=seq_label,
+                             seq_label_pos=seq_label_pos,
+                             glyph_labels=glyph_labels,
+                             ignore_names=ignore_names,
+                             cds_split_char=cds_split_char,
+                             cds_colors=cds_colors,
+                             cds_label_colors=cds_label_colors,
+                             chromosomal_locus=chromosomal_locus,
+                             chromosomal_locus_pos=chromosomal_locus_pos,
+                             ax=ax,
+                             ax_x_extent=ax_x_extent,
+                             ax_x_alignment=ax_x_alignment,
+                             ax_ylim=ax_ylim,
+                             label_metrics=label_metrics,
+                             ann_parts_mapping=ann_parts_mapping,
+                             layout_cache=layout_cache,
+                             stats=stats)
 
-    # Set x axis limits depending on alignment
-    # Note that the extent is always ax_x_extent
-    if ax_x_alignment=='left':
-        ax.set_xlim((start, start + ax_x_extent))
-    if ax_x_alignment=='right':
-        ax.set_xlim((end - ax_x_extent, end))
-    if ax_x_alignment=='center':
-        ax.set_xlim(((start + end - ax_x_extent)/2,
-                     (start + end + ax_x_extent)/2))
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.axis('off')
+    # Draw
+    render_layout(layout, ax=ax, stats=stats)
+    fig = ax.figure
 
     if savefig is not None:
-        pyplot.savefig(savefig, bbox_inches='tight', dpi=300)
+        _save_figure(fig,
+                     savefig,
+                     stats=stats,
+                     format=savefig_format,
+                     dpi=savefig_dpi,
+                     crop=savefig_crop)
+        if render_cache is not None:
+            _render_cache_save(render_cache, render_cache_key, savefig)
+        # With the render cache, the figure is released as when it is
+        # copied from the cache, so that the return value does not depend on
+        # the cache contents.
+        if new_figure and ((not use_pyplot) or (render_cache is not None)):
+            _release_figure(fig, use_pyplot)
+            return None
+
+    return fig
 
 def plot_sequences(seqs=None,
                    seq_names=None,
@@ -542,13 +3829,23 @@ def plot_sequences(seqs=None,
                    ax_ylim=(-15, 15),
                    hspace=0,
                    figsize=None,
-                   savefig=None):
+                   savefig=None,
+                   savefig_format=None,
+                   savefig_dpi=300,
+                   savefig_crop=None,
+                   label_metrics=None,
+                   ann_parts_mapping=None,
+                   layout_cache=None,
+                   max_workers=8,
+                   use_pyplot=True,
+                   stats=None,
+                   per_page=None):
     """
     Plot several benchling sequences as SBOL visual.
 
     Parameters
     ----------
-    seqs : list of benchlingclient.DNASequence
+    seqs : list of benchlingclient.DNASequence or IndexedSequence
         List of sequences to be plotted. Can be omitted if `seq_names` is
         provided.
     seq_names : list of str, optional
@@ -564,33 +3861,157 @@ def plot_sequences(seqs=None,
         Size of the figure to be created. If not specified, get the width
         from the current defaults, and calculate the height to match the
         aspect ratio of all axes stacked vertically.
-    savefig : str, optional
-        If specified, save figure with a filename given by `savefig`.
+    savefig : str, file-like, or list, optional
+        If specified, save figure into a file with the name given by
+        `savefig`, into a binary file-like object, or into several outputs
+        as described in ``plot_sequence()``. Must be a filename if
+        `per_page` is specified.
+    savefig_format, savefig_dpi, savefig_crop : optional
+        Format, resolution and cropping of the saved figure. See
+        ``plot_sequence()``.
+    layout_cache : object, optional
+        Cache used to share layouts between sequences whose parts are
+        identical after filtering, mapping, ignoring names and substituting
+        labels, such as variants of a library that only differ in their
+        bases or sequence labels. See ``layout_sequence()``. If not
+        specified, layouts are shared between the sequences of a single
+        call. The number of layouts reused is recorded in `stats`.
+    max_workers : int, optional
+        Maximum number of concurrent requests used to load sequences from
+        `seq_names`. See ``load_sequences()``.
+    use_pyplot : bool, optional
+        Whether to create the figure with pyplot. If False, the figure is
+        created as a ``matplotlib.figure.Figure`` with its own Agg canvas,
+        it is not registered in pyplot's global figure manager, and it is
+        released right after saving if `savefig` is specified.
+    stats : RenderStats, optional
+        If specified, record the time spent in each phase of rendering and
+        related counts, aggregated over all sequences.
+    per_page : int, optional
+        If specified, plot `per_page` sequences per figure, and save each
+        figure as a page as soon as it is finished, after which it is
+        released. If `savefig` ends in ".pdf", pages are saved into a single
+        multi-page PDF file. Otherwise, each page is saved into its own
+        file, named by formatting `savefig` with the page number (starting
+        at 1) if it contains a "{}" field (e.g. "library_{:03d}.png"), or by
+        appending the page number to the file name otherwise. If
+        `seq_names` is specified, sequences are loaded one page at a time.
+        `savefig` is required in this mode, and `use_pyplot` is ignored.
+
+    Returns
+    -------
+    fig : matplotlib.figure.Figure or None
+        Figure that contains the diagrams, or None if the figure was
+        released after saving. This happens if `use_pyplot` is False, or if
+        `savefig` is a filename and the render cache is enabled (see
+        ``RENDER_CACHE_DIR``), in which case the figure may have been
+        copied from the cache without being drawn.
+    filenames : list of str
+        Instead of `fig`, if `per_page` is specified: names of the files
+        saved.
 
     Other parameters
     ----------------
     All parameters in ``plot_sequence()``, with the exception of `seq`,
-    `seq_name`, and `savefig` can be passed to this function. These will
-    then be directly passed to ``plot_sequence()`` when it is called to
-    plot each diagram.
+    `seq_name`, and the `savefig` options can be passed to this function.
+    These will then be directly passed to ``plot_sequence()`` when it is
+    called to plot each diagram.
 
     """
+    # Plot in pages, if specified
+    if per_page is not None:
+        if not isinstance(savefig, str):
+            raise ValueError("savefig should be a filename if per_page is "
+                "specified")
+        if seqs is not None:
+            n_seqs = len(seqs)
+        elif seq_names is not None:
+            n_seqs = len(seq_names)
+        else:
+            raise ValueError("seqs or seq_names should be provided")
+        if not (hasattr(seq_label, '__iter__') and \
+                (not isinstance(seq_label, str))):
+            seq_label = [seq_label]*n_seqs
+        if not (hasattr(chromosomal_locus, '__iter__') and \
+                (not isinstance(chromosomal_locus, str))):
+            chromosomal_locus = [chromosomal_locus]*n_seqs
+        seq_label = list(seq_label)
+        chromosomal_locus = list(chromosomal_locus)
+        n_pages = (n_seqs + per_page - 1)//per_page
+
+        if layout_cache is None:
+            layout_cache = _LRUCache(n_seqs)
+        filenames = []
+        pdf = None
+        if (savefig_format or os.path.splitext(savefig)[1][1:]).lower()==\
+                'pdf':
+            from matplotlib.backends.backend_pdf import PdfPages
+            pdf = PdfPages(savefig)
+            filenames.append(savefig)
+        try:
+            for page in range(n_pages):
+                page_slice = slice(page*per_page, (page + 1)*per_page)
+                page_kwargs = dict(
+                    seqs=seqs[page_slice] if seqs is not None else None,
+                    seq_names=seq_names[page_slice] if seqs is None else None,
+                    start_position=start_position,
+                    end_position=end_position,
+                    seq_label=seq_label[page_slice],
+                    seq_label_pos=seq_label_pos,
+                    glyph_labels=glyph_labels,
+                    ignore_names=ignore_names,
+                    cds_split_char=cds_split_char,
+                    cds_colors=cds_colors,
+                    cds_label_colors=cds_label_colors,
+                    chromosomal_locus=chromosomal_locus[page_slice],
+                    chromosomal_locus_pos=chromosomal_locus_pos,
+                    ax_x_extent=ax_x_extent,
+                    ax_x_alignment=ax_x_alignment,
+                    ax_ylim=ax_ylim,
+                    label_metrics=label_metrics,
+                    ann_parts_mapping=ann_parts_mapping,
+                    layout_cache=layout_cache,
+                    hspace=hspace,
+                    figsize=figsize,
+                    max_workers=max_workers,
+                    use_pyplot=False,
+                    stats=stats)
+                if pdf is not None:
+                    fig = plot_sequences(**page_kwargs)
+                    with _timer(stats, 'savefig'):
+                        pdf.savefig(fig, **_savefig_kwargs(fig,
+                                                           dpi=savefig_dpi,
+                                                           crop=savefig_crop))
+                    _release_figure(fig, use_pyplot=False)
+                else:
+                    if '{' in savefig:
+                        page_savefig = savefig.format(page + 1)
+                    else:
+                        root, ext = os.path.splitext(savefig)
+                        page_savefig = '{}_{:0{}d}{}'.format(
+                            root, page + 1, len(str(n_pages)), ext)
+                    plot_sequences(savefig=page_savefig,
+                                   savefig_format=savefig_format,
+                                   savefig_dpi=savefig_dpi,
+                                   savefig_crop=savefig_crop,
+                                   **page_kwargs)
+                    filenames.append(page_savefig)
+                if stats is not None:
+                    stats.count('pages')
+        finally:
+            if pdf is not None:
+                pdf.close()
+        return filenames
+
     # If seqs is provided, the following is not executed.
     # If not, load from seq_names
     if seqs is None:
         if seq_names is not None:
-            seqs = []
-            for seq_name in seq_names:
-                # Load sequence from benchling
-                seq_list = benchlingclient.DNASequence.list_all(name=seq_name)
-                # Test that only one sequence has been found
-                if len(seq_list) > 1:
-                    raise ValueError("more than one sequence found with name "
-                        "{}".format(seq_name))
-                elif len(seq_list) < 1:
-                    raise ValueError("no sequence with name {} found".\
-                        format(seq_name))
-                seqs.append(seq_list[0])
+            # Load sequences from benchling concurrently
+            with _timer(stats, 'fetch'):
+                seqs = load_sequences(seq_names,
+                                      max_workers=max_workers,
+                                      stats=stats)
         else:
             # No sequence or sequence name provided, raise exception
             raise ValueError("seqs or seq_names should be provided")
@@ -604,15 +4025,54 @@ def plot_sequences(seqs=None,
             (not isinstance(chromosomal_locus, str))):
         chromosomal_locus = [chromosomal_locus]*len(seqs)
 
+    # Attempt to copy the figure from the render cache
+    render_cache = None
+    if isinstance(savefig, str):
+        render_cache = _get_render_cache()
+    if render_cache is not None:
+        render_cache_key = _render_cache_key(
+            seqs,
+            start_position,
+            end_position,
+            ann_parts_mapping,
+            {'function': 'plot_sequences',
+             'seq_label': seq_label,
+             'seq_label_pos': seq_label_pos,
+             'glyph_labels': glyph_labels,
+             'ignore_names': ignore_names,
+             'cds_split_char': cds_split_char,
+             'cds_colors': cds_colors,
+             'cds_label_colors': cds_label_colors,
+             'chromosomal_locus': chromosomal_locus,
+             'chromosomal_locus_pos': chromosomal_locus_pos,
+             'ax_x_extent': ax_x_extent,
+             'ax_x_alignment': ax_x_alignment,
+             'ax_ylim': ax_ylim,
+             'label_metrics': label_metrics or LABEL_METRICS,
+             'hspace': hspace,
+             'figsize': figsize,
+             'savefig_format': savefig_format,
+             'savefig_dpi': savefig_dpi,
+             'savefig_crop': savefig_crop or SAVEFIG_CROP},
+            savefig)
+        if _render_cache_load(render_cache,
+                              render_cache_key,
+                              savefig,
+                              stats=stats):
+            return None
+
     # Initialize figure
     if figsize is None:
-        fig_width = pyplot.rcParams.get('figure.figsize')[0]
+        fig_width = matplotlib.rcParams.get('figure.figsize')[0]
         fig_height = fig_width*(ax_ylim[1] - ax_ylim[0])/ax_x_extent*len(seqs)
         figsize = (fig_width, fig_height)
-    fig = pyplot.figure(figsize=figsize)
+    fig = _new_figure(use_pyplot, figsize=figsize)
     # Make background transparent
     fig.patch.set_alpha(0)
     # Plot each sequence in a separate axes
+    # Sequences with identical parts share the same layout.
+    if layout_cache is None:
+        layout_cache = _LRUCache(len(seqs))
     for seq_index, seq in enumerate(seqs):
         ax = fig.add_subplot(len(seqs), 1, seq_index + 1)
         plot_sequence(seq=seq,
@@ -630,10 +4090,1369 @@ def plot_sequences(seqs=None,
                       chromosomal_locus_pos=chromosomal_locus_pos,
                       ax_x_extent=ax_x_extent,
                       ax_x_alignment=ax_x_alignment,
-                      ax_ylim=ax_ylim)
+                      ax_ylim=ax_ylim,
+                      label_metrics=label_metrics,
+                      ann_parts_mapping=ann_parts_mapping,
+                      layout_cache=layout_cache,
+                      stats=stats)
     # Adjust vertical space between subplots
     fig.subplots_adjust(hspace=hspace)
 
     # Save figure if specified
     if savefig is not None:
-        pyplot.savefig(savefig, bbox_inches='tight', dpi=300)
+        _save_figure(fig,
+                     savefig,
+                     stats=stats,
+                     format=savefig_format,
+                     dpi=savefig_dpi,
+                     crop=savefig_crop)
+        if render_cache is not None:
+            _render_cache_save(render_cache, render_cache_key, savefig)
+        # See ``plot_sequence()``
+        if (not use_pyplot) or (render_cache is not None):
+            _release_figure(fig, use_pyplot)
+            return None
+
+    return fig
+
+# matplotlib's mathtext parser is shared by all figures and is not
+# thread-safe. ``layout_sequence()`` holds this lock while measuring labels
+# with mathtext, and renderers while drawing them.
+_mathtext_lock = threading.Lock()
+
+def _mathtext_context(labels):
+    """
+    Get a context manager that holds ``_mathtext_lock`` if any label
+    contains mathtext.
+
+    """
+    for label in labels:
+        if isinstance(label, str) and matplotlib.cbook.is_math_text(label):
+            return _mathtext_lock
+    return _NullContext()
+
+def _layout_labels(layout):
+    """
+    Iterate over all labels in a layout.
+
+    """
+    yield layout['seq_label']
+    for part in layout['parts']:
+        yield part.get('opts', {}).get('label')
+
+class Renderer(object):
+    """
+    Renderer of sequence diagrams that can be shared by several threads.
+
+    A renderer holds its own copy of the annotation-to-part mapping and the
+    rendering options, compiled when the renderer is created, and its own
+    label width cache. Figures are created as ``matplotlib.figure.Figure``
+    objects with private Agg canvases, and are never registered in pyplot's
+    global figure manager. Hence, several threads can render with the same
+    renderer at the same time, without interfering with each other, and
+    later changes to ``ANN_PARTS_MAPPING`` or ``RENDER_OPT`` do not affect
+    existing renderers. Labels with mathtext are the exception: they are
+    measured and drawn, including while saving, while holding a lock shared
+    by all renderers.
+
+    Sharing a renderer makes rendering from several threads safe, but not
+    faster than rendering from one thread. Most of the work (dnaplotlib,
+    matplotlib's artists and text layout, and Agg rasterization) holds the
+    GIL, and only PNG compression, about a sixth of the time per diagram,
+    runs in parallel. Throughput measured by
+    ``benchmarks/stress_renderer.py`` stays flat with the number of
+    threads. Use ``render_batch()``, which renders in several processes,
+    to render many diagrams faster.
+
+    Parameters
+    ----------
+    ann_parts_mapping : list, optional
+        Rules used to map annotations to part types, with the same format
+        as ``ANN_PARTS_MAPPING``. If not specified, use
+        ``ANN_PARTS_MAPPING``.
+    render_opt : dict, optional
+        Rendering options, with the same format as ``RENDER_OPT``. If not
+        specified, use ``RENDER_OPT``.
+    label_metrics : {'renderer', 'textpath'}, optional
+        Method used to measure glyph labels. If not specified, use
+        ``LABEL_METRICS``.
+    label_width_cache_size : int, optional
+        Maximum number of label widths memoized by this renderer. If not
+        specified, use ``LABEL_WIDTH_CACHE_SIZE``.
+
+    """
+    def __init__(self,
+                 ann_parts_mapping=None,
+                 render_opt=None,
+                 label_metrics=None,
+                 label_width_cache_size=None):
+        if ann_parts_mapping is None:
+            ann_parts_mapping = ANN_PARTS_MAPPING
+        if render_opt is None:
+            render_opt = RENDER_OPT
+        if label_metrics is None:
+            label_metrics = LABEL_METRICS
+        if label_width_cache_size is None:
+            label_width_cache_size = LABEL_WIDTH_CACHE_SIZE
+        self.mapping = CompiledMapping(copy.deepcopy(ann_parts_mapping))
+        self.styles = CompiledStyles(render_opt)
+        self.label_metrics = label_metrics
+        self._label_width_cache = _LRUCache(label_width_cache_size)
+        # Import matplotlib and dnaplotlib now instead of in the first
+        # thread that renders.
+        dnaplotlib.DNARenderer
+
+    def layout(self,
+               seq=None,
+               seq_name=None,
+               start_position=None,
+               end_position=None,
+               seq_label=None,
+               seq_label_pos='left',
+               glyph_labels={},
+               ignore_names=[],
+               cds_split_char='',
+               cds_colors={},
+               cds_label_colors={},
+               chromosomal_locus=None,
+               chromosomal_locus_pos='left',
+               ax=None,
+               ax_x_extent=250,
+               ax_x_alignment='center',
+               ax_ylim=(-15, 15),
+               points_per_unit=None,
+               layout_cache=None,
+               stats=None):
+        """
+        Compute the layout of a sequence diagram.
+
+        Parameters are the same as in ``layout_sequence()``, except that
+        the mapping, rendering options, label metrics and label width cache
+        of the renderer are used. A `layout_cache` shared by several
+        threads should be thread-safe.
+
+        Returns
+        -------
+        layout : dict
+            Layout of the sequence diagram. See ``layout_sequence()``.
+
+        """
+        # Labels can only be measured with the renderer if drawn into `ax`
+        if ax is not None:
+            label_metrics = self.label_metrics
+        else:
+            label_metrics = None
+        return layout_sequence(seq=seq,
+                               seq_name=seq_name,
+                               start_position=start_position,
+                               end_position=end_position,
+                               seq_label=seq_label,
+                               seq_label_pos=seq_label_pos,
+                               glyph_labels=glyph_labels,
+                               ignore_names=ignore_names,
+                               cds_split_char=cds_split_char,
+                               cds_colors=cds_colors,
+                               cds_label_colors=cds_label_colors,
+                               chromosomal_locus=chromosomal_locus,
+                               chromosomal_locus_pos=chromosomal_locus_pos,
+                               ax=ax,
+                               ax_x_extent=ax_x_extent,
+                               ax_x_alignment=ax_x_alignment,
+                               ax_ylim=ax_ylim,
+                               label_metrics=label_metrics,
+                               points_per_unit=points_per_unit,
+                               ann_parts_mapping=self.mapping,
+                               render_opt=self.styles,
+                               label_width_cache=self._label_width_cache,
+                               layout_cache=layout_cache,
+                               stats=stats)
+
+    def render_layout(self,
+                      layout,
+                      savefig=None,
+                      savefig_format=None,
+                      savefig_dpi=300,
+                      savefig_crop=None,
+                      stats=None):
+        """
+        Draw a layout into a new figure.
+
+        Parameters
+        ----------
+        layout : dict
+            Layout of the sequence diagram, as returned by ``layout()``.
+        savefig : str, file-like, or list, optional
+            If specified, save figure into a file with the name given by
+            `savefig`, into a binary file-like object, or into several
+            outputs as described in ``plot_sequence()``.
+        savefig_format, savefig_dpi, savefig_crop : optional
+            Format, resolution and cropping of the saved figure. See
+            ``plot_sequence()``.
+        stats : RenderStats, optional
+            If specified, record the time spent drawing and saving.
+
+        Returns
+        -------
+        fig : matplotlib.figure.Figure or None
+            Figure that contains the diagram, or None if the figure was
+            released after saving.
+
+        """
+        with _mathtext_context(_layout_labels(layout)):
+            return render_layout(layout,
+                                 savefig=savefig,
+                                 savefig_format=savefig_format,
+                                 savefig_dpi=savefig_dpi,
+                                 savefig_crop=savefig_crop,
+                                 use_pyplot=False,
+                                 stats=stats)
+
+    def plot(self,
+             seq=None,
+             seq_name=None,
+             savefig=None,
+             savefig_format=None,
+             savefig_dpi=300,
+             savefig_crop=None,
+             stats=None,
+             **kwargs):
+        """
+        Plot a sequence diagram into a new figure.
+
+        Parameters
+        ----------
+        seq : benchlingclient.DNASequence or IndexedSequence
+            Sequence to be plotted. Can be omitted if `seq_name` is
+            provided.
+        seq_name : str, optional
+            Name of the sequence to load and plot. Ignored if `seq` is
+            specified.
+        savefig : str, file-like, or list, optional
+            If specified, save figure into a file with the name given by
+            `savefig`, into a binary file-like object, or into several
+            outputs as described in ``plot_sequence()``.
+        savefig_format, savefig_dpi, savefig_crop : optional
+            Format, resolution and cropping of the saved figure. See
+            ``plot_sequence()``.
+        stats : RenderStats, optional
+            If specified, record the time spent in each phase of rendering
+            and related counts.
+
+        Other parameters
+        ----------------
+        Keyword arguments are passed to ``layout()``, except for `ax`.
+
+        Returns
+        -------
+        fig : matplotlib.figure.Figure or None
+            Figure that contains the diagram, or None if the figure was
+            released after saving.
+
+        """
+        ax = _new_figure(use_pyplot=False).add_subplot(111)
+        # Set axis limits and aspect before measuring labels
+        ax.set_xlim((0, kwargs.get('ax_x_extent', 250)))
+        ax.set_ylim(kwargs.get('ax_ylim', (-15, 15)))
+        ax.set_aspect('equal')
+
+        layout = self.layout(seq=seq,
+                             seq_name=seq_name,
+                             ax=ax,
+                             stats=stats,
+                             **kwargs)
+        fig = ax.figure
+        with _mathtext_context(_layout_labels(layout)):
+            render_layout(layout, ax=ax, stats=stats)
+            if savefig is not None:
+                _save_figure(fig,
+                             savefig,
+                             stats=stats,
+                             format=savefig_format,
+                             dpi=savefig_dpi,
+                             crop=savefig_crop)
+        if savefig is not None:
+            _release_figure(fig, use_pyplot=False)
+            return None
+
+        return fig
+
+    def label_width_cache_info(self):
+        """
+        Get statistics of the renderer's label width cache.
+
+        See ``label_width_cache_info()``.
+
+        """
+        return self._label_width_cache.info()
+
+    def clear_label_width_cache(self):
+        """
+        Remove all label widths memoized by the renderer.
+
+        """
+        self._label_width_cache.clear()
+
+# Module-level settings that are copied to worker processes by
+# ``iter_render_batch()`` and ``render_batch()``.
+_SETTINGS = ['ANN_PARTS_MAPPING',
+             'RENDER_OPT',
+             'SEQUENCE_CACHE_DIR',
+             'SEQUENCE_CACHE_TTL',
+             'SEQUENCE_CACHE_MAX_SIZE',
+             'SEQUENCE_FIELDS',
+             'RENDER_CACHE_DIR',
+             'RENDER_CACHE_MAX_SIZE',
+             'LABEL_WIDTH_CACHE_SIZE',
+             'LABEL_METRICS',
+             'SAVEFIG_CROP']
+
+# Default rendering options, as defined when this module was imported
+# Options that cannot be pickled, such as lambdas, are sent to worker
+# processes as references to these.
+_DEFAULT_RENDER_OPT = copy.deepcopy(RENDER_OPT)
+
+# Reference to an option in ``_DEFAULT_RENDER_OPT``
+_DefaultRenderOption = collections.namedtuple('_DefaultRenderOption',
+                                              ['part_type', 'key'])
+
+def _picklable(value):
+    """
+    Check whether a value can be pickled.
+
+    """
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return False
+    return True
+
+def _get_sendable_render_opt():
+    """
+    Get a version of ``RENDER_OPT`` that can be sent to worker processes.
+
+    Options that cannot be pickled, such as lambdas, are replaced by a
+    ``_DefaultRenderOption`` if they are the default option, and left out
+    otherwise.
+
+    Returns
+    -------
+    render_opt : dict
+        Rendering options that can be pickled.
+    unsent : list of str
+        Options that were left out, as ``'part_type.key'``.
+
+    """
+    render_opt = {}
+    unsent = []
+    for part_type, opts in RENDER_OPT.items():
+        default_opts = _DEFAULT_RENDER_OPT.get(part_type, {})
+        render_opt[part_type] = {}
+        for k, v in opts.items():
+            if callable(v) and (default_opts.get(k) is v):
+                render_opt[part_type][k] = _DefaultRenderOption(part_type, k)
+            elif _picklable(v):
+                render_opt[part_type][k] = v
+            else:
+                unsent.append('{}.{}'.format(part_type, k))
+    return render_opt, unsent
+
+def _resolve_render_opt(render_opt):
+    """
+    Replace references to default options in a version of ``RENDER_OPT``
+    returned by ``_get_sendable_render_opt()``.
+
+    """
+    return {part_type: {k: (_DEFAULT_RENDER_OPT[v.part_type][v.key]
+                            if isinstance(v, _DefaultRenderOption) else v)
+                        for k, v in opts.items()}
+            for part_type, opts in render_opt.items()}
+
+def _get_settings():
+    """
+    Get the current module settings and matplotlib rcParams that can be
+    copied to another process.
+
+    ``RENDER_OPT`` usually contains lambdas, which cannot be pickled. Those
+    that have not been changed since this module was imported are sent as
+    references to the default options. Other options that cannot be
+    pickled are inherited by worker processes started via fork. Otherwise,
+    they cannot be used by worker processes, and a warning is issued.
+
+    """
+    settings = {}
+    for name in _SETTINGS:
+        value = globals()[name]
+        if (name=='RENDER_OPT') and (not _picklable(value)):
+            value, unsent = _get_sendable_render_opt()
+            if unsent:
+                import multiprocessing
+                start_method = multiprocessing.get_start_method()
+                if start_method=='fork':
+                    # Workers inherit RENDER_OPT from this process
+                    continue
+                warnings.warn("RENDER_OPT options {} cannot be pickled and "
+                    "are not used by worker processes started with {!r}. "
+                    "Define them as module-level functions instead of "
+                    "lambdas.".format(', '.join(unsent), start_method),
+                    RuntimeWarning,
+                    stacklevel=3)
+        if _picklable(value):
+            settings[name] = value
+    rc_params = {}
+    for k, v in matplotlib.rcParams.items():
+        if k in ['backend', 'backend_fallback']:
+            continue
+        if _picklable(v):
+            rc_params[k] = v
+    return settings, rc_params
+
+def _init_batch_worker(backend, login_key, settings, rc_params):
+    """
+    Initialize a worker process for batch rendering.
+
+    """
+    global MATPLOTLIB_BACKEND
+    globals().update(settings)
+    if 'RENDER_OPT' in settings:
+        globals()['RENDER_OPT'] = _resolve_render_opt(settings['RENDER_OPT'])
+    matplotlib.rcParams.update(rc_params)
+    if backend is not None:
+        # pyplot is only imported by workers that need it, but may have
+        # been inherited from the parent process
+        MATPLOTLIB_BACKEND = backend
+        if 'matplotlib.pyplot' in sys.modules:
+            pyplot.switch_backend(backend)
+    if login_key is not None:
+        benchlingclient.LOGIN_KEY = login_key
+
+# Layouts computed by the batch items rendered in this process, shared by
+# items whose sequences have identical parts
+_batch_layout_cache = _LRUCache(256)
+
+def _render_batch_item(index, kwargs, collect_stats=False):
+    """
+    Render one item of a batch with ``plot_sequence()``.
+
+    Exceptions are caught and reported in the result, so that a failed item
+    does not stop the rest of the batch. If `collect_stats` is True, the
+    result includes the item's ``RenderStats`` as a dictionary.
+
+    """
+    seq = kwargs.get('seq')
+    result = {'index': index,
+              'seq_name': kwargs.get('seq_name', getattr(seq, 'name', None)),
+              'savefig': kwargs.get('savefig'),
+              'error': None,
+              'traceback': None,
+              }
+    stats = RenderStats() if collect_stats else None
+    t_start = time.perf_counter()
+    try:
+        plot_sequence(**dict({'use_pyplot': False,
+                               'layout_cache': _batch_layout_cache,
+                               'stats': stats},
+                              **kwargs))
+    except Exception as e:
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        result['traceback'] = traceback.format_exc()
+    finally:
+        # Release all figures created by this item with pyplot, if any
+        if 'matplotlib.pyplot' in sys.modules:
+            pyplot.close('all')
+    result['time'] = time.perf_counter() - t_start
+    if stats is not None:
+        result['stats'] = stats.to_dict()
+    return result
+
+def _batch_item_kwargs(item, kwargs):
+    """
+    Get the arguments to ``plot_sequence()`` for one item of a batch.
+
+    """
+    item_kwargs = dict(kwargs)
+    if isinstance(item, dict):
+        item_kwargs.update(item)
+    elif isinstance(item, str):
+        item_kwargs['seq_name'] = item
+    else:
+        item_kwargs['seq'] = item
+    return item_kwargs
+
+def iter_render_batch(items,
+                      max_workers=None,
+                      max_pending=None,
+                      backend='Agg',
+                      login_key=None,
+                      stats=None,
+                      **kwargs):
+    """
+    Render many sequences in a process pool, yielding results as they finish.
+
+    Items are consumed lazily and at most `max_pending` items are waiting or
+    being rendered at any time, so `items` can be a generator over an
+    arbitrarily long list of sequences.
+
+    Parameters
+    ----------
+    items : iterable
+        Items to render. Each item can be a dictionary with arguments to
+        ``plot_sequence()`` (e.g. ``seq_name``, ``start_position`` or
+        ``savefig``), a sequence name, or a
+        ``benchlingclient.DNASequence``.
+    max_workers : int, optional
+        Number of worker processes. If not specified, use the number of
+        CPUs. If 1, items are rendered one after the other in the calling
+        process.
+    max_pending : int, optional
+        Maximum number of items submitted to the pool and not yet finished.
+        If not specified, use twice `max_workers`.
+    backend : str, optional
+        Matplotlib backend to use in the worker processes.
+    login_key : str, optional
+        Benchling API key to use in the worker processes. If not specified,
+        use ``benchlingclient.LOGIN_KEY``.
+    stats : RenderStats, optional
+        If specified, statistics of every item are collected in the worker
+        processes and merged into `stats`.
+
+    Other parameters
+    ----------------
+    Any other keyword argument is passed to ``plot_sequence()`` for every
+    item. Arguments specified by an item take precedence.
+
+    Yields
+    ------
+    result : dict
+        Result of each item, in order of completion, with keys ``index``
+        (position of the item in `items`), ``seq_name``, ``savefig``,
+        ``time`` (seconds spent rendering), ``error`` (a message, or None
+        if the item was rendered successfully), and ``traceback``.
+
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2*max_workers
+    if login_key is None:
+        login_key = getattr(benchlingclient, 'LOGIN_KEY', None)
+
+    collect_stats = stats is not None
+
+    # Render in this process
+    if max_workers==1:
+        for index, item in enumerate(items):
+            result = _render_batch_item(index,
+                                        _batch_item_kwargs(item, kwargs),
+                                        collect_stats=collect_stats)
+            if collect_stats:
+                stats.merge(result['stats'])
+            yield result
+        return
+
+    def collect(future):
+        # Get the result of a finished future, even if the item could not be
+        # sent to or returned from a worker process
+        index, item_kwargs = futures[future]
+        del futures[future]
+        try:
+            result = future.result()
+            if collect_stats:
+                stats.merge(result['stats'])
+            return result
+        except Exception as e:
+            seq = item_kwargs.get('seq')
+            return {'index': index,
+                    'seq_name': item_kwargs.get('seq_name',
+                                                getattr(seq, 'name', None)),
+                    'savefig': item_kwargs.get('savefig'),
+                    'time': 0.,
+                    'error': '{}: {}'.format(type(e).__name__, e),
+                    'traceback': traceback.format_exc(),
+                    }
+
+    settings, rc_params = _get_settings()
+    futures = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(backend, login_key, settings, rc_params)) as executor:
+        for index, item in enumerate(items):
+            item_kwargs = _batch_item_kwargs(item, kwargs)
+            future = executor.submit(_render_batch_item,
+                                     index,
+                                     item_kwargs,
+                                     collect_stats)
+            futures[future] = (index, item_kwargs)
+            # Wait until there is space for more items
+            while len(futures) >= max_pending:
+                done, _ = concurrent.futures.wait(
+                    futures,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield collect(future)
+        for future in concurrent.futures.as_completed(list(futures)):
+            yield collect(future)
+
+def render_batch(items,
+                 max_workers=None,
+                 backend='Agg',
+                 login_key=None,
+                 stats=None,
+                 **kwargs):
+    """
+    Render many sequences in a process pool.
+
+    Each item is rendered into its own figure by ``plot_sequence()``, in one
+    of several worker processes using the `backend` matplotlib backend. An
+    item that fails to render does not stop the rest of the batch.
+
+    Parameters
+    ----------
+    items : list
+        Items to render. Each item can be a dictionary with arguments to
+        ``plot_sequence()`` (e.g. ``seq_name``, ``start_position`` or
+        ``savefig``), a sequence name, or a
+        ``benchlingclient.DNASequence``.
+    max_workers : int, optional
+        Number of worker processes. If not specified, use the number of
+        CPUs. If 1, items are rendered one after the other in the calling
+        process.
+    backend : str, optional
+        Matplotlib backend to use in the worker processes.
+    login_key : str, optional
+        Benchling API key to use in the worker processes. If not specified,
+        use ``benchlingclient.LOGIN_KEY``.
+    stats : RenderStats, optional
+        If specified, statistics of every item are collected in the worker
+        processes and merged into `stats`.
+
+    Other parameters
+    ----------------
+    Any other keyword argument is passed to ``plot_sequence()`` for every
+    item. Arguments specified by an item take precedence.
+
+    Returns
+    -------
+    results : list of dict
+        Result of each item, in the same order as `items`. See
+        ``iter_render_batch()`` for a description.
+
+    """
+    results = list(iter_render_batch(items,
+                                     max_workers=max_workers,
+                                     backend=backend,
+                                     login_key=login_key,
+                                     stats=stats,
+                                     **kwargs))
+    return sorted(results, key=lambda r: r['index'])
+
+# Name of the index file written by ``render_tiles()``
+TILE_INDEX_FILENAME = 'index.json'
+
+def _render_tile(layout, savefig, figsize, dpi):
+    """
+    Draw the layout of one tile into a figure that is exactly the tile.
+
+    Returns a message if the tile could not be rendered, or None.
+
+    """
+    try:
+        fig = _new_figure(use_pyplot=False, figsize=figsize)
+        ax = fig.add_axes([0, 0, 1, 1])
+        _draw_layout(layout, ax)
+        fig.savefig(savefig, dpi=dpi)
+        _release_figure(fig, use_pyplot=False)
+    except Exception as e:
+        return '{}: {}'.format(type(e).__name__, e)
+    return None
+
+def render_tiles(output_dir,
+                 seq=None,
+                 seq_name=None,
+                 tile_size=10000,
+                 zoom_levels=4,
+                 overlap=0.,
+                 file_format='png',
+                 tile_width=1024,
+                 dpi=100,
+                 glyph_labels={},
+                 ignore_names=[],
+                 cds_split_char='',
+                 cds_colors={},
+                 cds_label_colors={},
+                 ax_x_extent=250,
+                 ax_ylim=(-15, 15),
+                 ann_parts_mapping=None,
+                 max_workers=None,
+                 backend='Agg',
+                 stats=None):
+    """
+    Render a long sequence as tiles of fixed-size windows at several zooms.
+
+    At zoom level ``z``, the sequence is divided into windows of
+    ``tile_size*2**z`` bases, and the annotations completely contained in
+    each window are drawn into one tile, as ``plot_sequence()`` would with
+    the window's ``start_position`` and ``end_position``. To fit the larger
+    number of parts, the x axis of each level covers ``ax_x_extent*2**z``
+    data units, so glyphs get smaller as the zoom level increases. As in
+    ``plot_sequence()``, glyphs are drawn one after the other and not to
+    scale, starting at the left edge of the tile, and glyphs that do not fit
+    in the tile are clipped. Hence, horizontal positions within a tile do not
+    correspond to sequence positions. Tiles are saved as
+    ``<output_dir>/<z>/<i>.<file_format>``, and described in the JSON file
+    ``<output_dir>/index.json``.
+
+    The layout of each tile is computed with ``layout_sequence()``.
+    Annotations are indexed and mapped to part types once, labels are
+    measured once per zoom level, and tiles with identical parts, such as
+    empty ones, share a layout. Tiles are then drawn in a process pool.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory where tiles and the index are saved. It is created if it
+        does not exist.
+    seq : benchlingclient.DNASequence or IndexedSequence, optional
+        Sequence to be plotted. Can be omitted if `seq_name` is provided.
+    seq_name : str, optional
+        Name of the sequence to load and plot. Ignored if `seq` is
+        specified.
+    tile_size : int, optional
+        Number of bases covered by each tile at zoom level 0.
+    zoom_levels : int, optional
+        Number of zoom levels. Level 0 is the most detailed.
+    overlap : float, optional
+        Fraction of each tile that overlaps with the next one, in [0, 1).
+    file_format : str, optional
+        Format of the tiles, e.g. 'png' or 'svg'.
+    tile_width : int, optional
+        Width of each tile, in pixels. The height follows from `ax_ylim`
+        and the x axis extent of the level.
+    dpi : float, optional
+        Resolution of raster tiles.
+    max_workers : int, optional
+        Number of worker processes. If not specified, use the number of
+        CPUs. If 1, tiles are rendered in the calling process.
+    backend : str, optional
+        Matplotlib backend to use in the worker processes.
+    stats : RenderStats, optional
+        If specified, record the time spent in each phase and related
+        counts. Drawing time is recorded as 'render'.
+
+    Other parameters
+    ----------------
+    glyph_labels, ignore_names, cds_split_char, cds_colors,
+    cds_label_colors, ax_x_extent, ax_ylim, ann_parts_mapping
+        See ``plot_sequence()``.
+
+    Returns
+    -------
+    index : dict
+        Contents of the index file. Keys are ``seq_name``, ``length``,
+        ``file_format``, and ``levels``, a list with one dictionary per
+        zoom level with keys ``zoom``, ``tile_size``, ``stride``,
+        ``ax_x_extent``, ``width`` and ``height`` (in pixels), and
+        ``tiles``. Each tile is described by a dictionary with keys
+        ``start``, ``end``, ``file`` (relative to `output_dir`), ``parts``
+        (number of glyphs), and ``error`` (None if rendered successfully).
+
+    Raises
+    ------
+    ValueError
+        If no sequence is specified, or if `overlap` is out of range.
+
+    """
+    if not (0 <= overlap < 1):
+        raise ValueError("overlap should be in [0, 1)")
+    if seq is None:
+        if seq_name is None:
+            raise ValueError("seq or seq_name should be provided")
+        with _timer(stats, 'fetch'):
+            seq = load_sequence(seq_name, stats=stats)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    # Index annotations once for all tiles
+    if not isinstance(seq, IndexedSequence):
+        with _timer(stats, 'filter'):
+            seq = IndexedSequence(seq)
+
+    # Compute the layout of every tile
+    index = {'seq_name': seq.name,
+             'length': seq.length,
+             'file_format': file_format,
+             'levels': []}
+    tasks = []
+    for zoom in range(zoom_levels):
+        level_tile_size = tile_size*2**zoom
+        stride = max(1, int(round(level_tile_size*(1 - overlap))))
+        level_x_extent = ax_x_extent*2**zoom
+        figsize = (tile_width/dpi,
+                   tile_width/dpi*(ax_ylim[1] - ax_ylim[0])/level_x_extent)
+        points_per_unit = figsize[0]*72./level_x_extent
+        starts = range(0, seq.length, stride)
+        layout_cache = _LRUCache(len(starts))
+        level = {'zoom': zoom,
+                 'tile_size': level_tile_size,
+                 'stride': stride,
+                 'ax_x_extent': level_x_extent,
+                 'width': tile_width,
+                 'height': int(round(figsize[1]*dpi)),
+                 'tiles': []}
+        os.makedirs(os.path.join(output_dir, str(zoom)), exist_ok=True)
+        for tile_index, start in enumerate(starts):
+            end = start + level_tile_size - 1
+            layout = layout_sequence(seq=seq,
+                                     start_position=start,
+                                     end_position=end,
+                                     glyph_labels=glyph_labels,
+                                     ignore_names=ignore_names,
+                                     cds_split_char=cds_split_char,
+                                     cds_colors=cds_colors,
+                                     cds_label_colors=cds_label_colors,
+                                     ax_x_extent=level_x_extent,
+                                     ax_x_alignment='left',
+                                     ax_ylim=ax_ylim,
+                                     label_metrics='textpath',
+                                     points_per_unit=points_per_unit,
+                                     ann_parts_mapping=ann_parts_mapping,
+                                     layout_cache=layout_cache,
+                                     stats=stats)
+            tile = {'start': start,
+                    'end': end,
+                    'file': '{}/{}.{}'.format(zoom, tile_index, file_format),
+                    'parts': len(layout['parts']),
+                    'error': None}
+            level['tiles'].append(tile)
+            tasks.append((tile,
+                          layout,
+                          os.path.join(output_dir, tile['file']),
+                          figsize))
+        index['levels'].append(level)
+    if stats is not None:
+        stats.count('tiles', len(tasks))
+
+    # Draw tiles
+    with _timer(stats, 'render'):
+        if max_workers==1:
+            errors = (_render_tile(layout, savefig, figsize, dpi)
+                      for _, layout, savefig, figsize in tasks)
+            for (tile, _, _, _), error in zip(tasks, errors):
+                tile['error'] = error
+        else:
+            settings, rc_params = _get_settings()
+            login_key = getattr(benchlingclient, 'LOGIN_KEY', None)
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=_init_batch_worker,
+                    initargs=(backend, login_key, settings, rc_params)) \
+                    as executor:
+                errors = executor.map(_render_tile,
+                                      [t[1] for t in tasks],
+                                      [t[2] for t in tasks],
+                                      [t[3] for t in tasks],
+                                      itertools.repeat(dpi),
+                                      chunksize=8)
+                for (tile, _, _, _), error in zip(tasks, errors):
+                    tile['error'] = error
+
+    with open(os.path.join(output_dir, TILE_INDEX_FILENAME), 'w') as f:
+        json.dump(index, f, indent=1)
+
+    return index
+
+def _safe_filename(name):
+    """
+    Replace characters that are not safe in filenames by underscores.
+
+    """
+    return ''.join(c if (c.isalnum() or c in '-_.+') else '_' for c in name)
+
+def _load_listed_sequence(client, folder_id, listed_seq):
+    """
+    Load the complete record of a sequence listed with its metadata only.
+
+    The sequence is loaded by name with ``load_sequence()``, so that the
+    sequence cache is used if configured. If the name is not unique in
+    benchling, the sequences with that name in the folder are listed and
+    the one with the same ID is returned. A cached sequence whose
+    modification timestamp differs from the listed one is fetched again.
+
+    """
+    if client in _partial_fetch_unsupported:
+        # The listed sequence is already complete, because the client
+        # loaded or returned complete sequences when listing the folder
+        return listed_seq
+    seq_id = getattr(listed_seq, 'id', None)
+    try:
+        seq = load_sequence(listed_seq.name, client=client)
+        if _get_modified_at(seq)!=_get_modified_at(listed_seq):
+            seq = load_sequence(listed_seq.name, client=client, refresh=True)
+    except ValueError:
+        pass
+    else:
+        if getattr(seq, 'id', None)==seq_id:
+            return seq
+    for seq in _list_sequences(client,
+                               folder_id=folder_id,
+                               name=listed_seq.name):
+        if getattr(seq, 'id', None)==seq_id:
+            return seq
+    raise ValueError("sequence {} not found in folder {}".format(
+        listed_seq.name, folder_id))
+
+def sync_folder(folder_id,
+                output_dir,
+                manifest_path=None,
+                file_format='png',
+                max_workers=None,
+                client=None,
+                **kwargs):
+    """
+    Keep a directory of diagrams in sync with a benchling folder.
+
+    Sequences in the folder are listed with their names and modification
+    timestamps only, and compared with a manifest saved by the previous run.
+    Only sequences that were added or modified since then are downloaded
+    and rendered again, and the outputs of sequences that were removed from
+    the folder are deleted. Hence, the time taken by a run is proportional
+    to the number of changes instead of the size of the folder. If the
+    client ignores the ``returning`` parameter used to request timestamps
+    only, the listing already contains complete sequences, which are then
+    used without downloading them again.
+
+    Parameters
+    ----------
+    folder_id : str
+        ID of the benchling folder.
+    output_dir : str
+        Directory where diagrams are saved, one file per sequence, named
+        after the sequence.
+    manifest_path : str, optional
+        JSON file where the state of the folder is recorded between runs.
+        If not specified, use ``.benchling2sbolv_sync.json`` in
+        `output_dir`.
+    file_format : str, optional
+        Format of the diagrams, given as a file extension.
+    max_workers : int, optional
+        Number of worker processes used to render. See ``render_batch()``.
+        Also used as the maximum number of concurrent requests to download
+        sequences, if specified.
+    client : module or object, optional
+        Object exposing a ``DNASequence.list_all()`` method, used to query
+        benchling. If not specified, use ``benchlingclient``.
+
+    Other parameters
+    ----------------
+    Any other keyword argument is passed to ``plot_sequence()``. If these
+    change between runs, all sequences are rendered again.
+
+    Returns
+    -------
+    summary : dict
+        Lists of the names of sequences that were ``added``, ``modified``,
+        ``removed``, or ``unchanged``, and a list of ``failures`` with one
+        result dictionary (see ``iter_render_batch()``) per sequence that
+        could not be downloaded or rendered. Failed sequences are kept in
+        the manifest, marked as failed, and are retried and reported as
+        modified in the next run.
+
+    """
+    if client is None:
+        client = benchlingclient
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, '.benchling2sbolv_sync.json')
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Load state of the previous run
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {'options': None, 'sequences': {}}
+    h = hashlib.sha256()
+    _update_hash(h, [file_format, kwargs])
+    options = h.hexdigest()
+    previous = manifest['sequences'] if manifest['options']==options else {}
+
+    # List sequences in the folder, without downloading their annotations
+    seqs = _list_sequences(client,
+                           fields=_METADATA_FIELDS,
+                           folder_id=folder_id)
+    name_counts = collections.Counter(seq.name for seq in seqs)
+
+    summary = {'added': [],
+               'modified': [],
+               'removed': [],
+               'unchanged': [],
+               'failures': []}
+    sequences = {}
+    changed = []
+    for seq in seqs:
+        seq_id = getattr(seq, 'id', seq.name)
+        # Sequences with repeated names get their ID appended
+        if name_counts[seq.name] > 1:
+            filename = '{}_{}'.format(seq.name, seq_id)
+        else:
+            filename = seq.name
+        output = os.path.join(output_dir, '{}.{}'.format(
+            _safe_filename(filename), file_format))
+        entry = {'name': seq.name,
+                 'modified_at': _get_modified_at(seq),
+                 'output': output}
+        previous_entry = previous.get(seq_id)
+        if (previous_entry is not None) and \
+                (previous_entry==entry) and \
+                (entry['modified_at'] is not None) and \
+                os.path.exists(output):
+            summary['unchanged'].append(seq.name)
+            sequences[seq_id] = entry
+        else:
+            if seq_id in manifest['sequences']:
+                summary['modified'].append(seq.name)
+            else:
+                summary['added'].append(seq.name)
+            changed.append((seq_id, entry, seq))
+
+    # Remove outputs of sequences no longer in the folder, or renamed
+    listed_ids = set(sequences) | set(c[0] for c in changed)
+    current_outputs = set(entry['output'] for entry in sequences.values()) | \
+        set(c[1]['output'] for c in changed)
+    for seq_id, entry in manifest['sequences'].items():
+        if seq_id not in listed_ids:
+            summary['removed'].append(entry['name'])
+        if (entry['output'] not in current_outputs) and \
+                os.path.exists(entry['output']):
+            os.remove(entry['output'])
+
+    # Download added and modified sequences
+    # Sequences that fail are recorded as such, so that they are reported as
+    # modified in the next run.
+    items = []
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or 8) as executor:
+        futures = [executor.submit(_load_listed_sequence,
+                                   client,
+                                   folder_id,
+                                   seq)
+                   for _, _, seq in changed]
+        for (seq_id, entry, _), future in zip(changed, futures):
+            try:
+                seq = future.result()
+            except Exception as e:
+                summary['failures'].append({
+                    'index': None,
+                    'seq_name': entry['name'],
+                    'savefig': entry['output'],
+                    'time': 0.,
+                    'error': '{}: {}'.format(type(e).__name__, e),
+                    'traceback': ''.join(traceback.format_exception(
+                        type(e), e, e.__traceback__)),
+                    })
+                sequences[seq_id] = dict(entry, failed=True)
+            else:
+                items.append((seq_id, entry, {'seq': seq,
+                                              'savefig': entry['output']}))
+
+    # Render added and modified sequences
+    for result in render_batch([item[2] for item in items],
+                               max_workers=max_workers,
+                               **kwargs):
+        seq_id, entry, _ = items[result['index']]
+        if result['error'] is None:
+            sequences[seq_id] = entry
+        else:
+            summary['failures'].append(result)
+            sequences[seq_id] = dict(entry, failed=True)
+
+    # Save state
+    manifest = {'options': options, 'sequences': sequences}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(
+        os.path.abspath(manifest_path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    return summary
+
+# Columns accepted in a manifest file by ``main()``, with the function used
+# to convert each value when read from a CSV file. Columns converted with
+# ``json.loads`` contain JSON-encoded lists or dictionaries.
+_MANIFEST_COLUMNS = {'seq_name': str,
+                     'start_position': int,
+                     'end_position': int,
+                     'seq_label': str,
+                     'seq_label_pos': str,
+                     'glyph_labels': json.loads,
+                     'ignore_names': json.loads,
+                     'cds_split_char': str,
+                     'cds_colors': json.loads,
+                     'cds_label_colors': json.loads,
+                     'chromosomal_locus': str,
+                     'chromosomal_locus_pos': str,
+                     'ax_x_extent': float,
+                     'ax_x_alignment': str,
+                     'savefig_dpi': float,
+                     'savefig_crop': str,
+                     'output': str,
+                     }
+
+def _iter_manifest(path):
+    """
+    Iterate over the rows of a manifest file.
+
+    CSV and JSON Lines (one JSON object per line) files are read one row at
+    a time. YAML files are read one document at a time, where each document
+    can be a row or a list of rows. JSON files contain a list of rows and
+    are read at once.
+
+    Yields
+    ------
+    row : dict
+        Row as read from the file.
+
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', newline='') as f:
+        if ext=='.csv':
+            for row in csv.DictReader(f):
+                # Empty cells are treated as missing values
+                yield {k: v for k, v in row.items()
+                       if (k is not None) and (v is not None) and (v!='')}
+        elif ext in ['.jsonl', '.ndjson']:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext=='.json':
+            for row in json.load(f):
+                yield row
+        elif ext in ['.yaml', '.yml']:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required to read YAML manifests")
+            for document in yaml.safe_load_all(f):
+                if isinstance(document, list):
+                    for row in document:
+                        yield row
+                elif document is not None:
+                    yield document
+        else:
+            raise ValueError("manifest format {} not recognized".format(ext))
+
+def _parse_manifest_row(row, output_dir=None):
+    """
+    Convert a manifest row into arguments to ``plot_sequence()``.
+
+    Raises
+    ------
+    ValueError
+        If the row contains unknown columns, or lacks ``seq_name`` or
+        ``output``.
+
+    """
+    row = dict(row)
+    # A range can be given as a single "start-end" column
+    if 'range' in row:
+        start_position, end_position = str(row.pop('range')).split('-')
+        row.setdefault('start_position', start_position)
+        row.setdefault('end_position', end_position)
+    unknown_columns = set(row) - set(_MANIFEST_COLUMNS)
+    if unknown_columns:
+        raise ValueError("unknown manifest columns: {}".format(
+            ', '.join(sorted(unknown_columns))))
+    for column in ['seq_name', 'output']:
+        if column not in row:
+            raise ValueError("manifest column {} missing".format(column))
+    kwargs = {}
+    for column, value in row.items():
+        if isinstance(value, str):
+            value = _MANIFEST_COLUMNS[column](value)
+        kwargs[column] = value
+    output = kwargs.pop('output')
+    if output_dir is not None:
+        output = os.path.join(output_dir, output)
+    return kwargs, output
+
+def main(argv=None):
+    """
+    Render the sequences listed in a manifest file.
+
+    This is the entry point of the ``benchling2sbolv`` command. Run
+    ``benchling2sbolv --help`` for usage.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command-line arguments. If not specified, use ``sys.argv``.
+
+    Returns
+    -------
+    status : int
+        Exit status: 0 if all rows were rendered or skipped, 1 if any row
+        failed or the manifest could not be read.
+
+    """
+    global SEQUENCE_CACHE_DIR, RENDER_CACHE_DIR, MATPLOTLIB_BACKEND
+
+    parser = argparse.ArgumentParser(
+        prog='benchling2sbolv',
+        description="Plot benchling sequences listed in a manifest file as "
+            "SBOL visual diagrams. Rows whose output file already exists are "
+            "skipped, so an interrupted run can be resumed by running the "
+            "same command again.")
+    parser.add_argument('manifest',
+        help="CSV, JSON, JSON Lines, or YAML file with one row per diagram. "
+            "Columns: {}. A range can also be given as a 'range' column with "
+            "format 'start-end'. In CSV files, glyph_labels, ignore_names, "
+            "cds_colors and cds_label_colors are JSON-encoded.".format(
+                ', '.join(_MANIFEST_COLUMNS)))
+    parser.add_argument('-o', '--output-dir',
+        help="directory where relative output paths are resolved")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument('--overwrite', action='store_true',
+        help="render rows whose output file already exists")
+    parser.add_argument('--login-key',
+        default=os.environ.get('BENCHLING_LOGIN_KEY'),
+        help="benchling API key (default: environment variable "
+            "BENCHLING_LOGIN_KEY)")
+    parser.add_argument('--cache-dir', default=SEQUENCE_CACHE_DIR,
+        help="directory of the sequence cache (see SEQUENCE_CACHE_DIR)")
+    parser.add_argument('--render-cache-dir', default=RENDER_CACHE_DIR,
+        help="directory of the render cache (see RENDER_CACHE_DIR)")
+    parser.add_argument('--summary-json',
+        help="write a summary of the run to this file")
+    parser.add_argument('--stats', action='store_true',
+        help="include the time spent in each rendering phase in the summary")
+    parser.add_argument('-q', '--quiet', action='store_true',
+        help="only print the final summary")
+    parser.add_argument('--version', action='version',
+        version='%(prog)s {}'.format(__version__))
+    args = parser.parse_args(argv)
+
+    SEQUENCE_CACHE_DIR = args.cache_dir
+    RENDER_CACHE_DIR = args.render_cache_dir
+    if MATPLOTLIB_BACKEND is None:
+        MATPLOTLIB_BACKEND = 'Agg'
+    if args.login_key is not None:
+        benchlingclient.LOGIN_KEY = args.login_key
+
+    summary = {'rendered': 0,
+               'skipped': 0,
+               'failed': 0,
+               'failures': [],
+               'render_time': 0.,
+               'max_render_time': 0.,
+               'manifest_error': None,
+               }
+    # Outputs of the items that have been submitted and not yet finished,
+    # as ``(row_number, temporary_path, output_path)`` tuples.
+    pending_outputs = {}
+
+    def iter_rows():
+        # Reading stops at the first error, e.g. malformed JSON or a missing
+        # file, after which rows already read are still rendered
+        rows = _iter_manifest(args.manifest)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except (OSError, ValueError, ImportError, csv.Error) as e:
+                summary['manifest_error'] = '{}: {}'.format(type(e).__name__,
+                                                            e)
+                return
+            yield row
+
+    def iter_items():
+        for row_number, row in enumerate(iter_rows(), 1):
+            try:
+                kwargs, output = _parse_manifest_row(row, args.output_dir)
+            except Exception as e:
+                summary['failed'] += 1
+                summary['failures'].append({
+                    'row': row_number,
+                    'output': row.get('output') if isinstance(row, dict) \
+                        else None,
+                    'error': '{}: {}'.format(type(e).__name__, e)})
+                continue
+            if os.path.exists(output) and not args.overwrite:
+                summary['skipped'] += 1
+                continue
+            # Render into a temporary file first, so that an interrupted run
+            # does not leave partial outputs that would be skipped later
+            output_root, output_ext = os.path.splitext(output)
+            tmp_output = '{}.partial{}'.format(output_root, output_ext)
+            output_dirname = os.path.dirname(output)
+            if output_dirname:
+                os.makedirs(output_dirname, exist_ok=True)
+            # Items are indexed by iter_render_batch() in submission order
+            pending_outputs[next(item_index)] = \
+                (row_number, tmp_output, output)
+            kwargs['savefig'] = tmp_output
+            yield kwargs
+
+    item_index = itertools.count()
+    stats = RenderStats() if args.stats else None
+    t_start = time.perf_counter()
+    for result in iter_render_batch(iter_items(),
+                                    max_workers=args.workers,
+                                    stats=stats):
+        row_number, tmp_output, output = pending_outputs.pop(result['index'])
+        summary['render_time'] += result['time']
+        summary['max_render_time'] = max(summary['max_render_time'],
+                                         result['time'])
+        if result['error'] is None:
+            os.replace(tmp_output, output)
+            summary['rendered'] += 1
+            if not args.quiet:
+                print("{} ({:.2f} s)".format(output, result['time']))
+        else:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+            summary['failed'] += 1
+            summary['failures'].append({'row': row_number,
+                                        'output': output,
+                                        'error': result['error']})
+            if not args.quiet:
+                print("{} FAILED: {}".format(output, result['error']),
+                      file=sys.stderr)
+    summary['wall_time'] = time.perf_counter() - t_start
+    if stats is not None:
+        summary['stats'] = stats.to_dict()
+        summary['dedupe_ratio'] = stats.dedupe_ratio()
+
+    # Print summary
+    print("{} rendered, {} skipped, {} failed in {:.1f} s "
+          "(render time: {:.1f} s total, {:.2f} s max)".format(
+            summary['rendered'],
+            summary['skipped'],
+            summary['failed'],
+            summary['wall_time'],
+            summary['render_time'],
+            summary['max_render_time']))
+    if stats is not None:
+        for phase, phase_stats in summary['stats']['phases'].items():
+            print("  {}: {:.2f} s in {} calls".format(phase,
+                                                      phase_stats['time'],
+                                                      phase_stats['calls']))
+        print("  layouts reused: {} (dedupe ratio {:.2f})".format(
+            summary['stats']['counts'].get('layouts_reused', 0),
+            summary['dedupe_ratio']))
+    for failure in summary['failures']:
+        print("  row {}: {}".format(failure['row'], failure['error']),
+              file=sys.stderr)
+    if summary['manifest_error'] is not None:
+        print("cannot read manifest: {}".format(summary['manifest_error']),
+              file=sys.stderr)
+    if args.summary_json is not None:
+        with open(args.summary_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if summary['failed'] or (summary['manifest_error'] is not None):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
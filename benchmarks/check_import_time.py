@@ -0,0 +1,84 @@
+"""
+Check the time it takes to import benchling2sbolv.
+
+The module is imported several times in fresh interpreters, and its import
+time is measured with ``python -X importtime``. The check fails if the
+fastest import exceeds the budget, or if importing the module also imports
+any of its heavy dependencies, which should only be imported when first
+used.
+
+Usage::
+
+    python check_import_time.py [--budget SECONDS] [--repeat N]
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Maximum import time in seconds
+IMPORT_TIME_BUDGET = 0.3
+
+# Modules that should not be imported by ``import benchling2sbolv``
+LAZY_MODULES = ['benchlingclient',
+                'dnaplotlib',
+                'matplotlib',
+                'matplotlib.pyplot']
+
+def measure_import():
+    """
+    Import benchling2sbolv in a fresh interpreter.
+
+    Returns
+    -------
+    import_time : float
+        Cumulative import time of benchling2sbolv, in seconds.
+    loaded : list of str
+        Modules in ``LAZY_MODULES`` that were imported.
+
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(HERE)] + env.get('PYTHONPATH', '').split(os.pathsep))
+    code = "import sys, benchling2sbolv; " \
+        "print(','.join(m for m in {!r} if m in sys.modules))".format(
+            LAZY_MODULES)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             env=env,
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE,
+                             universal_newlines=True,
+                             check=True)
+    import_time = None
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields)==3 and fields[2].strip()=='benchling2sbolv':
+            import_time = int(fields[1])*1e-6
+    loaded = [m for m in process.stdout.strip().split(',') if m]
+    return import_time, loaded
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the import time of "
+        "benchling2sbolv.")
+    parser.add_argument('--budget', type=float, default=IMPORT_TIME_BUDGET,
+        help="maximum import time in seconds")
+    parser.add_argument('--repeat', type=int, default=5,
+        help="number of imports to measure")
+    args = parser.parse_args()
+
+    results = [measure_import() for _ in range(args.repeat)]
+    import_time = min(r[0] for r in results)
+    loaded = results[0][1]
+    print("import benchling2sbolv: {:.1f} ms (budget {:.1f} ms)".format(
+        import_time*1e3, args.budget*1e3))
+    failed = False
+    if import_time > args.budget:
+        print("FAIL: import time over budget")
+        failed = True
+    if loaded:
+        print("FAIL: modules imported eagerly: {}".format(', '.join(loaded)))
+        failed = True
+    sys.exit(1 if failed else 0)
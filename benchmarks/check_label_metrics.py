@@ -0,0 +1,140 @@
+"""
+Check how closely 'textpath' label widths match 'renderer' label widths.
+
+Typical glyph labels, including mathtext, are measured with both methods of
+``get_label_width()`` on axes with the default geometry of
+``plot_sequence()``, at several font sizes. The 'renderer' method snaps
+glyphs to the pixel grid, whereas 'textpath' does not, so widths are
+expected to differ slightly. The check fails if any difference is larger
+than ``--tolerance-px`` pixels plus ``--tolerance-rel`` times the width
+obtained with 'renderer', or if the differences exceed the bounds stated
+for 'textpath' in the comment on ``LABEL_METRICS``. The largest
+differences are reported.
+
+Usage::
+
+    python check_label_metrics.py [--tolerance-px 1] [--tolerance-rel 0.05]
+
+"""
+import argparse
+import os
+import sys
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import benchling2sbolv
+
+LABELS = ['sfGFP',
+          'mCherry',
+          'TetR',
+          'AmpR',
+          'pTet',
+          'J23100',
+          'B0034',
+          'L3S2P21',
+          'i',
+          'WWWW',
+          'Terminator with long name',
+          '$P_{lac}$',
+          '$\\alpha$-factor']
+FONTSIZES = [6, 8, 10]
+FONTSTYLES = ['normal', 'italic']
+
+# Bounds on the differences stated in the comment on ``LABEL_METRICS``:
+# pixels, fraction of the label width for labels of two or more characters,
+# and fraction of the label width for single characters
+MAX_DIFF_PX = 4.
+MAX_DIFF_REL = 0.08
+MAX_DIFF_REL_SINGLE_CHAR = 0.16
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tolerance-px', type=float, default=1.)
+    parser.add_argument('--tolerance-rel', type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Axes with the geometry used by plot_sequence() with default arguments
+    fig, ax = plt.subplots()
+    ax.set_xlim(-125, 125)
+    ax.set_ylim(-15, 15)
+    ax.set_aspect('equal')
+    ax.figure.canvas.draw()
+    x0, x1 = ax.transData.transform([(0, 0), (1, 0)])[:, 0]
+    px_per_unit = x1 - x0
+
+    failed = False
+    diffs = []
+    for fontsize in FONTSIZES:
+        for fontstyle in FONTSTYLES:
+            for label in LABELS:
+                widths = {}
+                for metrics in ['renderer', 'textpath']:
+                    widths[metrics] = benchling2sbolv.get_label_width(
+                        label,
+                        fontsize,
+                        fontstyle,
+                        ax=ax,
+                        metrics=metrics,
+                        cache=benchling2sbolv._LRUCache(0))
+                diff_px = abs(widths['renderer'] - widths['textpath'])*\
+                    px_per_unit
+                tolerance_px = args.tolerance_px + \
+                    args.tolerance_rel*widths['renderer']*px_per_unit
+                diffs.append((diff_px,
+                              diff_px/(widths['renderer']*px_per_unit),
+                              label,
+                              fontsize,
+                              fontstyle))
+                if diff_px > tolerance_px:
+                    print("FAIL: {!r} at {} pt ({}): 'renderer' {:.3f}, "
+                          "'textpath' {:.3f} data units, {:.2f} px apart, "
+                          "tolerance {:.2f} px".format(label,
+                                                       fontsize,
+                                                       fontstyle,
+                                                       widths['renderer'],
+                                                       widths['textpath'],
+                                                       diff_px,
+                                                       tolerance_px))
+                    failed = True
+    plt.close(fig)
+
+    print("{:.3f} px per data unit".format(px_per_unit))
+    print("Largest differences:")
+    for diff_px, diff_rel, label, fontsize, fontstyle in \
+            sorted(diffs, key=lambda d: d[1], reverse=True)[:5]:
+        print("  {:.2f} px ({:.1%}): {!r} at {} pt ({})".format(diff_px,
+                                                                diff_rel,
+                                                                label,
+                                                                fontsize,
+                                                                fontstyle))
+    print("Largest relative difference: {:.1%}".format(
+        max(d[1] for d in diffs)))
+
+    # Documented bounds
+    for diff_px, diff_rel, label, fontsize, fontstyle in diffs:
+        if len(label)==1:
+            max_diff_rel = MAX_DIFF_REL_SINGLE_CHAR
+        else:
+            max_diff_rel = MAX_DIFF_REL
+        if (diff_px > MAX_DIFF_PX) or (diff_rel > max_diff_rel):
+            print("FAIL: {!r} at {} pt ({}) differs by {:.2f} px ({:.1%}), "
+                  "documented bounds are {:g} px and {:.0%}".format(
+                      label,
+                      fontsize,
+                      fontstyle,
+                      diff_px,
+                      diff_rel,
+                      MAX_DIFF_PX,
+                      max_diff_rel))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
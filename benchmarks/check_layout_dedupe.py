@@ -0,0 +1,86 @@
+"""
+Check that sequences with identical parts share a single layout.
+
+A library of synthetic sequences with identical parts is plotted with
+``plot_sequences()``, first without labels and then with a different
+sequence label and chromosomal locus on every row. The check fails if
+labeled rows do not share layouts as well as unlabeled ones, or if the
+diagram differs from the one drawn without sharing layouts.
+
+Usage::
+
+    python check_layout_dedupe.py [n_rows]
+
+"""
+import copy
+import io
+import os
+import sys
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import benchling2sbolv
+import fake_benchlingclient
+
+def plot(seqs, layout_cache=None, **kwargs):
+    """
+    Plot sequences into PNG bytes.
+
+    Returns
+    -------
+    data : bytes
+        PNG image.
+    stats : benchling2sbolv.RenderStats
+        Statistics of the call.
+
+    """
+    stats = benchling2sbolv.RenderStats()
+    buf = io.BytesIO()
+    benchling2sbolv.plot_sequences(seqs=seqs,
+                                   use_pyplot=False,
+                                   savefig=buf,
+                                   layout_cache=layout_cache,
+                                   stats=stats,
+                                   **kwargs)
+    return buf.getvalue(), stats
+
+if __name__ == '__main__':
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    base = fake_benchlingclient.make_sequence('construct', 8)
+    seqs = []
+    for i in range(n_rows):
+        seq = copy.deepcopy(base)
+        seq.name = 'construct_{}'.format(i)
+        seqs.append(seq)
+    labels = {'seq_label': [seq.name for seq in seqs],
+              'chromosomal_locus': ['locus_{}'.format(i)
+                                    for i in range(n_rows)]}
+
+    _, unlabeled = plot(seqs)
+    labeled_data, labeled = plot(seqs, **labels)
+    # A cache that never returns a layout, so that every row is laid out
+    reference_data, _ = plot(seqs,
+                             layout_cache=benchling2sbolv._LRUCache(0),
+                             **labels)
+
+    failed = False
+    for name, stats in [('unlabeled', unlabeled), ('labeled', labeled)]:
+        print("{:10} dedupe ratio {:5.1f}, {} label measurements".format(
+            name,
+            stats.dedupe_ratio(),
+            stats.calls.get('label_measurement', 0)))
+        if stats.dedupe_ratio()!=n_rows:
+            print("FAIL: {} rows do not share a single layout".format(name))
+            failed = True
+    if labeled_data!=reference_data:
+        print("FAIL: diagram differs from the one drawn without sharing "
+              "layouts")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,71 @@
+"""
+Check that render cache keys only depend on what affects the figure.
+
+Render cache keys of the same synthetic sequence are computed before and
+after importing pyplot, and in fresh interpreters with different
+matplotlib backends. The check fails if any key differs, since the
+backend does not affect saved figures.
+
+Usage::
+
+    python check_render_cache_key.py
+
+"""
+import os
+import subprocess
+import sys
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchling2sbolv
+import fake_benchlingclient
+
+# Backends selected via ``MPLBACKEND`` in fresh interpreters
+BACKENDS = [None, 'Agg', 'svg']
+
+def get_key():
+    """
+    Get the render cache key of a synthetic sequence.
+
+    """
+    seq = fake_benchlingclient.make_sequence('construct', 20)
+    return benchling2sbolv._render_cache_key([seq],
+                                              None,
+                                              None,
+                                              None,
+                                              {'function': 'plot_sequence'},
+                                              'construct.png')
+
+def get_keys_in_process(backend):
+    """
+    Get keys before and after importing pyplot in a fresh interpreter.
+
+    """
+    env = dict(os.environ)
+    env.pop('MPLBACKEND', None)
+    if backend is not None:
+        env['MPLBACKEND'] = backend
+    code = "import check_render_cache_key as c; " \
+        "k = c.get_key(); import matplotlib.pyplot; print(k, c.get_key())"
+    process = subprocess.run([sys.executable, '-c', code],
+                             cwd=HERE,
+                             env=env,
+                             stdout=subprocess.PIPE,
+                             universal_newlines=True,
+                             check=True)
+    return process.stdout.split()
+
+if __name__ == '__main__':
+    keys = {}
+    for backend in BACKENDS:
+        before, after = get_keys_in_process(backend)
+        keys['MPLBACKEND={} before pyplot'.format(backend)] = before
+        keys['MPLBACKEND={} after pyplot'.format(backend)] = after
+    for name, key in keys.items():
+        print("{:36} {}".format(name, key[:16]))
+    if len(set(keys.values())) > 1:
+        print("FAIL: render cache keys differ")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+"""
+Check the number of requests made by ``sync_folder()``.
+
+A folder of synthetic sequences is synced three times into empty
+directories: with a client that honours the ``returning`` parameter, which
+needs one request to list the folder and one to download each sequence;
+with a client that honours it but gives listed sequences default empty
+annotations and lengths, which needs the same requests; and with a client
+that accepts ``returning`` but ignores it. The latter already lists
+complete sequences, which is confirmed by loading one of them, so the
+check fails if any other sequence is downloaded again after listing the
+folder. The check also fails if any output differs between clients.
+
+Usage::
+
+    python check_sync_fetches.py [--n-seqs 10]
+
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchling2sbolv
+import fake_benchlingclient
+
+# Batch rendering sets the benchling API key in every worker. Benchling is
+# not accessed, so the fake client can stand in for it if not installed.
+try:
+    import benchlingclient
+except ImportError:
+    sys.modules['benchlingclient'] = fake_benchlingclient
+
+def sync(n_seqs, ignore_returning, default_attributes={}):
+    """
+    Sync the fake folder into a new directory.
+
+    Returns
+    -------
+    n_requests : int
+        Number of calls to ``DNASequence.list_all()``.
+    outputs : dict
+        Contents of the diagrams saved, by file name.
+
+    """
+    fake_benchlingclient.IGNORE_RETURNING = ignore_returning
+    fake_benchlingclient.DEFAULT_ATTRIBUTES = default_attributes
+    benchling2sbolv._partial_fetch_unsupported.discard(fake_benchlingclient)
+    benchling2sbolv.clear_sequence_cache()
+
+    n_requests = [0]
+    list_all = fake_benchlingclient.DNASequence.__dict__['list_all']
+    def counted_list_all(cls, *args, **kwargs):
+        n_requests[0] += 1
+        return list_all.__func__(cls, *args, **kwargs)
+    fake_benchlingclient.DNASequence.list_all = classmethod(counted_list_all)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            summary = benchling2sbolv.sync_folder('lib_fake',
+                                                  output_dir,
+                                                  max_workers=1,
+                                                  client=fake_benchlingclient)
+            outputs = {}
+            for name in summary['added']:
+                path = os.path.join(output_dir, name + '.png')
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        outputs[name] = f.read()
+    finally:
+        fake_benchlingclient.DNASequence.list_all = list_all
+    if summary['failures'] or len(summary['added'])!=n_seqs:
+        print("FAIL: sync with ignore_returning={}, default_attributes={} "
+              "added {} of {} sequences, {} failures".format(
+                  ignore_returning,
+                  default_attributes,
+                  len(summary['added']),
+                  n_seqs,
+                  len(summary['failures'])))
+    return n_requests[0], outputs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n-seqs', type=int, default=10)
+    args = parser.parse_args()
+
+    fake_benchlingclient.clear()
+    for i in range(args.n_seqs):
+        fake_benchlingclient.register(
+            fake_benchlingclient.make_sequence('seq_{:03d}'.format(i), 20))
+
+    failed = False
+    n_honoured, outputs_honoured = sync(args.n_seqs, ignore_returning=False)
+    n_defaults, outputs_defaults = sync(
+        args.n_seqs,
+        ignore_returning=False,
+        default_attributes={'annotations': [], 'length': 0})
+    n_ignored, outputs_ignored = sync(args.n_seqs, ignore_returning=True)
+    print("Requests with a client that honours returning: {}".format(
+        n_honoured))
+    print("Requests with a client that honours returning, with default "
+          "attributes: {}".format(n_defaults))
+    print("Requests with a client that ignores returning: {}".format(
+        n_ignored))
+    if n_honoured!=1 + args.n_seqs or n_defaults!=1 + args.n_seqs:
+        print("FAIL: expected {} requests with a client that honours "
+              "returning".format(1 + args.n_seqs))
+        failed = True
+    # Listing the folder, and loading the first sequence to confirm that
+    # listed sequences are complete
+    if n_ignored!=2:
+        print("FAIL: sequences listed complete were downloaded again")
+        failed = True
+    if len(outputs_honoured)!=args.n_seqs or \
+            outputs_defaults!=outputs_honoured or \
+            outputs_ignored!=outputs_honoured:
+        print("FAIL: outputs differ between clients")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
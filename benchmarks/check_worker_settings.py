@@ -0,0 +1,104 @@
+"""
+Check that worker processes render with the settings of the parent.
+
+``RENDER_OPT`` is customized with a module-level function and a static
+option, and synthetic sequences are rendered with ``render_batch()`` in
+worker processes started via spawn, which do not inherit any state from
+this process. The check fails if any output differs from the one rendered
+by ``plot_sequence()`` in this process, or if customizing ``RENDER_OPT``
+with a lambda, which cannot be sent to workers, does not issue a warning.
+
+Usage::
+
+    python check_worker_settings.py
+
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import warnings
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchling2sbolv
+import fake_benchlingclient
+
+# Batch rendering sets the benchling API key in every worker. Benchling is
+# not accessed, so the fake client can stand in for it if not installed.
+try:
+    import benchlingclient
+except ImportError:
+    sys.modules['benchlingclient'] = fake_benchlingclient
+
+def wide_cds_extent(label_width):
+    """
+    Customized ``x_extent`` of CDS glyphs.
+
+    """
+    return max(label_width, 10) + 40
+
+def customize_render_opt():
+    """
+    Customize ``RENDER_OPT`` with options that can be sent to workers.
+
+    """
+    benchling2sbolv.RENDER_OPT['CDS']['x_extent'] = wide_cds_extent
+    benchling2sbolv.RENDER_OPT['CDS']['color'] = (0.9, 0.3, 0.3)
+
+def read(path):
+    """
+    Read the contents of a file as bytes.
+
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('spawn')
+    customize_render_opt()
+    seqs = [fake_benchlingclient.make_sequence('construct_{}'.format(i), 6,
+                                               seed=i)
+            for i in range(4)]
+
+    failed = False
+    with tempfile.TemporaryDirectory() as output_dir:
+        items = []
+        for seq in seqs:
+            serial = os.path.join(output_dir, seq.name + '_serial.png')
+            benchling2sbolv.plot_sequence(seq=seq,
+                                          use_pyplot=False,
+                                          savefig=serial)
+            items.append({'seq': seq,
+                          'savefig': os.path.join(output_dir,
+                                                  seq.name + '_batch.png')})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            results = benchling2sbolv.render_batch(items, max_workers=2)
+        for seq, item, result in zip(seqs, items, results):
+            if result['error'] is not None:
+                print(result['traceback'])
+                failed = True
+                continue
+            serial = os.path.join(output_dir, seq.name + '_serial.png')
+            match = read(serial)==read(item['savefig'])
+            print("{:12} {}".format(seq.name, 'same' if match else 'DIFFERENT'))
+            if not match:
+                failed = True
+        if failed:
+            print("FAIL: workers did not render with the customized "
+                  "RENDER_OPT")
+
+        # Lambdas cannot be sent to workers
+        benchling2sbolv.RENDER_OPT['CDS']['x_extent'] = lambda lw: lw + 40
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            benchling2sbolv.render_batch(items[:1], max_workers=2)
+        if not any(issubclass(w.category, RuntimeWarning) for w in caught):
+            print("FAIL: no warning for RENDER_OPT options that cannot be "
+                  "sent to workers")
+            failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,207 @@
+"""
+Stand-in for ``benchlingclient`` that serves synthetic sequences.
+
+The classes in this module mimic the attributes of
+``benchlingclient.DNASequence`` and ``benchlingclient.Annotation`` used by
+``benchling2sbolv``. Sequences are generated with ``make_sequence()`` and
+registered with ``register()``, after which they can be loaded by name or
+folder through ``DNASequence.list_all()``. An optional latency can be set
+in ``LATENCY`` to emulate network round-trips, ``IGNORE_RETURNING``
+emulates a client that always returns complete sequences, and
+``DEFAULT_ATTRIBUTES`` emulates model objects with default attributes.
+
+Example::
+
+    import benchling2sbolv
+    import fake_benchlingclient
+
+    seq = fake_benchlingclient.make_sequence('construct', 1000)
+    fake_benchlingclient.register(seq)
+    benchling2sbolv.load_sequence('construct', client=fake_benchlingclient)
+
+"""
+import copy
+import random
+import threading
+import time
+
+LOGIN_KEY = None
+
+# Seconds to wait in every call to ``DNASequence.list_all()``
+LATENCY = 0.
+
+# If True, ``DNASequence.list_all()`` accepts ``returning`` but ignores it,
+# and always returns complete sequences
+IGNORE_RETURNING = False
+
+# Attributes set on sequences returned with ``returning`` for fields that were
+# not requested, as in model objects with default values
+DEFAULT_ATTRIBUTES = {}
+
+# Attributes of ``DNASequence`` whose name differs from the API field
+_FIELD_ATTRS = {'modifiedAt': 'modified_at',
+                'folderId': 'folder_id'}
+
+# Registered sequences, by name
+_SEQUENCES = {}
+_SEQUENCES_LOCK = threading.Lock()
+
+class Annotation(object):
+    """
+    Synthetic sequence annotation.
+
+    """
+    def __init__(self, name, type, start, end, strand=1, color='#ffffff'):
+        self.name = name
+        self.type = type
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.color = color
+
+    def __repr__(self):
+        return 'Annotation({!r}, {!r}, {}, {}, {})'.format(
+            self.name, self.type, self.start, self.end, self.strand)
+
+class DNASequence(object):
+    """
+    Synthetic DNA sequence.
+
+    """
+    def __init__(self,
+                 name,
+                 length,
+                 annotations,
+                 id=None,
+                 folder_id='lib_fake',
+                 modified_at='2020-01-01T00:00:00.000000+00:00',
+                 bases=None):
+        self.name = name
+        self.length = length
+        self.annotations = annotations
+        self.id = id if id is not None else 'seq_{}'.format(name)
+        self.folder_id = folder_id
+        self.modified_at = modified_at
+        self.bases = bases if bases is not None else 'a'*length
+
+    @classmethod
+    def list_all(cls, returning=None, **kwargs):
+        """
+        List registered sequences whose attributes match `kwargs`.
+
+        If `returning` is specified, as in benchling's API (e.g.
+        "dnaSequences.id,dnaSequences.name"), the returned sequences only
+        have the attributes of the requested fields and those in
+        ``DEFAULT_ATTRIBUTES``, unless ``IGNORE_RETURNING`` is True.
+
+        """
+        if LATENCY:
+            time.sleep(LATENCY)
+        with _SEQUENCES_LOCK:
+            seqs = list(_SEQUENCES.values())
+        seqs = [seq for seq in seqs
+                if all(getattr(seq, k, None)==v for k, v in kwargs.items())]
+        if (returning is not None) and (not IGNORE_RETURNING):
+            fields = [field.split('.')[-1] for field in returning.split(',')]
+            attrs = set(_FIELD_ATTRS.get(field, field) for field in fields)
+            seqs = [copy.copy(seq) for seq in seqs]
+            for seq in seqs:
+                for attr in list(vars(seq)):
+                    if attr not in attrs:
+                        delattr(seq, attr)
+                for attr, value in DEFAULT_ATTRIBUTES.items():
+                    if attr not in attrs:
+                        setattr(seq, attr, copy.copy(value))
+        return seqs
+
+def register(seq):
+    """
+    Make a sequence available through ``DNASequence.list_all()``.
+
+    """
+    with _SEQUENCES_LOCK:
+        _SEQUENCES[seq.name] = seq
+
+def clear():
+    """
+    Remove all registered sequences.
+
+    """
+    with _SEQUENCES_LOCK:
+        _SEQUENCES.clear()
+
+# Transcription units used to build synthetic sequences. Each element is a
+# list of ``(type, name, length)`` tuples. CDS names containing "/" are split
+# into fragments when plotted with ``cds_split_char='/'``.
+_UNITS = [
+    [('Promoter', 'J23100', 35),
+     ('RBS', 'B0034', 12),
+     ('CDS', 'sfgfp', 720),
+     ('Terminator', 'B0015', 129)],
+    [('Promoter', 'PcpcG2-172', 172),
+     ('ncRNA', 'RiboJ', 75),
+     ('RBS', 'BBa_B0030', 15),
+     ('CDS', 'ho1/pcyA', 1500),
+     ('Terminator', 'L3S2P21', 60)],
+    [('Promoter', 'PLlacO-1', 75),
+     ('RBS', 'B0032', 13),
+     ('CDS', 'ccaS', 2200),
+     ('CDS', 'ccaR', 700),
+     ('Terminator', 'ECK120033737', 60)],
+    [('rep_origin', 'p15A', 550),
+     ('misc_feature', 'scar', 8)],
+    ]
+
+def make_sequence(name, n_annotations, seed=0, unique_names=False, **kwargs):
+    """
+    Make a synthetic sequence with a given number of annotations.
+
+    Annotations are generated from a set of transcription units, placed
+    one after the other. Units are randomly placed on the forward or reverse
+    strand, and include split CDSs and annotation types that are not
+    plotted.
+
+    Parameters
+    ----------
+    name : str
+        Sequence name.
+    n_annotations : int
+        Number of annotations.
+    seed : int, optional
+        Seed of the random number generator.
+    unique_names : bool, optional
+        If True, a number is appended to the name of every annotation, as
+        in genomes where most gene names are unique.
+
+    Other parameters
+    ----------------
+    Any other keyword argument is passed to ``DNASequence``.
+
+    Returns
+    -------
+    seq : DNASequence
+        Synthetic sequence.
+
+    """
+    rng = random.Random(seed)
+    annotations = []
+    position = 0
+    while len(annotations) < n_annotations:
+        unit = rng.choice(_UNITS)
+        strand = rng.choice([1, -1])
+        if strand==-1:
+            unit = unit[::-1]
+        for ann_type, ann_name, length in unit:
+            if len(annotations) >= n_annotations:
+                break
+            if unique_names:
+                ann_name = '{}_{}'.format(ann_name, len(annotations))
+            annotations.append(Annotation(name=ann_name,
+                                          type=ann_type,
+                                          start=position,
+                                          end=position + length - 1,
+                                          strand=strand))
+            position += length + rng.randint(5, 50)
+    # Benchling does not return annotations sorted
+    rng.shuffle(annotations)
+    return DNASequence(name, position + 100, annotations, **kwargs)
@@ -0,0 +1,311 @@
+"""
+Benchmarks of benchling2sbolv on synthetic sequences.
+
+Sequences are generated and served by ``fake_benchlingclient``, so no
+benchling account or network access is needed. Each benchmark is run
+several times, and the minimum and median wall times are reported.
+
+Results are appended to a JSON file (``results.json`` in this directory by
+default), labeled with the package version and the current git revision.
+Each run is compared with the previous one in the file, and benchmarks
+that became slower by more than a threshold are reported as regressions.
+
+Usage::
+
+    python run_benchmarks.py [--quick] [--repeat N] [--results FILE]
+                             [--threshold FRACTION] [--fail-on-regression]
+                             [--filter SUBSTRING]
+
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import matplotlib
+matplotlib.use('Agg')
+
+import benchling2sbolv
+import check_import_time
+import fake_benchlingclient
+
+def get_git_revision():
+    """
+    Get the current git revision of this repository, or None.
+
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=HERE,
+                                       stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except Exception:
+        return None
+
+def time_function(function, repeat):
+    """
+    Call a function several times and get its wall times.
+
+    Label widths are forgotten before every call, so that every call
+    measures the same amount of work.
+
+    """
+    times = []
+    for _ in range(repeat):
+        benchling2sbolv.clear_label_width_cache()
+        t_start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t_start)
+    return times
+
+def get_benchmarks(output_dir, quick=False):
+    """
+    Get the benchmarks to run, as a list of ``(name, function)`` tuples.
+
+    """
+    sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10000]
+    benchmarks = []
+
+    # Importing the module in a fresh interpreter, including its startup
+    benchmarks.append(('import', check_import_time.measure_import))
+
+    # plot_sequence() over whole sequences of increasing size. The x axis
+    # extent is proportional to the number of annotations so that all parts
+    # are inside the axes.
+    for n in sizes:
+        seq = fake_benchlingclient.make_sequence('seq_{}'.format(n), n)
+        def plot_whole(seq=seq, n=n):
+            benchling2sbolv.plot_sequence(
+                seq=seq,
+                cds_split_char='/',
+                chromosomal_locus='attB',
+                ax_x_extent=max(250, 30*n),
+                use_pyplot=False,
+                savefig=os.path.join(output_dir, 'whole.png'))
+        benchmarks.append(('plot_sequence/whole/{}'.format(n), plot_whole))
+
+    # plot_sequence() on a small window of sequences of increasing size,
+    # which measures the cost of selecting annotations
+    for n in sizes:
+        seq = fake_benchlingclient.make_sequence('seq_{}'.format(n), n)
+        def plot_window(seq=seq):
+            benchling2sbolv.plot_sequence(
+                seq=seq,
+                start_position=seq.length//2,
+                end_position=seq.length//2 + 5000,
+                cds_split_char='/',
+                use_pyplot=False,
+                savefig=os.path.join(output_dir, 'window.png'))
+        benchmarks.append(('plot_sequence/window/{}'.format(n), plot_window))
+
+    # layout_sequence() alone, without a figure
+    for n in sizes:
+        seq = fake_benchlingclient.make_sequence('seq_{}'.format(n), n)
+        def layout(seq=seq):
+            benchling2sbolv.layout_sequence(seq=seq, cds_split_char='/')
+        benchmarks.append(('layout_sequence/{}'.format(n), layout))
+
+    # Mapping annotations to part types in sequences whose annotation names
+    # are mostly unique, as in genomes. The time should grow linearly with
+    # the number of annotations.
+    genome_sizes = [1000, 10000] if quick else [1000, 10000, 100000]
+    for n in genome_sizes:
+        seq = fake_benchlingclient.make_sequence('genome_{}'.format(n),
+                                                 n,
+                                                 unique_names=True)
+        def part_types(seq=seq):
+            table = benchling2sbolv.AnnotationTable(seq.annotations)
+            table.part_types(benchling2sbolv.compile_mapping())
+        benchmarks.append(('part_types/unique_names/{}'.format(n),
+                           part_types))
+
+    # plot_sequences() loading sequences by name through the fake client
+    n_seqs = 10 if quick else 50
+    seq_names = []
+    for i in range(n_seqs):
+        seq = fake_benchlingclient.make_sequence('lib_{}'.format(i),
+                                                 30,
+                                                 seed=i)
+        fake_benchlingclient.register(seq)
+        seq_names.append(seq.name)
+    def plot_many():
+        benchling2sbolv.plot_sequences(
+            seq_names=seq_names,
+            cds_split_char='/',
+            use_pyplot=False,
+            savefig=os.path.join(output_dir, 'many.png'))
+    benchmarks.append(('plot_sequences/{}'.format(n_seqs), plot_many))
+
+    # plot_sequences() on a variant library, in which sequences only differ
+    # in the names of promoters that are relabeled with glyph_labels, so
+    # that most layouts are shared
+    variants = []
+    for i in range(n_seqs):
+        seq = fake_benchlingclient.make_sequence('variant_{}'.format(i),
+                                                 30,
+                                                 seed=i % 5)
+        for annotation in seq.annotations:
+            if annotation.type=='Promoter':
+                annotation.name = 'variant_{}_promoter'.format(i)
+        variants.append(seq)
+    variant_labels = {'variant_{}_promoter'.format(i): 'P'
+                      for i in range(n_seqs)}
+    def plot_variants():
+        benchling2sbolv.plot_sequences(
+            seqs=variants,
+            glyph_labels=variant_labels,
+            cds_split_char='/',
+            use_pyplot=False,
+            savefig=os.path.join(output_dir, 'variants.png'))
+    benchmarks.append(('plot_sequences/variants/{}'.format(n_seqs),
+                       plot_variants))
+
+    # Output formats
+    seq = fake_benchlingclient.make_sequence('formats', 30)
+    for file_format in ['png', 'svg', 'pdf']:
+        def plot_format(file_format=file_format):
+            benchling2sbolv.plot_sequence(
+                seq=seq,
+                cds_split_char='/',
+                use_pyplot=False,
+                savefig=os.path.join(output_dir, 'format.' + file_format))
+        benchmarks.append(('savefig/{}'.format(file_format), plot_format))
+
+    # Saving into memory, cropping to the diagram extents in a single draw
+    for file_format in ['png', 'svg']:
+        def plot_buffer(file_format=file_format):
+            benchling2sbolv.plot_sequence(
+                seq=seq,
+                cds_split_char='/',
+                use_pyplot=False,
+                savefig=io.BytesIO(),
+                savefig_format=file_format,
+                savefig_crop='extents')
+        benchmarks.append(('savefig/buffer/{}'.format(file_format),
+                           plot_buffer))
+
+    # Print, web, thumbnail and vector outputs of one construct, saved by
+    # separate calls or from a single drawing
+    def get_outputs(resample=False):
+        return [{'savefig': io.BytesIO(), 'format': 'png', 'dpi': 300},
+                {'savefig': io.BytesIO(), 'format': 'png', 'dpi': 96,
+                 'resample': resample},
+                {'savefig': io.BytesIO(), 'format': 'png', 'width': 200,
+                 'resample': resample},
+                {'savefig': io.BytesIO(), 'format': 'svg'}]
+    def plot_outputs_separate():
+        for output in get_outputs():
+            benchling2sbolv.plot_sequence(
+                seq=seq,
+                cds_split_char='/',
+                use_pyplot=False,
+                savefig=[output])
+    benchmarks.append(('savefig/outputs/separate', plot_outputs_separate))
+    def plot_outputs_single():
+        benchling2sbolv.plot_sequence(
+            seq=seq,
+            cds_split_char='/',
+            use_pyplot=False,
+            savefig=get_outputs())
+    benchmarks.append(('savefig/outputs/single', plot_outputs_single))
+    def plot_outputs_resample():
+        benchling2sbolv.plot_sequence(
+            seq=seq,
+            cds_split_char='/',
+            use_pyplot=False,
+            savefig=get_outputs(resample=True))
+    benchmarks.append(('savefig/outputs/resample', plot_outputs_resample))
+
+    return benchmarks
+
+def compare(previous, current, threshold):
+    """
+    Get benchmarks whose median time increased by more than `threshold`.
+
+    """
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        if name not in previous['benchmarks']:
+            continue
+        previous_median = previous['benchmarks'][name]['median']
+        ratio = result['median']/previous_median
+        if ratio > 1 + threshold:
+            regressions.append((name, previous_median, result['median']))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run benchling2sbolv "
+        "benchmarks on synthetic sequences.")
+    parser.add_argument('--quick', action='store_true',
+        help="skip the largest benchmarks")
+    parser.add_argument('--repeat', type=int, default=5,
+        help="number of times each benchmark is run")
+    parser.add_argument('--results', default=os.path.join(HERE, 'results.json'),
+        help="JSON file where results are appended")
+    parser.add_argument('--threshold', type=float, default=0.2,
+        help="relative slowdown reported as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true',
+        help="exit with status 1 if any regression is found")
+    parser.add_argument('--filter', default='',
+        help="only run benchmarks whose name contains this string")
+    args = parser.parse_args()
+
+    # Disable caches that would make repeated runs trivial
+    benchling2sbolv.SEQUENCE_CACHE_DIR = None
+    benchling2sbolv.RENDER_CACHE_DIR = None
+    # Serve sequences from the fake client
+    benchling2sbolv.benchlingclient = fake_benchlingclient
+
+    current = {'version': benchling2sbolv.__version__,
+               'revision': get_git_revision(),
+               'date': datetime.datetime.now().isoformat(),
+               'python': platform.python_version(),
+               'matplotlib': matplotlib.__version__,
+               'machine': platform.machine(),
+               'repeat': args.repeat,
+               'benchmarks': {}}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, function in get_benchmarks(output_dir, quick=args.quick):
+            if args.filter not in name:
+                continue
+            times = time_function(function, args.repeat)
+            current['benchmarks'][name] = {'min': min(times),
+                                           'median': statistics.median(times)}
+            print("{:40s} min {:9.4f} s   median {:9.4f} s".format(
+                name, min(times), statistics.median(times)))
+
+    # Compare with previous run and save
+    try:
+        with open(args.results, 'r') as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        history = []
+    regressions = []
+    if history:
+        previous = history[-1]
+        regressions = compare(previous, current, args.threshold)
+        print("\nCompared with version {} ({}):".format(previous['version'],
+                                                       previous['revision']))
+        if not regressions:
+            print("  no regressions")
+        for name, previous_median, median in regressions:
+            print("  REGRESSION {}: {:.4f} s -> {:.4f} s".format(
+                name, previous_median, median))
+    history.append(current)
+    with open(args.results, 'w') as f:
+        json.dump(history, f, indent=2)
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
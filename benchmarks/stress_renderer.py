@@ -0,0 +1,119 @@
+"""
+Stress test for rendering from several threads with a shared ``Renderer``.
+
+Renders a set of synthetic sequences into in-memory PNG files from an
+increasing number of threads, all sharing a single ``Renderer``, and
+prints the throughput for each number of threads and its ratio to the
+throughput of a single thread. Every output is checked against the one
+rendered by a single thread, so that any interference between threads is
+reported as an error.
+
+Most of the rendering work holds the GIL. Only PNG compression, about a
+sixth of the time per diagram, runs in parallel, so throughput is expected
+to stay roughly flat with the number of threads, and never to increase by
+more than about 20%. The test fails if any output differs, or if the
+throughput with several threads falls below the throughput of a single
+thread by more than a threshold, which indicates contention between
+threads (e.g. a lock held for longer than needed).
+
+Usage::
+
+    python stress_renderer.py [--renders N] [--max-threads N]
+                              [--threshold FRACTION]
+
+"""
+import argparse
+import concurrent.futures
+import io
+import os
+import sys
+import time
+
+# Import benchling2sbolv from this repository, which is not necessarily
+# installed
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import benchling2sbolv
+import fake_benchlingclient
+
+def render(renderer, seq):
+    """
+    Render a sequence into PNG bytes.
+
+    """
+    buf = io.BytesIO()
+    renderer.plot(seq=seq,
+                  seq_label=seq.name,
+                  cds_split_char='-',
+                  savefig=buf)
+    return buf.getvalue()
+
+def measure(renderer, seqs, expected, n_renders, n_threads):
+    """
+    Render from several threads.
+
+    Returns
+    -------
+    throughput : float
+        Renders per second.
+    mismatches : int
+        Number of outputs that differ from `expected`.
+
+    """
+    mismatches = 0
+    t_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+        futures = {executor.submit(render, renderer, seqs[i % len(seqs)]):
+                   i % len(seqs)
+                   for i in range(n_renders)}
+        for future in concurrent.futures.as_completed(futures):
+            if future.result() != expected[futures[future]]:
+                mismatches += 1
+    elapsed = time.perf_counter() - t_start
+    return n_renders/elapsed, mismatches
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stress test rendering "
+        "from several threads with a shared Renderer.")
+    parser.add_argument('--renders', type=int, default=200,
+        help="number of diagrams rendered with each number of threads")
+    parser.add_argument('--max-threads', type=int, default=8,
+        help="maximum number of threads")
+    parser.add_argument('--threshold', type=float, default=0.2,
+        help="relative drop in throughput from a single thread reported "
+             "as a regression")
+    args = parser.parse_args()
+
+    seqs = [fake_benchlingclient.make_sequence('construct_{}'.format(i),
+                                               20,
+                                               seed=i)
+            for i in range(10)]
+    renderer = benchling2sbolv.Renderer()
+    expected = [render(renderer, seq) for seq in seqs]
+
+    print("{} CPUs".format(os.cpu_count()))
+    failed = False
+    single_throughput = None
+    n_threads = 1
+    while n_threads <= args.max_threads:
+        throughput, mismatches = measure(renderer,
+                                         seqs,
+                                         expected,
+                                         args.renders,
+                                         n_threads)
+        if single_throughput is None:
+            single_throughput = throughput
+        scaling = throughput/single_throughput
+        print("{:3d} threads: {:7.1f} renders/s, scaling {:4.2f}, "
+              "{} mismatches".format(n_threads, throughput, scaling,
+                                     mismatches))
+        if mismatches:
+            print("FAIL: outputs differ from single-threaded rendering")
+            failed = True
+        if scaling < 1 - args.threshold:
+            print("FAIL: throughput dropped by more than {:.0%}".format(
+                args.threshold))
+            failed = True
+        n_threads *= 2
+    sys.exit(1 if failed else 0)